@@ -0,0 +1,94 @@
+"""
+Async variants of the hot account endpoints for the ASGI deployment.
+
+DRF views are sync only, so these are plain Django async views that mirror
+the responses of UserViewSet.me and UserViewSet.login.
+"""
+
+import functools
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework import exceptions, status
+from rest_framework.authtoken.models import Token
+
+from .authentication import CachedTokenAuthentication
+from .serializers import UserSerializer, LoginSerializer
+
+User = get_user_model()
+
+
+def error_response(exc):
+    """
+    Render an APIException the way DRF's exception handler does.
+    """
+    if isinstance(exc.detail, (list, dict)):
+        data = exc.detail
+    else:
+        data = {'detail': exc.detail}
+
+    response = JsonResponse(data, status=exc.status_code, safe=False)
+    if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+        response.headers['WWW-Authenticate'] = CachedTokenAuthentication().authenticate_header(None)
+    return response
+
+
+def async_api_view(authenticated=True):
+    """
+    Wrap an async view: token authentication and DRF-style error responses.
+
+    The view is CSRF exempt, like DRF views authenticated by token.
+    """
+    def decorator(view):
+        @csrf_exempt
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            try:
+                if authenticated:
+                    result = await CachedTokenAuthentication().aauthenticate(request)
+                    if result is None:
+                        raise exceptions.NotAuthenticated()
+                    request.user, request.auth = result
+                return await view(request, *args, **kwargs)
+            except exceptions.APIException as exc:
+                return error_response(exc)
+        return wrapper
+    return decorator
+
+
+def parse_json_body(request):
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError as exc:
+        raise exceptions.ParseError(f'JSON parse error - {exc}')
+    if not isinstance(data, dict):
+        raise exceptions.ParseError('Expected a JSON object')
+    return data
+
+
+@require_GET
+@async_api_view()
+async def me(request):
+    return JsonResponse(UserSerializer(request.user).data)
+
+
+@require_POST
+@async_api_view(authenticated=False)
+async def login(request):
+    serializer = LoginSerializer(data=parse_json_body(request))
+    serializer.is_valid(raise_exception=True)
+
+    user = await User.objects.filter(email=serializer.validated_data['email']).afirst()
+    # Password hashing is CPU bound; keep it off the event loop
+    if user is None or not await sync_to_async(user.check_password)(serializer.validated_data['password']):
+        return JsonResponse({'error': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
+
+    token, _ = await Token.objects.aget_or_create(user=user)
+    return JsonResponse({
+        'user': UserSerializer(user).data,
+        'token': token.key
+    })
@@ -0,0 +1,324 @@
+"""
+Token authentication with cached token lookups.
+
+DRF's TokenAuthentication joins Token and User on every request. Here the
+result is kept in a per-process LRU with a short TTL and, optionally, in a
+shared Django cache (e.g. Redis) with a longer TTL. The shared cache only
+holds the token's user id and the user fields in SHARED_USER_FIELDS, never
+the password hash; the password is loaded on access like any deferred
+field.
+
+Entries are dropped by the signal handlers in accounts/signals.py when a
+token is deleted (logout, password change) or its user is saved or
+deleted. With a shared cache, the handlers also bump a per-user generation
+there, once right away and once more after the change is committed. Every
+process checks it before using its local entry or a shared one, so the
+change is seen by all workers at once. Without one, other processes see
+it once their local entry expires, so keep AUTH_TOKEN_CACHE_TTL short.
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication, get_authorization_header
+
+from forms.metrics import registry
+
+SHARED_KEY_PREFIX = 'auth:token:'
+GENERATION_KEY_PREFIX = 'auth:user-generation:'
+
+# User fields copied into the shared cache: enough for permission checks
+# and the profile, but no credentials
+SHARED_USER_FIELDS = (
+    'id', 'username', 'email', 'first_name', 'last_name', 'role',
+    'is_active', 'is_staff', 'is_superuser', 'date_joined',
+)
+
+
+class TokenCache:
+    """
+    Thread-safe LRU of token key -> Token (with its user) and a per-entry TTL.
+
+    Each entry also keeps the user's generation in the shared cache at the
+    time it was stored, see get_user_generation.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._keys_by_user = {}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            token, generation, expires = entry
+            if expires < time.monotonic():
+                self._remove(key)
+                return None
+
+            self._entries.move_to_end(key)
+            return token, generation
+
+    def set(self, key, token, generation=None):
+        if self.maxsize <= 0 or self.ttl <= 0:
+            return
+
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (token, generation, time.monotonic() + self.ttl)
+            self._keys_by_user.setdefault(token.user_id, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+
+        user_id = entry[0].user_id
+        user_keys = self._keys_by_user.get(user_id)
+        if user_keys is not None:
+            user_keys.discard(key)
+            if not user_keys:
+                del self._keys_by_user[user_id]
+
+    def delete(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def delete_user(self, user_id):
+        with self._lock:
+            for key in list(self._keys_by_user.get(user_id, ())):
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+token_cache = TokenCache(settings.AUTH_TOKEN_CACHE_SIZE, settings.AUTH_TOKEN_CACHE_TTL)
+
+
+def _shared_cache():
+    if not settings.AUTH_TOKEN_SHARED_CACHE or settings.AUTH_TOKEN_SHARED_CACHE_TTL <= 0:
+        return None
+    return caches[settings.AUTH_TOKEN_SHARED_CACHE]
+
+
+def _generation_key(user_id):
+    return f'{GENERATION_KEY_PREFIX}{user_id}'
+
+
+def _bump_generation(shared, user_id):
+    key = _generation_key(user_id)
+    if shared.add(key, 1, None):
+        return
+    try:
+        shared.incr(key)
+    except ValueError:
+        # Evicted in between; any value other than the old one invalidates
+        shared.set(key, 1, None)
+
+
+def _to_shared(token, generation):
+    return {
+        'created': token.created,
+        'user': {field: getattr(token.user, field) for field in SHARED_USER_FIELDS},
+        # The user's generation read before the token was looked up
+        'generation': generation,
+    }
+
+
+def _from_db(model, values):
+    # from_db takes the loaded values in the model's field order and defers
+    # the other fields
+    field_names = [field.attname for field in model._meta.concrete_fields if field.attname in values]
+    return model.from_db(None, field_names, [values[name] for name in field_names])
+
+
+def _from_shared(model, key, data):
+    # The password and last_login are deferred: they are loaded from the
+    # database only if accessed, and save() leaves them alone
+    user = _from_db(get_user_model(), data['user'])
+    token = _from_db(model, {'key': key, 'user_id': user.pk, 'created': data['created']})
+    token.user = user
+    return token
+
+
+def invalidate_token(key, user_id=None):
+    """
+    Drop a token from the local and shared caches.
+
+    Args:
+        key: Token key
+        user_id: ID of the token's user, to drop the token in other
+            processes too
+    """
+    token_cache.delete(key)
+    shared = _shared_cache()
+    if shared is not None:
+        shared.delete(SHARED_KEY_PREFIX + key)
+        if user_id is not None:
+            _bump_generation(shared, user_id)
+
+
+def invalidate_user_tokens(user_id, token_keys=()):
+    """
+    Drop all cached tokens of a user, in every process sharing the cache.
+
+    Args:
+        user_id: ID of the user
+        token_keys: Keys of the user's tokens, needed to clear the shared cache
+    """
+    token_cache.delete_user(user_id)
+    shared = _shared_cache()
+    if shared is not None:
+        _bump_generation(shared, user_id)
+        if token_keys:
+            shared.delete_many([SHARED_KEY_PREFIX + key for key in token_keys])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication that serves repeated lookups of a token from cache.
+
+    With a shared cache, the user's generation is read before the database
+    lookup and stored with the entry, so a change committed while the
+    token was being looked up is caught by the next request instead of
+    being cached for AUTH_TOKEN_SHARED_CACHE_TTL.
+
+    aauthenticate() is the counterpart for plain async Django views, which
+    DRF's authentication hooks do not cover.
+    """
+
+    def authenticate_credentials(self, key):
+        shared = _shared_cache()
+        token = None
+        cached = token_cache.get(key)
+        if cached is not None:
+            token, generation = cached
+            if shared is not None and shared.get(_generation_key(token.user_id)) != generation:
+                token_cache.delete(key)
+                token = None
+
+        if token is not None:
+            registry.incr('auth_token_cache_hits', layer='local')
+        else:
+            token, generation = self._get_shared(shared, key) if shared is not None else (None, None)
+            if token is not None:
+                registry.incr('auth_token_cache_hits', layer='shared')
+            else:
+                registry.incr('auth_token_cache_misses')
+                if shared is not None:
+                    user_id = self.get_model().objects.filter(key=key).values_list('user_id', flat=True).first()
+                    if user_id is None:
+                        raise exceptions.AuthenticationFailed(_('Invalid token.'))
+                    generation = shared.get(_generation_key(user_id))
+                # Raises AuthenticationFailed for unknown keys and inactive users
+                user, token = super().authenticate_credentials(key)
+                if shared is not None:
+                    shared.set(
+                        SHARED_KEY_PREFIX + key, _to_shared(token, generation), settings.AUTH_TOKEN_SHARED_CACHE_TTL
+                    )
+            token_cache.set(key, token, generation)
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+        # Hand out a copy so changes made while handling one request do not
+        # leak into the cached instance shared by other requests.
+        return copy.copy(token.user), token
+
+    def _get_shared(self, shared, key):
+        data = shared.get(SHARED_KEY_PREFIX + key)
+        if data is None:
+            return None, None
+        generation = shared.get(_generation_key(data['user']['id']))
+        if data.get('generation') != generation:
+            # Stored before the user changed
+            shared.delete(SHARED_KEY_PREFIX + key)
+            return None, None
+        return _from_shared(self.get_model(), key, data), generation
+
+    async def aauthenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+
+        if len(auth) == 1:
+            raise exceptions.AuthenticationFailed(_('Invalid token header. No credentials provided.'))
+        elif len(auth) > 2:
+            raise exceptions.AuthenticationFailed(_('Invalid token header. Token string should not contain spaces.'))
+
+        try:
+            key = auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed(
+                _('Invalid token header. Token string should not contain invalid characters.')
+            )
+        return await self.aauthenticate_credentials(key)
+
+    async def aauthenticate_credentials(self, key):
+        shared = _shared_cache()
+        token = None
+        cached = token_cache.get(key)
+        if cached is not None:
+            token, generation = cached
+            if shared is not None and await shared.aget(_generation_key(token.user_id)) != generation:
+                token_cache.delete(key)
+                token = None
+
+        if token is not None:
+            registry.incr('auth_token_cache_hits', layer='local')
+        else:
+            token, generation = await self._aget_shared(shared, key) if shared is not None else (None, None)
+            if token is not None:
+                registry.incr('auth_token_cache_hits', layer='shared')
+            else:
+                registry.incr('auth_token_cache_misses')
+                model = self.get_model()
+                if shared is not None:
+                    user_id = await model.objects.filter(key=key).values_list('user_id', flat=True).afirst()
+                    if user_id is None:
+                        raise exceptions.AuthenticationFailed(_('Invalid token.'))
+                    generation = await shared.aget(_generation_key(user_id))
+                try:
+                    token = await model.objects.select_related('user').aget(key=key)
+                except model.DoesNotExist:
+                    raise exceptions.AuthenticationFailed(_('Invalid token.'))
+                if shared is not None:
+                    await shared.aset(
+                        SHARED_KEY_PREFIX + key, _to_shared(token, generation), settings.AUTH_TOKEN_SHARED_CACHE_TTL
+                    )
+            token_cache.set(key, token, generation)
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+        return copy.copy(token.user), token
+
+    async def _aget_shared(self, shared, key):
+        data = await shared.aget(SHARED_KEY_PREFIX + key)
+        if data is None:
+            return None, None
+        generation = await shared.aget(_generation_key(data['user']['id']))
+        if data.get('generation') != generation:
+            await shared.adelete(SHARED_KEY_PREFIX + key)
+            return None, None
+        return _from_shared(self.get_model(), key, data), generation
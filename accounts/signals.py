@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import invalidate_token, invalidate_user_tokens
+
+
+def _invalidate_now_and_on_commit(invalidate, *args):
+    # Invalidating again once the change is committed catches a lookup
+    # that read the old row after the first invalidation
+    invalidate(*args)
+    transaction.on_commit(lambda: invalidate(*args))
+
+
+@receiver(post_delete, sender=Token)
+def drop_deleted_token(sender, instance, **kwargs):
+    # Logout and password changes delete the user's token
+    _invalidate_now_and_on_commit(invalidate_token, instance.key, instance.user_id)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def drop_tokens_of_changed_user(sender, instance, **kwargs):
+    # Role, password and is_active changes must not be served from cache
+    token_keys = list(Token.objects.filter(user_id=instance.pk).values_list('key', flat=True))
+    _invalidate_now_and_on_commit(invalidate_user_tokens, instance.pk, token_keys)
@@ -1,3 +1,192 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from .authentication import (
+    GENERATION_KEY_PREFIX, SHARED_KEY_PREFIX, CachedTokenAuthentication, _bump_generation, token_cache,
+)
+from .models import User
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='viewer', email='viewer@example.com', password='viewer-password', role='viewer'
+        )
+        cls.token = Token.objects.create(user=cls.user)
+        # delete() clears the primary key, which is the token key
+        cls.key = cls.token.key
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        self.addCleanup(token_cache.clear)
+        self.auth = CachedTokenAuthentication()
+
+    def authenticate(self):
+        user, token = self.auth.authenticate_credentials(self.key)
+        self.assertEqual(token.key, self.key)
+        return user
+
+    def test_local_hit_makes_no_queries(self):
+        self.authenticate()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.authenticate().pk, self.user.pk)
+
+    def test_cached_user_is_not_shared_between_requests(self):
+        self.authenticate().role = 'admin'
+        self.assertEqual(self.authenticate().role, 'viewer')
+
+    def test_user_change_invalidates(self):
+        self.authenticate()
+        self.user.role = 'admin'
+        self.user.save()
+        self.assertEqual(self.authenticate().role, 'admin')
+
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.authenticate()
+
+    def test_logout_invalidates(self):
+        self.authenticate()
+        self.token.delete()
+        with self.assertRaisesMessage(exceptions.AuthenticationFailed, 'Invalid token'):
+            self.authenticate()
+
+    def test_async_lookup(self):
+        aauthenticate = async_to_sync(self.auth.aauthenticate_credentials)
+        self.assertEqual(aauthenticate(self.key)[0].pk, self.user.pk)
+        with self.assertNumQueries(0):
+            aauthenticate(self.key)
+
+        self.token.delete()
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            aauthenticate(self.key)
+
+
+@override_settings(AUTH_TOKEN_SHARED_CACHE='default', AUTH_TOKEN_SHARED_CACHE_TTL=300)
+class SharedTokenCacheTests(CachedTokenAuthenticationTests):
+    def test_shared_cache_holds_no_credentials(self):
+        self.authenticate()
+        data = cache.get(SHARED_KEY_PREFIX + self.key)
+        self.assertEqual(data['user']['role'], 'viewer')
+        self.assertNotIn('password', data['user'])
+        self.assertNotIn(self.user.password, repr(data))
+
+    def test_shared_hit_defers_the_password(self):
+        self.authenticate()
+        token_cache.clear()
+
+        with self.assertNumQueries(0):
+            user = self.authenticate()
+        self.assertEqual((user.pk, user.email, user.role), (self.user.pk, 'viewer@example.com', 'viewer'))
+        with self.assertNumQueries(1):
+            self.assertTrue(user.check_password('viewer-password'))
+
+    def test_change_in_another_process_drops_the_local_entry(self):
+        self.authenticate()
+
+        # What the signal handlers of another worker leave behind: the row
+        # changed, the shared entry gone and the user's generation bumped
+        User.objects.filter(pk=self.user.pk).update(role='admin')
+        cache.delete(SHARED_KEY_PREFIX + self.key)
+        _bump_generation(cache, self.user.pk)
+        self.assertIsNotNone(cache.get(GENERATION_KEY_PREFIX + str(self.user.pk)))
+
+        self.assertEqual(self.authenticate().role, 'admin')
+        with self.assertNumQueries(0):
+            self.authenticate()
+
+    def test_change_during_lookup_is_not_cached(self):
+        lookup = TokenAuthentication.authenticate_credentials
+
+        def lookup_then_change(auth, key):
+            result = lookup(auth, key)
+            # Committed by another request after the row was read
+            User.objects.filter(pk=self.user.pk).update(role='admin')
+            _bump_generation(cache, self.user.pk)
+            return result
+
+        with mock.patch.object(TokenAuthentication, 'authenticate_credentials', lookup_then_change):
+            self.assertEqual(self.authenticate().role, 'viewer')
+
+        # Neither the local nor the shared entry is used again
+        self.assertEqual(self.authenticate().role, 'admin')
+        token_cache.clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.authenticate().role, 'admin')
+
+    def test_outdated_shared_entry_is_dropped(self):
+        self.authenticate()
+        User.objects.filter(pk=self.user.pk).update(role='admin')
+        _bump_generation(cache, self.user.pk)
+
+        # Another process with an empty local cache
+        token_cache.clear()
+        self.assertEqual(self.authenticate().role, 'admin')
+        self.assertEqual(cache.get(SHARED_KEY_PREFIX + self.key)['user']['role'], 'admin')
+
+        User.objects.filter(pk=self.user.pk).update(role='editor')
+        _bump_generation(cache, self.user.pk)
+        token_cache.clear()
+        aauthenticate = async_to_sync(self.auth.aauthenticate_credentials)
+        self.assertEqual(aauthenticate(self.key)[0].role, 'editor')
+
+    def test_user_change_is_invalidated_again_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.user.save()
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(cache.get(GENERATION_KEY_PREFIX + str(self.user.pk)), 2)
+
+
+class AsyncAccountViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='viewer', email='viewer@example.com', password='viewer-password', role='viewer'
+        )
+        cls.key = Token.objects.create(user=cls.user).key
+
+    def setUp(self):
+        token_cache.clear()
+        self.addCleanup(token_cache.clear)
+
+    async def login(self, body):
+        return await self.async_client.post('/api/async/users/login/', body, content_type='application/json')
+
+    async def test_me(self):
+        response = await self.async_client.get('/api/async/users/me/', headers={'Authorization': f'Token {self.key}'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()['email'], response.json()['role']), ('viewer@example.com', 'viewer'))
+
+    async def test_me_authentication_failures(self):
+        for headers in ({}, {'Authorization': 'Token not-a-token'}, {'Authorization': 'Token'}):
+            with self.subTest(headers=headers):
+                response = await self.async_client.get('/api/async/users/me/', headers=headers)
+                self.assertEqual(response.status_code, 401)
+                self.assertEqual(response.headers['WWW-Authenticate'], 'Token')
+
+    async def test_login(self):
+        response = await self.login({'email': 'viewer@example.com', 'password': 'viewer-password'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['token'], self.key)
+        self.assertEqual(response.json()['user']['email'], 'viewer@example.com')
+
+    async def test_login_failures(self):
+        response = await self.login({'email': 'viewer@example.com', 'password': 'wrong'})
+        self.assertEqual(response.status_code, 401)
+        response = await self.login({'email': 'nobody@example.com', 'password': 'viewer-password'})
+        self.assertEqual(response.status_code, 401)
+        response = await self.login({'email': 'viewer@example.com'})
+        self.assertEqual(response.status_code, 400)
+        response = await self.async_client.post('/api/async/users/login/', b'[', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        response = await self.async_client.get('/api/async/users/login/')
+        self.assertEqual(response.status_code, 405)
@@ -1,10 +1,13 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import UserViewSet
+from . import async_views
 
 router = DefaultRouter()
 router.register(r'users', UserViewSet)
 
 urlpatterns = [
+    path('async/users/me/', async_views.me, name='async-user-me'),
+    path('async/users/login/', async_views.login, name='async-user-login'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'forms.settings')
+# Tells the settings not to keep persistent database connections
+os.environ['DJANGO_ASGI_SERVER'] = '1'
 
 application = get_asgi_application()
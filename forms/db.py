@@ -0,0 +1,105 @@
+"""
+Database connection reuse and metrics.
+"""
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from .metrics import registry
+
+try:
+    from psycopg_pool import PoolTimeout, TooManyRequests
+except ImportError:  # psycopg 3 pool not installed
+    POOL_ERRORS = ()
+else:
+    POOL_ERRORS = (PoolTimeout, TooManyRequests)
+
+# Messages of PostgreSQL refusing new connections
+CONNECTION_LIMIT_MESSAGES = (
+    'too many clients already',
+    'remaining connection slots are reserved',
+)
+
+
+def configure_connection_reuse(database, conf):
+    """
+    Set how a database's connections are reused from DEFAULT_DB_CONN_MODE:
+
+    - persistent: keep each thread's connection for DEFAULT_DB_CONN_MAX_AGE
+      seconds, checked before reuse
+    - pool: psycopg 3 pool sized by the DEFAULT_DB_POOL_* settings
+      (PostgreSQL only, a connection per request elsewhere)
+    - none (or anything else): a connection per request
+
+    Under ASGI sync code runs in threads that come and go, and a persistent
+    connection is only closed by the request cycle of the thread that
+    opened it, so connections would leak: there persistent means pool.
+
+    Args:
+        database: Entry of DATABASES, updated in place
+        conf: The settings (the settings module while it is being loaded)
+
+    Returns:
+        dict: The database entry
+    """
+    mode = conf.DEFAULT_DB_CONN_MODE
+    if conf.ASGI_SERVER and mode == 'persistent':
+        mode = 'pool'
+
+    options = database.setdefault('OPTIONS', {})
+    options.pop('pool', None)
+    database['CONN_MAX_AGE'] = 0
+    database['CONN_HEALTH_CHECKS'] = False
+
+    if mode == 'persistent':
+        database['CONN_MAX_AGE'] = conf.DEFAULT_DB_CONN_MAX_AGE
+        database['CONN_HEALTH_CHECKS'] = True
+    elif mode == 'pool' and database['ENGINE'] == 'django.db.backends.postgresql':
+        options['pool'] = {
+            'min_size': conf.DEFAULT_DB_POOL_MIN_SIZE,
+            'max_size': conf.DEFAULT_DB_POOL_MAX_SIZE,
+            'timeout': conf.DEFAULT_DB_POOL_TIMEOUT,
+            'max_waiting': conf.DEFAULT_DB_POOL_MAX_WAITING,
+        }
+    return database
+
+
+@receiver(connection_created)
+def count_connection(sender, connection, **kwargs):
+    # With a pool this fires on every checkout, otherwise on every new
+    # connection to the server.
+    registry.incr('db_connections_opened', alias=connection.alias)
+
+
+def get_pool_stats():
+    """
+    Get the counters of the connection pools of this process.
+
+    Returns:
+        dict: Pool statistics (size, available, waits, timeouts...) by
+            database alias, only for aliases using a pool
+    """
+    stats = {}
+    for alias in connections:
+        # Only the PostgreSQL backend has a pool, created on first use
+        pool = getattr(connections[alias], 'pool', None)
+        if pool is not None:
+            stats[alias] = pool.get_stats()
+    return stats
+
+
+def is_connection_unavailable(exc):
+    """
+    Tell whether an exception means no database connection could be had:
+    the pool timed out or its queue was full, or the server refused the
+    connection for lack of slots.
+    """
+    while exc is not None:
+        if POOL_ERRORS and isinstance(exc, POOL_ERRORS):
+            return True
+        message = str(exc)
+        if any(text in message for text in CONNECTION_LIMIT_MESSAGES):
+            return True
+        exc = exc.__cause__ or exc.__context__
+    return False
@@ -0,0 +1,145 @@
+"""
+Per-request timing of the expensive parts of a request: database queries,
+serializers, S3 uploads and Excel exports.
+
+PerformanceMiddleware starts a RequestTimings for each request and stores
+it in a context variable; the instrumented code adds to it. Outside a
+request, or when PERFORMANCE_INSTRUMENTATION is off, the hooks only do a
+context variable lookup.
+"""
+
+import contextvars
+import functools
+import time
+
+from rest_framework import serializers
+
+_current = contextvars.ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    """Time spent per category during one request, in seconds."""
+
+    __slots__ = ('db_queries', 'db', 'serializer', 's3', 'excel')
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db = 0.0
+        self.serializer = 0.0
+        self.s3 = 0.0
+        self.excel = 0.0
+
+
+def start_request():
+    """
+    Start collecting timings for the current request.
+
+    Returns:
+        tuple: The RequestTimings and the token to pass to finish_request
+    """
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def finish_request(token):
+    _current.reset(token)
+
+
+def timed(category):
+    """
+    Decorator adding the wall time of each call to the request's timings.
+
+    Args:
+        category: RequestTimings attribute to add to ('s3', 'excel', ...)
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            timings = _current.get()
+            if timings is None:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                setattr(timings, category, getattr(timings, category) + time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def timed_iter(category, iterable):
+    """
+    Add the time spent producing each item of an iterable to the timings of
+    the current request.
+
+    For the content of streamed responses, which is produced after the view
+    returned: the request's timings are looked up now and made current again
+    while each item is produced, so database queries and timed calls made
+    by the iterable are counted as well.
+
+    Args:
+        category: RequestTimings attribute to add to ('excel', ...)
+        iterable: Iterable to wrap
+
+    Returns:
+        iterator: Iterator over the same items
+    """
+    timings = _current.get()
+    if timings is None:
+        return iter(iterable)
+    return _timed_items(timings, category, iter(iterable))
+
+
+def _timed_items(timings, category, iterator):
+    while True:
+        token = _current.set(timings)
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            setattr(timings, category, getattr(timings, category) + time.perf_counter() - start)
+            _current.reset(token)
+        yield item
+
+
+def time_query(execute, sql, params, many, context):
+    """Database execute wrapper counting queries and their time."""
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.db += time.perf_counter() - start
+        timings.db_queries += 1
+
+
+def install_query_timer(sender=None, connection=None, **kwargs):
+    """
+    Add time_query to a connection's execute wrappers (connection_created
+    receiver). The wrapper stays installed for the connection's lifetime.
+    """
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
+
+
+class TimedSerializerMixin:
+    """Count rendering a serializer's data as serializer time."""
+
+    @property
+    def data(self):
+        timings = _current.get()
+        if timings is None:
+            return super().data
+        start = time.perf_counter()
+        try:
+            return super().data
+        finally:
+            timings.serializer += time.perf_counter() - start
+
+
+class TimedListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+    """List serializer for many=True; set as Meta.list_serializer_class."""
@@ -0,0 +1,178 @@
+"""
+Process-wide performance counters and timings.
+
+Each gunicorn worker keeps its own registry; values are reset when the
+worker restarts.
+"""
+
+import bisect
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the request duration histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels, extra=()):
+    items = list(labels.items()) + list(extra)
+    if not items:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape_label(value)}"' for name, value in items) + '}'
+
+
+def _cumulative(counts):
+    total = 0
+    result = []
+    for count in counts:
+        total += count
+        result.append(total)
+    return result
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._timings = {}
+        self._histograms = {}
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def incr(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            stat = self._timings.get(key)
+            if stat is None:
+                stat = self._timings[key] = [0, 0.0, 0.0]
+            stat[0] += 1
+            stat[1] += seconds
+            stat[2] = max(stat[2], seconds)
+
+    def histogram(self, name, value, buckets=DEFAULT_BUCKETS, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            stat = self._histograms.get(key)
+            if stat is None:
+                stat = self._histograms[key] = [tuple(buckets), [0] * len(buckets), 0, 0.0]
+            index = bisect.bisect_left(stat[0], value)
+            if index < len(stat[1]):
+                stat[1][index] += 1
+            stat[2] += 1
+            stat[3] += value
+
+    @contextmanager
+    def timer(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def snapshot(self):
+        """
+        Get a copy of all recorded metrics.
+
+        Returns:
+            dict: 'counters', 'timings' and 'histograms' lists, timings in seconds
+        """
+        with self._lock:
+            counters = [
+                {'name': name, 'labels': dict(labels), 'value': value}
+                for (name, labels), value in sorted(self._counters.items())
+            ]
+            timings = [
+                {
+                    'name': name,
+                    'labels': dict(labels),
+                    'count': count,
+                    'sum': total,
+                    'max': maximum,
+                    'avg': total / count if count else 0.0,
+                }
+                for (name, labels), (count, total, maximum) in sorted(self._timings.items())
+            ]
+            histograms = [
+                {
+                    'name': name,
+                    'labels': dict(labels),
+                    'buckets': dict(zip(buckets, _cumulative(bucket_counts))),
+                    'count': count,
+                    'sum': total,
+                }
+                for (name, labels), (buckets, bucket_counts, count, total) in sorted(self._histograms.items())
+            ]
+        return {'counters': counters, 'timings': timings, 'histograms': histograms}
+
+    def render_prometheus(self, prefix='gforms_'):
+        """
+        Render all metrics in the Prometheus text exposition format.
+
+        Counters get a _total suffix, timings are exported as summaries
+        (count and sum) plus a _max gauge.
+
+        Args:
+            prefix: Prepended to every metric name
+
+        Returns:
+            str: The exposition text
+        """
+        snapshot = self.snapshot()
+        lines = []
+        declared = set()
+
+        def declare(name, kind):
+            if name not in declared:
+                declared.add(name)
+                lines.append(f'# TYPE {name} {kind}')
+
+        for counter in snapshot['counters']:
+            name = f"{prefix}{counter['name']}_total"
+            declare(name, 'counter')
+            lines.append(f"{name}{_format_labels(counter['labels'])} {counter['value']}")
+
+        # Samples of a metric must be contiguous, so the _max gauges of a
+        # timing follow all of its summary samples
+        for timing_name, group in itertools.groupby(snapshot['timings'], key=lambda t: t['name']):
+            group = list(group)
+            name = prefix + timing_name
+            declare(name, 'summary')
+            for timing in group:
+                lines.append(f"{name}_count{_format_labels(timing['labels'])} {timing['count']}")
+                lines.append(f"{name}_sum{_format_labels(timing['labels'])} {timing['sum']}")
+            declare(f'{name}_max', 'gauge')
+            for timing in group:
+                lines.append(f"{name}_max{_format_labels(timing['labels'])} {timing['max']}")
+
+        for histogram in snapshot['histograms']:
+            name = prefix + histogram['name']
+            labels = histogram['labels']
+            declare(name, 'histogram')
+            for bound, count in histogram['buckets'].items():
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {count}")
+            lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {histogram['count']}")
+            lines.append(f"{name}_count{_format_labels(labels)} {histogram['count']}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {histogram['sum']}")
+
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._timings.clear()
+            self._histograms.clear()
+
+
+registry = MetricsRegistry()
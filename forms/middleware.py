@@ -0,0 +1,210 @@
+import json
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import FileResponse, JsonResponse
+
+from formsApp.querylog import query_origin, set_query_origin
+from .db import is_connection_unavailable
+from .instrumentation import finish_request, install_query_timer, start_request
+from .metrics import registry
+
+logger = logging.getLogger('forms.performance')
+
+
+class DatabaseUnavailableMiddleware:
+    """
+    Answer 503 with Retry-After instead of a 500 when the request could not
+    get a database connection in time, so clients and the load balancer
+    back off instead of treating it as a server error.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        return await self.get_response(request)
+
+    def process_exception(self, request, exception):
+        if not is_connection_unavailable(exception):
+            return None
+
+        registry.incr('db_connection_unavailable')
+        response = JsonResponse(
+            {'detail': 'The service is busy, please retry shortly.'},
+            status=503,
+        )
+        response.headers['Retry-After'] = str(settings.DB_UNAVAILABLE_RETRY_AFTER)
+        return response
+
+
+class PerformanceMiddleware:
+    """
+    Time each request's database queries, serializers, S3 uploads and
+    Excel exports. Reports them in a Server-Timing header and one
+    structured log line per request, and aggregates them per view in the
+    metrics registry (exported at /metrics).
+
+    The content of a streamed response is produced after the view returns,
+    so its Server-Timing header only covers the view; its metrics and log
+    line are recorded once the content has been sent.
+
+    Enabled by PERFORMANCE_INSTRUMENTATION; otherwise Django drops the
+    middleware at startup.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.PERFORMANCE_INSTRUMENTATION:
+            raise MiddlewareNotUsed()
+
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+        connection_created.connect(install_query_timer, dispatch_uid='forms.instrumentation')
+        for connection in connections.all(initialized_only=True):
+            install_query_timer(connection=connection)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        timings, token = start_request()
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            finish_request(token)
+        return self.finish(request, response, timings, start)
+
+    async def __acall__(self, request):
+        timings, token = start_request()
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            finish_request(token)
+        return self.finish(request, response, timings, start)
+
+    def finish(self, request, response, timings, start):
+        duration = time.perf_counter() - start
+        self.set_server_timing(response, timings, duration)
+        # Files are sent as they are (keeping the server's sendfile support);
+        # reading them is not instrumented anyway
+        if not response.streaming or isinstance(response, FileResponse):
+            self.record(request, response, timings, duration)
+        elif response.is_async:
+            response.streaming_content = self.arecord_after(
+                response.streaming_content, request, response, timings, start
+            )
+        else:
+            response.streaming_content = self.record_after(
+                response.streaming_content, request, response, timings, start
+            )
+        return response
+
+    def record_after(self, content, request, response, timings, start):
+        try:
+            yield from content
+        finally:
+            self.record(request, response, timings, time.perf_counter() - start)
+
+    async def arecord_after(self, content, request, response, timings, start):
+        try:
+            async for chunk in content:
+                yield chunk
+        finally:
+            self.record(request, response, timings, time.perf_counter() - start)
+
+    @staticmethod
+    def get_metrics(timings, duration):
+        metrics = [('db', timings.db, f'{timings.db_queries} queries')]
+        for name in ('serializer', 's3', 'excel'):
+            seconds = getattr(timings, name)
+            if seconds:
+                metrics.append((name, seconds, None))
+        metrics.append(('total', duration, None))
+        return metrics
+
+    def set_server_timing(self, response, timings, duration):
+        response.headers['Server-Timing'] = ', '.join(
+            f'{name};dur={seconds * 1000:.1f}' + (f';desc="{desc}"' if desc else '')
+            for name, seconds, desc in self.get_metrics(timings, duration)
+        )
+
+    def record(self, request, response, timings, duration):
+        match = request.resolver_match
+        view = match.view_name if match else 'unmatched'
+
+        metrics = self.get_metrics(timings, duration)
+
+        registry.incr('http_requests', view=view, method=request.method, status=response.status_code)
+        registry.histogram('http_request_duration_seconds', duration, view=view)
+        registry.incr('http_request_db_queries', timings.db_queries, view=view)
+        for name, seconds, _ in metrics[:-1]:
+            registry.observe(f'http_request_{name}_seconds', seconds, view=view)
+
+        fields = {
+            'method': request.method,
+            'path': request.path,
+            'view': view,
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 1),
+            'db_queries': timings.db_queries,
+        }
+        fields.update(
+            (f'{name}_ms', round(seconds * 1000, 1)) for name, seconds, _ in metrics[:-1]
+        )
+        logger.info(json.dumps(fields), extra={'performance': fields})
+
+
+class SlowQueryLogMiddleware:
+    """
+    Attribute slow queries (see formsApp.querylog) to the URL name of the
+    view that ran them. Only installed while SLOW_QUERY_THRESHOLD_MS is set.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.SLOW_QUERY_THRESHOLD_MS:
+            raise MiddlewareNotUsed()
+
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        with query_origin(request.path):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with query_origin(request.path):
+            return await self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        set_query_origin(request.resolver_match.view_name)
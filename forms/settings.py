@@ -11,8 +11,11 @@ https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
 import os
+import sys
 from pathlib import Path
 
+from .db import configure_connection_reuse
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -49,7 +52,10 @@ INSTALLED_APPS += [
 ]
 
 MIDDLEWARE = [
+    'forms.middleware.PerformanceMiddleware',
+    'forms.middleware.SlowQueryLogMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'forms.middleware.DatabaseUnavailableMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -92,6 +98,32 @@ DATABASES = {
     }
 }
 
+# Connection reuse, one of:
+#   none        open a connection per request
+#   persistent  keep each worker's connection for DEFAULT_DB_CONN_MAX_AGE
+#               seconds, checked before reuse
+#   pool        psycopg 3 connection pool (PostgreSQL only); sizes are per
+#               worker process, so workers x max size must stay below the
+#               server's max_connections
+DEFAULT_DB_CONN_MODE = os.environ.get("DEFAULT_DB_CONN_MODE", default="persistent")
+DEFAULT_DB_CONN_MAX_AGE = int(os.environ.get("DEFAULT_DB_CONN_MAX_AGE", default="600"))
+DEFAULT_DB_POOL_MIN_SIZE = int(os.environ.get("DEFAULT_DB_POOL_MIN_SIZE", default="2"))
+DEFAULT_DB_POOL_MAX_SIZE = int(os.environ.get("DEFAULT_DB_POOL_MAX_SIZE", default="4"))
+# Seconds a request waits for a free connection before failing
+DEFAULT_DB_POOL_TIMEOUT = float(os.environ.get("DEFAULT_DB_POOL_TIMEOUT", default="5"))
+# Requests allowed to queue for a connection (0 = unlimited)
+DEFAULT_DB_POOL_MAX_WAITING = int(os.environ.get("DEFAULT_DB_POOL_MAX_WAITING", default="0"))
+
+# Set by forms/asgi.py; persistent connections leak under ASGI, see
+# forms.db.configure_connection_reuse
+ASGI_SERVER = os.environ.get("DJANGO_ASGI_SERVER") == "1"
+
+configure_connection_reuse(DATABASES['default'], sys.modules[__name__])
+
+# Retry-After (seconds) sent with the 503 returned when no database
+# connection is available
+DB_UNAVAILABLE_RETRY_AFTER = int(os.environ.get("DB_UNAVAILABLE_RETRY_AFTER", default="5"))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -122,7 +154,7 @@ AUTHENTICATION_BACKENDS = [
 # REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'accounts.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -173,3 +205,131 @@ MEDIA_ROOT = BASE_DIR / 'media'
 # File upload settings
 FILE_UPLOAD_MAX_MEMORY_SIZE = 10485760  # 10MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10485760  # 10MB
+
+# Export settings
+EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', '2000'))
+EXCEL_EXPORT_STREAMING = os.environ.get('EXCEL_EXPORT_STREAMING', 'True') == 'True'
+
+# Response listing settings
+RESPONSES_PAGE_SIZE = int(os.environ.get('RESPONSES_PAGE_SIZE', '100'))
+RESPONSES_MAX_PAGE_SIZE = int(os.environ.get('RESPONSES_MAX_PAGE_SIZE', '1000'))
+
+# Number of compiled form schemas kept per worker process
+FORM_VALIDATOR_CACHE_SIZE = int(os.environ.get('FORM_VALIDATOR_CACHE_SIZE', '256'))
+
+# Background export jobs
+EXPORT_ROOT = Path(os.environ.get('EXPORT_ROOT', BASE_DIR / 'exports'))
+EXPORT_WORKER_PROCESSES = int(os.environ.get('EXPORT_WORKER_PROCESSES', '2'))
+EXPORT_JOB_TIMEOUT = int(os.environ.get('EXPORT_JOB_TIMEOUT', '3600'))  # seconds
+# Jobs whose worker process died are retried until they were claimed this often
+EXPORT_JOB_MAX_ATTEMPTS = int(os.environ.get('EXPORT_JOB_MAX_ATTEMPTS', '3'))
+# Finished jobs and their files are deleted after this many seconds (0 keeps them)
+EXPORT_JOB_RETENTION_SECONDS = int(os.environ.get('EXPORT_JOB_RETENTION_SECONDS', str(7 * 24 * 3600)))
+# Delta exports (?since=) stop at responses at least this old, so a response
+# committed late with an earlier submitted_at is never skipped
+EXPORT_DELTA_SETTLE_SECONDS = int(os.environ.get('EXPORT_DELTA_SETTLE_SECONDS', '60'))
+
+# Sharded exports (export_sharded command): responses per part and the
+# number of processes rendering parts in parallel
+EXPORT_SHARD_SIZE = int(os.environ.get('EXPORT_SHARD_SIZE', '250000'))
+EXPORT_SHARD_PROCESSES = int(os.environ.get('EXPORT_SHARD_PROCESSES', '4'))
+
+# Most forms accepted by one POST /api/forms/export-bundle/
+EXPORT_BUNDLE_MAX_FORMS = int(os.environ.get('EXPORT_BUNDLE_MAX_FORMS', '100'))
+
+# Disk cache of finished exports under EXPORT_ROOT/cache (0 disables it).
+# With EXPORT_ACCEL_REDIRECT_LOCATION set to an nginx internal location
+# aliasing EXPORT_ROOT, export files are sent by nginx via X-Accel-Redirect.
+EXPORT_CACHE_MAX_BYTES = int(os.environ.get('EXPORT_CACHE_MAX_BYTES', str(1024 * 1024 * 1024)))
+EXPORT_ACCEL_REDIRECT_LOCATION = os.environ.get('EXPORT_ACCEL_REDIRECT_LOCATION', '')
+
+# Bulk submission settings
+BULK_SUBMIT_MAX_ITEMS = int(os.environ.get('BULK_SUBMIT_MAX_ITEMS', '5000'))
+BULK_SUBMIT_BATCH_SIZE = int(os.environ.get('BULK_SUBMIT_BATCH_SIZE', '500'))
+
+# S3 client and transfer settings
+# Set AWS_S3_ENDPOINT_URL to use a local S3 stand-in (moto server, MinIO)
+AWS_S3_ENDPOINT_URL = os.environ.get('AWS_S3_ENDPOINT_URL', '')
+AWS_S3_MAX_POOL_CONNECTIONS = int(os.environ.get('AWS_S3_MAX_POOL_CONNECTIONS', '20'))
+AWS_S3_MULTIPART_THRESHOLD = int(os.environ.get('AWS_S3_MULTIPART_THRESHOLD', str(8 * 1024 * 1024)))
+AWS_S3_MULTIPART_CHUNKSIZE = int(os.environ.get('AWS_S3_MULTIPART_CHUNKSIZE', str(8 * 1024 * 1024)))
+AWS_S3_MAX_CONCURRENCY = int(os.environ.get('AWS_S3_MAX_CONCURRENCY', '4'))
+S3_UPLOAD_MAX_WORKERS = int(os.environ.get('S3_UPLOAD_MAX_WORKERS', '8'))
+
+# Direct (presigned) uploads
+PRESIGNED_UPLOAD_EXPIRES = int(os.environ.get('PRESIGNED_UPLOAD_EXPIRES', '900'))  # seconds
+PRESIGNED_UPLOAD_MAX_SIZE = int(os.environ.get('PRESIGNED_UPLOAD_MAX_SIZE', str(10 * 1024 * 1024)))
+
+# Stream the files of multipart submissions to storage as they arrive, one
+# multipart part at a time (at least 5MB), instead of buffering them in
+# memory or a temporary file first
+S3_STREAMING_UPLOADS = os.environ.get('S3_STREAMING_UPLOADS', 'True') == 'True'
+S3_STREAMING_UPLOAD_PART_SIZE = int(os.environ.get('S3_STREAMING_UPLOAD_PART_SIZE', str(5 * 1024 * 1024)))
+S3_STREAMING_UPLOAD_MAX_SIZE = int(os.environ.get('S3_STREAMING_UPLOAD_MAX_SIZE', str(100 * 1024 * 1024)))
+
+# Token authentication cache
+# Set AUTH_TOKEN_SHARED_CACHE to a cache alias (e.g. 'default' when it is
+# Redis) to share token lookups, and their invalidation, between worker
+# processes.
+AUTH_TOKEN_CACHE_SIZE = int(os.environ.get('AUTH_TOKEN_CACHE_SIZE', '10000'))
+AUTH_TOKEN_CACHE_TTL = int(os.environ.get('AUTH_TOKEN_CACHE_TTL', '30'))  # seconds
+AUTH_TOKEN_SHARED_CACHE = os.environ.get('AUTH_TOKEN_SHARED_CACHE', '')
+AUTH_TOKEN_SHARED_CACHE_TTL = int(os.environ.get('AUTH_TOKEN_SHARED_CACHE_TTL', '300'))  # seconds
+
+# Seconds nginx may serve conditional GET responses (form and response
+# listings) from its micro-cache; 0 disables it
+API_MICROCACHE_SECONDS = int(os.environ.get('API_MICROCACHE_SECONDS', '5'))
+
+# Cache backend: per-process local memory by default, Redis when REDIS_URL
+# is set (shared between worker processes and nodes)
+REDIS_URL = os.environ.get('REDIS_URL', '')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Serialized form cache
+FORM_CACHE_ALIAS = os.environ.get('FORM_CACHE_ALIAS', 'default')
+FORM_CACHE_TIMEOUT = int(os.environ.get('FORM_CACHE_TIMEOUT', '300'))  # seconds
+FORM_CACHE_LOCK_TIMEOUT = int(os.environ.get('FORM_CACHE_LOCK_TIMEOUT', '10'))  # seconds
+FORM_CACHE_LOCK_WAIT = float(os.environ.get('FORM_CACHE_LOCK_WAIT', '2'))  # seconds
+
+# Per-request performance instrumentation: Server-Timing headers, one
+# structured log line per request and per-view Prometheus metrics. The
+# /metrics endpoint answers only requests bearing PROMETHEUS_METRICS_TOKEN
+# and is disabled while it is empty.
+PERFORMANCE_INSTRUMENTATION = os.environ.get('PERFORMANCE_INSTRUMENTATION', 'False') == 'True'
+PROMETHEUS_METRICS_TOKEN = os.environ.get('PROMETHEUS_METRICS_TOKEN', '')
+
+# Slow query log: queries slower than the threshold are saved to the
+# SlowQuery table (0 disables the log), a sample of them with their plan.
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', '0'))
+SLOW_QUERY_EXPLAIN_SAMPLE_RATE = float(os.environ.get('SLOW_QUERY_EXPLAIN_SAMPLE_RATE', '0.1'))
+SLOW_QUERY_LOG_SIZE = int(os.environ.get('SLOW_QUERY_LOG_SIZE', '1000'))  # rows kept
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'forms.performance': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
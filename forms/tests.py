@@ -0,0 +1,196 @@
+from unittest import mock
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import OperationalError
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from accounts.models import User
+
+from .db import POOL_ERRORS, configure_connection_reuse
+from .metrics import MetricsRegistry, registry
+from .middleware import DatabaseUnavailableMiddleware, PerformanceMiddleware
+
+POSTGRESQL = 'django.db.backends.postgresql'
+
+
+class MetricsRegistryTests(TestCase):
+    def test_render_prometheus(self):
+        metrics = MetricsRegistry()
+        metrics.incr('http_requests', view='form-list', status=200)
+        metrics.incr('http_requests', 2, view='form-list', status=200)
+        metrics.observe('http_request_db_seconds', 0.25, view='form-list')
+        metrics.observe('http_request_db_seconds', 0.75, view='form-list')
+        metrics.histogram('http_request_duration_seconds', 0.3, buckets=(0.1, 0.5), view='a"b')
+
+        self.assertEqual(metrics.render_prometheus(), '\n'.join([
+            '# TYPE gforms_http_requests_total counter',
+            'gforms_http_requests_total{status="200",view="form-list"} 3',
+            '# TYPE gforms_http_request_db_seconds summary',
+            'gforms_http_request_db_seconds_count{view="form-list"} 2',
+            'gforms_http_request_db_seconds_sum{view="form-list"} 1.0',
+            '# TYPE gforms_http_request_db_seconds_max gauge',
+            'gforms_http_request_db_seconds_max{view="form-list"} 0.75',
+            '# TYPE gforms_http_request_duration_seconds histogram',
+            'gforms_http_request_duration_seconds_bucket{view="a\\"b",le="0.1"} 0',
+            'gforms_http_request_duration_seconds_bucket{view="a\\"b",le="0.5"} 1',
+            'gforms_http_request_duration_seconds_bucket{view="a\\"b",le="+Inf"} 1',
+            'gforms_http_request_duration_seconds_count{view="a\\"b"} 1',
+            'gforms_http_request_duration_seconds_sum{view="a\\"b"} 0.3',
+        ]) + '\n')
+
+    def test_empty_registry(self):
+        self.assertEqual(MetricsRegistry().render_prometheus(), '\n')
+
+
+class PerformanceMiddlewareTests(TestCase):
+    def setUp(self):
+        registry.reset()
+        self.addCleanup(registry.reset)
+
+    @override_settings(PERFORMANCE_INSTRUMENTATION=False)
+    def test_not_used_when_disabled(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            PerformanceMiddleware(lambda request: HttpResponse())
+
+    @override_settings(PERFORMANCE_INSTRUMENTATION=True)
+    def test_server_timing_and_metrics(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username='u', email='u@example.com', password='x'))
+        with self.assertLogs('forms.performance') as logs:
+            response = client.get('/api/forms/')
+        self.assertEqual(response.status_code, 200)
+
+        parts = [part.split(';')[0] for part in response.headers['Server-Timing'].split(', ')]
+        self.assertEqual((parts[0], parts[-1]), ('db', 'total'))
+        self.assertIn('serializer', parts)
+        self.assertRegex(response.headers['Server-Timing'], r'^db;dur=[0-9.]+;desc="[0-9]+ queries"')
+
+        self.assertEqual(logs.records[0].performance['view'], 'form-list')
+        counters = {
+            (counter['name'], counter['labels'].get('view')): counter['value']
+            for counter in registry.snapshot()['counters']
+        }
+        self.assertEqual(counters[('http_requests', 'form-list')], 1)
+        self.assertGreater(counters[('http_request_db_queries', 'form-list')], 0)
+
+    @override_settings(PERFORMANCE_INSTRUMENTATION=True)
+    def test_unmatched_request(self):
+        middleware = PerformanceMiddleware(lambda request: HttpResponse(status=404))
+        with self.assertLogs('forms.performance'):
+            response = middleware(RequestFactory().get('/nowhere/'))
+        self.assertIn('total;dur=', response.headers['Server-Timing'])
+        requests = [counter for counter in registry.snapshot()['counters'] if counter['name'] == 'http_requests']
+        self.assertEqual(requests[0]['labels'], {'view': 'unmatched', 'method': 'GET', 'status': 404})
+
+
+class PrometheusMetricsViewTests(TestCase):
+    @override_settings(PROMETHEUS_METRICS_TOKEN='')
+    def test_disabled_without_a_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
+        self.assertEqual(self.client.get('/metrics', headers={'Authorization': 'Bearer '}).status_code, 404)
+
+    @override_settings(PROMETHEUS_METRICS_TOKEN='scrape-token')
+    def test_bearer_token(self):
+        for authorization in ('', 'Bearer wrong', 'scrape-token', 'Bearer scrape-token '):
+            with self.subTest(authorization=authorization):
+                response = self.client.get('/metrics', headers={'Authorization': authorization})
+                self.assertEqual(response.status_code, 401)
+
+        registry.incr('test_scrapes')
+        self.addCleanup(registry.reset)
+        response = self.client.get('/metrics', headers={'Authorization': 'Bearer scrape-token'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        self.assertIn(b'gforms_test_scrapes_total 1', response.content)
+        response = self.client.post('/metrics', headers={'Authorization': 'Bearer scrape-token'})
+        self.assertEqual(response.status_code, 405)
+
+
+@override_settings(
+    ASGI_SERVER=False,
+    DEFAULT_DB_CONN_MAX_AGE=300,
+    DEFAULT_DB_POOL_MIN_SIZE=1,
+    DEFAULT_DB_POOL_MAX_SIZE=8,
+    DEFAULT_DB_POOL_TIMEOUT=2.5,
+    DEFAULT_DB_POOL_MAX_WAITING=10,
+)
+class ConnectionReuseTests(SimpleTestCase):
+    def configure(self, engine=POSTGRESQL, **options):
+        return configure_connection_reuse({'ENGINE': engine, 'OPTIONS': options}, settings)
+
+    @override_settings(DEFAULT_DB_CONN_MODE='persistent')
+    def test_persistent(self):
+        database = self.configure()
+        self.assertEqual((database['CONN_MAX_AGE'], database['CONN_HEALTH_CHECKS']), (300, True))
+        self.assertEqual(database['OPTIONS'], {})
+
+    @override_settings(DEFAULT_DB_CONN_MODE='pool')
+    def test_pool(self):
+        database = self.configure(sslmode='require')
+        self.assertEqual((database['CONN_MAX_AGE'], database['CONN_HEALTH_CHECKS']), (0, False))
+        self.assertEqual(database['OPTIONS'], {
+            'sslmode': 'require',
+            'pool': {'min_size': 1, 'max_size': 8, 'timeout': 2.5, 'max_waiting': 10},
+        })
+
+        # No pool outside PostgreSQL
+        database = self.configure('django.db.backends.sqlite3')
+        self.assertEqual((database['CONN_MAX_AGE'], database['OPTIONS']), (0, {}))
+
+    @override_settings(DEFAULT_DB_CONN_MODE='none')
+    def test_none(self):
+        database = self.configure(pool=True)
+        self.assertEqual((database['CONN_MAX_AGE'], database['CONN_HEALTH_CHECKS']), (0, False))
+        self.assertEqual(database['OPTIONS'], {})
+
+    @override_settings(DEFAULT_DB_CONN_MODE='persistent', ASGI_SERVER=True)
+    def test_persistent_means_pool_under_asgi(self):
+        self.assertEqual(self.configure()['CONN_MAX_AGE'], 0)
+        self.assertIn('pool', self.configure()['OPTIONS'])
+        self.assertEqual(self.configure('django.db.backends.sqlite3')['CONN_MAX_AGE'], 0)
+
+
+@override_settings(DB_UNAVAILABLE_RETRY_AFTER=7)
+class DatabaseUnavailableMiddlewareTests(TestCase):
+    def setUp(self):
+        registry.reset()
+        self.addCleanup(registry.reset)
+        self.middleware = DatabaseUnavailableMiddleware(lambda request: HttpResponse())
+        self.request = RequestFactory().get('/api/forms/')
+
+    def assertUnavailable(self, response):
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers['Retry-After'], '7')
+
+    def test_connection_limit(self):
+        try:
+            try:
+                raise OperationalError('FATAL: sorry, too many clients already')
+            except OperationalError:
+                raise RuntimeError('while handling the request')
+        except RuntimeError as exc:
+            self.assertUnavailable(self.middleware.process_exception(self.request, exc))
+        self.assertEqual(registry.snapshot()['counters'][0]['name'], 'db_connection_unavailable')
+
+    def test_pool_timeout(self):
+        if not POOL_ERRORS:
+            self.skipTest("psycopg_pool is not installed")
+        error = OperationalError('could not get a connection')
+        error.__cause__ = POOL_ERRORS[0]('couldn\'t get a connection after 5.00 sec')
+        self.assertUnavailable(self.middleware.process_exception(self.request, error))
+
+    def test_other_errors_are_left_alone(self):
+        self.assertIsNone(self.middleware.process_exception(self.request, OperationalError('deadlock detected')))
+        self.assertEqual(registry.snapshot()['counters'], [])
+
+    def test_response_of_a_view(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username='u', email='u@example.com', password='x'))
+        error = OperationalError('remaining connection slots are reserved for roles with the SUPERUSER attribute')
+        with mock.patch('formsApp.viewsets.FormViewSet.list', side_effect=error):
+            response = client.get('/api/forms/')
+        self.assertUnavailable(response)
+        self.assertEqual(response.json(), {'detail': 'The service is busy, please retry shortly.'})
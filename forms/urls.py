@@ -17,8 +17,11 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import include, path
 
+from .views import prometheus_metrics
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', prometheus_metrics, name='prometheus-metrics'),
     path('api/', include('accounts.urls')),
     path('api/', include('formsApp.urls')),
 ]
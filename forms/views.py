@@ -0,0 +1,28 @@
+import hmac
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.views.decorators.http import require_GET
+
+from .metrics import registry
+
+
+@require_GET
+def prometheus_metrics(request):
+    """
+    Metrics of the worker serving the request in the Prometheus text format.
+
+    Scrapers authenticate with "Authorization: Bearer <PROMETHEUS_METRICS_TOKEN>".
+    """
+    token = settings.PROMETHEUS_METRICS_TOKEN
+    if not token:
+        raise Http404()
+
+    expected = f'Bearer {token}'
+    if not hmac.compare_digest(request.headers.get('Authorization', '').encode(), expected.encode()):
+        return HttpResponse('Unauthorized\n', status=401, content_type='text/plain')
+
+    return HttpResponse(
+        registry.render_prometheus(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
@@ -1,13 +1,14 @@
 from django.contrib import admin
-from .models import Form, FormResponse
+from .models import Form, FormResponse, FormAggregate, ExportJob, SlowQuery
+from .aggregates import collect_deleted_responses, remove_deleted_responses
 
 
 @admin.register(Form)
 class FormAdmin(admin.ModelAdmin):
-    list_display = ['name', 'created_by', 'created_at']
+    list_display = ['name', 'created_by', 'response_count', 'last_submitted_at', 'created_at']
     list_filter = ['created_at', 'created_by']
     search_fields = ['name', 'description']
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = ['created_at', 'updated_at', 'response_count', 'last_submitted_at']
 
 
 @admin.register(FormResponse)
@@ -16,3 +17,50 @@ class FormResponseAdmin(admin.ModelAdmin):
     list_filter = ['submitted_at', 'form']
     search_fields = ['user__email', 'form__name']
     readonly_fields = ['submitted_at']
+    
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        remove_deleted_responses({obj.form_id: [(obj.response_data, obj.submitted_at)]})
+    
+    def delete_queryset(self, request, queryset):
+        deleted = collect_deleted_responses(queryset)
+        super().delete_queryset(request, queryset)
+        remove_deleted_responses(deleted)
+
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ['form', 'format', 'status', 'row_count', 'requested_by', 'created_at', 'finished_at']
+    list_filter = ['status', 'format', 'created_at']
+    search_fields = ['form__name', 'requested_by__email']
+    readonly_fields = ['snapshot_key', 'created_at', 'started_at', 'finished_at']
+
+
+@admin.register(FormAggregate)
+class FormAggregateAdmin(admin.ModelAdmin):
+    list_display = ['form', 'kind', 'field_name', 'key', 'count', 'total', 'minimum', 'maximum']
+    list_filter = ['kind', 'form']
+    search_fields = ['form__name', 'field_name', 'key']
+
+
+@admin.register(SlowQuery)
+class SlowQueryAdmin(admin.ModelAdmin):
+    list_display = ['recorded_at', 'duration_ms', 'origin', 'alias', 'short_sql', 'has_plan']
+    list_filter = ['origin', 'alias', 'recorded_at']
+    search_fields = ['origin', 'sql']
+    readonly_fields = ['recorded_at', 'duration_ms', 'alias', 'origin', 'sql', 'params', 'plan']
+    
+    @admin.display(description='SQL')
+    def short_sql(self, obj):
+        return obj.sql[:120]
+    
+    @admin.display(boolean=True, description='Plan')
+    def has_plan(self, obj):
+        return bool(obj.plan)
+    
+    # Entries are only written by the slow query log
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,384 @@
+"""
+Response counters and per-field response aggregates.
+
+Form.response_count/last_submitted_at and the FormAggregate rows are
+updated in the same transaction as every response insert, so listings and
+summaries never have to scan the responses table. Deleted responses are
+subtracted again (see collect_deleted_responses); run the
+rebuild_form_aggregates command to recompute the per-field aggregates of a
+form from scratch.
+"""
+
+import math
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, Max, Min, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest, Least
+from django.utils import timezone
+
+from .filters import get_field_expression
+from .models import Form, FormAggregate, FormResponse
+
+OPTION_FIELD_TYPES = ('select', 'radio', 'checkbox')
+KEY_MAX_LENGTH = 255
+
+
+def _option_keys(value):
+    if value is None or value == '':
+        return []
+    if isinstance(value, list):
+        return [str(item)[:KEY_MAX_LENGTH] for item in value if item is not None and item != '']
+    if isinstance(value, bool):
+        return ['true' if value else 'false']
+    return [str(value)[:KEY_MAX_LENGTH]]
+
+
+def _number(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return None
+    value = float(value)
+    return value if math.isfinite(value) else None
+
+
+class AggregateDeltas:
+    """Aggregate changes collected from a batch of responses."""
+
+    def __init__(self, schema):
+        fields = schema.get('fields', []) if isinstance(schema, dict) else []
+        self.option_fields = [field.get('name') for field in fields if field.get('type') in OPTION_FIELD_TYPES]
+        self.number_fields = [field.get('name') for field in fields if field.get('type') == 'number']
+        self.entries = {}
+
+    def _entry(self, kind, field_name, key):
+        entry = self.entries.get((kind, field_name, key))
+        if entry is None:
+            entry = self.entries[(kind, field_name, key)] = [0, None, None, None]
+        return entry
+
+    def add(self, response_data, submitted_at):
+        response_data = response_data if isinstance(response_data, dict) else {}
+
+        day = timezone.localdate(submitted_at) if timezone.is_aware(submitted_at) else submitted_at.date()
+        self._entry('day', '', day.isoformat())[0] += 1
+
+        for field_name in self.option_fields:
+            for key in _option_keys(response_data.get(field_name)):
+                self._entry('option', field_name, key)[0] += 1
+
+        for field_name in self.number_fields:
+            number = _number(response_data.get(field_name))
+            if number is None:
+                continue
+            entry = self._entry('number', field_name, '')
+            entry[0] += 1
+            entry[1] = number if entry[1] is None else entry[1] + number
+            entry[2] = number if entry[2] is None else min(entry[2], number)
+            entry[3] = number if entry[3] is None else max(entry[3], number)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+def increment_response_counters(form, responses):
+    """
+    Add newly inserted responses to the form's counters.
+
+    Args:
+        form: Form model instance
+        responses: Saved FormResponse objects of the form
+    """
+    if not responses:
+        return
+
+    newest = max(response.submitted_at for response in responses)
+    Form.objects.filter(pk=form.pk).update(
+        response_count=F('response_count') + len(responses),
+        last_submitted_at=Greatest(Coalesce(F('last_submitted_at'), Value(newest)), Value(newest)),
+    )
+
+
+def _newest_submission():
+    return Subquery(
+        FormResponse.objects.filter(form=OuterRef('pk')).order_by('-submitted_at').values('submitted_at')[:1]
+    )
+
+
+def decrement_response_counters(counts):
+    """
+    Remove deleted responses from the counters of their forms.
+
+    Args:
+        counts: Dict mapping form IDs to the number of deleted responses
+    """
+    for form_id, count in counts.items():
+        Form.objects.filter(pk=form_id).update(
+            response_count=Greatest(F('response_count') - count, Value(0)),
+            last_submitted_at=_newest_submission(),
+        )
+
+
+def collect_deleted_responses(responses, chunk_size=2000):
+    """
+    Read what remove_deleted_responses needs of responses about to be deleted.
+
+    Args:
+        responses: QuerySet of FormResponse objects
+        chunk_size: Number of rows fetched from the database per round trip
+
+    Returns:
+        dict: Form IDs mapped to lists of (response_data, submitted_at)
+    """
+    deleted = {}
+    rows = responses.order_by().values_list('form', 'response_data', 'submitted_at').iterator(chunk_size=chunk_size)
+    for form_id, response_data, submitted_at in rows:
+        deleted.setdefault(form_id, []).append((response_data, submitted_at))
+    return deleted
+
+
+def remove_deleted_responses(deleted):
+    """
+    Remove deleted responses from the counters and aggregates of their forms.
+
+    Args:
+        deleted: Dict from collect_deleted_responses, read before the delete
+    """
+    decrement_response_counters({form_id: len(rows) for form_id, rows in deleted.items()})
+    # Aggregates of deleted forms went with them
+    for form in Form.objects.filter(pk__in=deleted).only('id', 'schema'):
+        remove_response_aggregates(form, deleted[form.pk])
+
+
+def reconcile_response_counters(forms):
+    """
+    Recompute the counters of forms whose stored values have drifted.
+
+    Args:
+        forms: QuerySet of Form objects
+
+    Returns:
+        int: Number of forms corrected
+    """
+    responses = FormResponse.objects.filter(form=OuterRef('pk')).order_by()
+    actual = forms.annotate(
+        actual_count=Coalesce(
+            Subquery(responses.values('form').annotate(n=Count('id')).values('n')),
+            Value(0),
+        ),
+        actual_last=_newest_submission(),
+    )
+    drifted = actual.filter(
+        ~Q(response_count=F('actual_count'))
+        | ~Q(last_submitted_at=F('actual_last'))
+        | Q(last_submitted_at__isnull=True, actual_last__isnull=False)
+        | Q(last_submitted_at__isnull=False, actual_last__isnull=True)
+    ).values_list('id', 'actual_count', 'actual_last')
+
+    corrected = 0
+    for form_id, count, last_submitted_at in drifted:
+        Form.objects.filter(pk=form_id).update(response_count=count, last_submitted_at=last_submitted_at)
+        corrected += 1
+    return corrected
+
+
+def _increment(form, kind, field_name, key, count, total, minimum, maximum):
+    updates = {'count': F('count') + count}
+    if kind == 'number':
+        updates['total'] = F('total') + total
+        updates['minimum'] = Least(F('minimum'), Value(minimum))
+        updates['maximum'] = Greatest(F('maximum'), Value(maximum))
+
+    return FormAggregate.objects.filter(
+        form=form, kind=kind, field_name=field_name, key=key
+    ).update(**updates)
+
+
+AGGREGATE_COLUMNS = ('form_id', 'kind', 'field_name', 'key', 'count', 'total', 'minimum', 'maximum')
+
+
+def _upsert_aggregates(form, entries):
+    # One INSERT ... ON CONFLICT DO UPDATE per batch instead of an UPDATE
+    # (and maybe an INSERT) per row, so the rows stay locked only briefly
+    table = connection.ops.quote_name(FormAggregate._meta.db_table)
+    columns = [connection.ops.quote_name(column) for column in AGGREGATE_COLUMNS]
+    count, total, minimum, maximum = columns[4:]
+    least, greatest = ('LEAST', 'GREATEST') if connection.vendor == 'postgresql' else ('MIN', 'MAX')
+    placeholders = '(' + ', '.join(['%s'] * len(columns)) + ')'
+    batch_size = connection.ops.bulk_batch_size(AGGREGATE_COLUMNS, entries) or len(entries)
+
+    with connection.cursor() as cursor:
+        for start in range(0, len(entries), batch_size):
+            batch = entries[start:start + batch_size]
+            cursor.execute(
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES {', '.join([placeholders] * len(batch))} "
+                f"ON CONFLICT ({', '.join(columns[:4])}) DO UPDATE SET "
+                f"{count} = {table}.{count} + EXCLUDED.{count}, "
+                f"{total} = {table}.{total} + EXCLUDED.{total}, "
+                f"{minimum} = {least}({table}.{minimum}, EXCLUDED.{minimum}), "
+                f"{maximum} = {greatest}({table}.{maximum}, EXCLUDED.{maximum})",
+                [
+                    value
+                    for (kind, field_name, key), values in batch
+                    for value in (form.pk, kind, field_name, key, *values)
+                ],
+            )
+
+
+def apply_response_aggregates(form, responses):
+    """
+    Add newly inserted responses to the form's aggregates.
+
+    Must be called inside the transaction that inserts the responses.
+    Rows are written in key order, so concurrent submissions to the same
+    form lock them in the same order and cannot deadlock.
+
+    Args:
+        form: Form model instance
+        responses: Saved FormResponse objects of the form
+    """
+    deltas = AggregateDeltas(form.schema)
+    for response in responses:
+        deltas.add(response.response_data, response.submitted_at)
+    entries = sorted(deltas.entries.items())
+
+    if connection.features.supports_update_conflicts_with_target:
+        _upsert_aggregates(form, entries)
+        return
+
+    for (kind, field_name, key), (count, total, minimum, maximum) in entries:
+        if _increment(form, kind, field_name, key, count, total, minimum, maximum):
+            continue
+        try:
+            with transaction.atomic():
+                FormAggregate.objects.create(
+                    form=form, kind=kind, field_name=field_name, key=key,
+                    count=count, total=total, minimum=minimum, maximum=maximum,
+                )
+        except IntegrityError:
+            # A concurrent submission created the row first
+            _increment(form, kind, field_name, key, count, total, minimum, maximum)
+
+
+def remove_response_aggregates(form, responses):
+    """
+    Subtract deleted responses from the form's aggregates.
+
+    Counts and sums are decreased in place. The minimum and maximum of a
+    number field are recomputed from the remaining responses when a deleted
+    response held one of them. Rows left with a count of 0 are removed.
+
+    Args:
+        form: Form model instance
+        responses: (response_data, submitted_at) pairs of the deleted responses
+    """
+    deltas = AggregateDeltas(form.schema)
+    for response_data, submitted_at in responses:
+        deltas.add(response_data, submitted_at)
+
+    with transaction.atomic():
+        # Key order, like apply_response_aggregates, so the locks are taken
+        # in the same order
+        for (kind, field_name, key), (count, total, minimum, maximum) in sorted(deltas.entries.items()):
+            rows = FormAggregate.objects.filter(form=form, kind=kind, field_name=field_name, key=key)
+            if kind != 'number':
+                rows.update(count=F('count') - count)
+                continue
+
+            rows.update(count=F('count') - count, total=F('total') - total)
+            extremes = rows.values_list('minimum', 'maximum').first()
+            if extremes and (minimum <= extremes[0] or maximum >= extremes[1]):
+                value = get_field_expression(field_name, 'number')
+                rows.update(**FormResponse.objects.filter(form=form).aggregate(
+                    minimum=Min(value), maximum=Max(value)
+                ))
+
+        FormAggregate.objects.filter(form=form, count__lte=0).delete()
+
+
+def rebuild_form_aggregates(form, chunk_size=2000):
+    """
+    Recompute a form's aggregates from all of its responses.
+
+    Args:
+        form: Form model instance
+        chunk_size: Number of rows fetched from the database per round trip
+
+    Returns:
+        int: Number of aggregate rows written
+    """
+    deltas = AggregateDeltas(form.schema)
+    rows = FormResponse.objects.filter(form=form).values_list(
+        'response_data', 'submitted_at'
+    ).iterator(chunk_size=chunk_size)
+    for response_data, submitted_at in rows:
+        deltas.add(response_data, submitted_at)
+
+    with transaction.atomic():
+        FormAggregate.objects.filter(form=form).delete()
+        FormAggregate.objects.bulk_create(
+            [
+                FormAggregate(
+                    form=form, kind=kind, field_name=field_name, key=key,
+                    count=count, total=total, minimum=minimum, maximum=maximum,
+                )
+                for (kind, field_name, key), (count, total, minimum, maximum) in deltas.entries.items()
+            ],
+            batch_size=1000,
+        )
+    return len(deltas)
+
+
+def get_form_summary(form):
+    """
+    Build the response summary of a form from its aggregates.
+
+    Args:
+        form: Form model instance
+
+    Returns:
+        dict: Per-field statistics and submissions per day
+    """
+    fields = form.schema.get('fields', []) if isinstance(form.schema, dict) else []
+    summary_fields = {}
+    for field in fields:
+        if field.get('type') in OPTION_FIELD_TYPES:
+            summary_fields[field.get('name')] = {'type': field.get('type'), 'options': {}}
+        elif field.get('type') == 'number':
+            summary_fields[field.get('name')] = {
+                'type': 'number', 'count': 0, 'sum': None, 'min': None, 'max': None, 'mean': None,
+            }
+
+    per_day = {}
+    total = 0
+    rows = FormAggregate.objects.filter(form=form).values_list(
+        'kind', 'field_name', 'key', 'count', 'total', 'minimum', 'maximum'
+    )
+    for kind, field_name, key, count, row_total, minimum, maximum in rows:
+        if kind == 'day':
+            per_day[key] = count
+            total += count
+            continue
+
+        field_summary = summary_fields.get(field_name)
+        if field_summary is None:
+            # Field was removed from the schema or changed type
+            continue
+
+        if kind == 'option' and 'options' in field_summary:
+            field_summary['options'][key] = count
+        elif kind == 'number' and field_summary['type'] == 'number':
+            field_summary.update({
+                'count': count,
+                'sum': row_total,
+                'min': minimum,
+                'max': maximum,
+                'mean': row_total / count if count else None,
+            })
+
+    return {
+        'total_responses': total,
+        'fields': summary_fields,
+        'submissions_per_day': dict(sorted(per_day.items())),
+    }
@@ -1,5 +1,13 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class FormsappConfig(AppConfig):
     name = 'formsApp'
+    
+    def ready(self):
+        from . import signals  # noqa: F401
+        
+        if settings.SLOW_QUERY_THRESHOLD_MS:
+            from . import querylog
+            querylog.enable()
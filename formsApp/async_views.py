@@ -0,0 +1,149 @@
+"""
+Async variants of FormViewSet.submit and FormViewSet.responses.
+
+Run under an ASGI server (see ARCHITECTURE.md) these release the worker
+while waiting on the database or on S3, so slow uploads and large listings
+no longer hold a whole worker. Database access uses Django's async ORM;
+transactional writes and the boto3 uploads run in threads via
+sync_to_async.
+"""
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework import exceptions, status
+from rest_framework.request import Request
+
+from accounts.async_views import async_api_view, parse_json_body
+from .aggregates import apply_response_aggregates, increment_response_counters
+from .filters import ResponseQuery
+from .models import Form, FormResponse
+from .pagination import ResponseKeysetPagination
+from .serializers import FormResponseSerializer
+from .utils import (
+    upload_files_to_s3,
+    get_direct_upload_prefix,
+    verify_direct_uploads,
+    FileUploadError,
+    UploadNotFoundError,
+)
+from .validation import get_form_validator
+
+
+async def _get_form(pk):
+    try:
+        return await Form.objects.aget(pk=pk)
+    except Form.DoesNotExist:
+        raise exceptions.NotFound()
+
+
+def _submission_data(request):
+    if request.content_type == 'application/json':
+        return parse_json_body(request)
+
+    # Multipart/urlencoded: single values are unwrapped like the sync view
+    return {
+        key: values[0] if len(values) == 1 else values
+        for key, values in request.POST.lists()
+    }
+
+
+@transaction.atomic
+def _save_response(form, user, response_data):
+    form_response = FormResponse.objects.create(form=form, user=user, response_data=response_data)
+    increment_response_counters(form, [form_response])
+    apply_response_aggregates(form, [form_response])
+    return form_response
+
+
+@require_POST
+@async_api_view()
+async def submit(request, pk):
+    form = await _get_form(pk)
+    response_data = _submission_data(request)
+
+    validator = get_form_validator(form)
+    if validator.has_file_fields:
+        files = {
+            field_name: request.FILES[field_name]
+            for field_name in validator.file_fields
+            if field_name in request.FILES
+        }
+        if files:
+            try:
+                uploaded = await sync_to_async(upload_files_to_s3, thread_sensitive=False)(files, form.id)
+            except FileUploadError as e:
+                return JsonResponse(
+                    {'error': f'Failed to upload file for field {e.field_name}: {str(e)}'},
+                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                )
+            response_data.update(uploaded)
+
+        keys = {
+            field_name: response_data[field_name]
+            for field_name in validator.file_fields
+            if field_name not in files
+            and isinstance(response_data.get(field_name), str)
+            and response_data[field_name].startswith(get_direct_upload_prefix(form.id, field_name))
+        }
+        if keys:
+            try:
+                verified = await sync_to_async(verify_direct_uploads, thread_sensitive=False)(
+                    keys, form.id, request.user.id
+                )
+            except UploadNotFoundError as e:
+                return JsonResponse(
+                    {'error': f'File for field {e.field_name} was not found in storage'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            except FileUploadError as e:
+                return JsonResponse(
+                    {'error': f'Failed to verify file for field {e.field_name}: {str(e)}'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            response_data.update(verified)
+
+    try:
+        response_data = validator.validate(response_data)
+    except exceptions.ValidationError as e:
+        return JsonResponse({'non_field_errors': e.detail}, status=status.HTTP_400_BAD_REQUEST)
+
+    form_response = await sync_to_async(_save_response)(form, request.user, response_data)
+    return JsonResponse(
+        {
+            'message': 'Form submitted successfully',
+            'data': FormResponseSerializer(form_response).data
+        },
+        status=status.HTTP_201_CREATED
+    )
+
+
+@require_GET
+@async_api_view()
+async def responses(request, pk):
+    if not request.user.is_editor:
+        raise exceptions.PermissionDenied()
+
+    form = await _get_form(pk)
+    query = ResponseQuery(form, request.GET)
+    queryset = query.apply(
+        FormResponse.objects.filter(form=form)
+        .select_related('form', 'user')
+        .only(
+            'id', 'response_data', 'submitted_at',
+            'form', 'form__name', 'user', 'user__email',
+        )
+    )
+
+    paginator = ResponseKeysetPagination(query.ordering_expression, query.descending)
+    page = await paginator.apaginate_queryset(queryset, Request(request))
+
+    include_total = request.GET.get('include_total', 'true').lower() not in ('0', 'false', 'no')
+
+    return JsonResponse({
+        'form': form.name,
+        'total_responses': form.response_count if include_total else None,
+        'next': paginator.get_next_link(),
+        'responses': FormResponseSerializer(page, many=True).data
+    })
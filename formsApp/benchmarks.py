@@ -0,0 +1,245 @@
+"""
+Micro-benchmarks of the CPU hot paths: schema validation, response
+validation, response serialization and Excel export.
+
+Each benchmark is timed over several runs and then run once more under
+tracemalloc for its peak memory. Results can be saved as a baseline JSON
+file and later runs compared against it; see the run_benchmarks command.
+"""
+
+import gc
+import platform
+import random
+import statistics
+import time
+import tracemalloc
+from datetime import timedelta
+
+import django
+from django.db import connection
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from accounts.models import User
+from .models import Form, FormResponse
+from .serializers import FormSerializer, FormResponseSerializer
+from .synthetic import build_schema, fake_response_data
+from .utils import generate_excel_export
+
+EXPORT_FIELDS = 20
+
+
+class Benchmark:
+    """
+    A named benchmark.
+
+    setup(source, rng) prepares the inputs and returns the callable that
+    is timed; items is how many rows or calls one run of it processes.
+    """
+
+    def __init__(self, name, setup, items, repeat=5, description=''):
+        self.name = name
+        self.setup = setup
+        self.items = items
+        self.repeat = repeat
+        self.description = description
+
+
+class InMemorySource:
+    """Unsaved model instances; needs no database."""
+
+    name = 'memory'
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.users = [
+            User(id=i + 1, username=f'bench_{i}', email=f'bench{i}@example.com')
+            for i in range(500)
+        ]
+
+    def form(self, field_count):
+        return Form(
+            id=1,
+            name='Benchmark form',
+            schema=build_schema(field_count, self.rng),
+            created_by=self.users[0],
+            updated_at=timezone.now(),
+        )
+
+    def responses(self, form, count):
+        now = timezone.now()
+        return [
+            FormResponse(
+                id=i + 1,
+                form=form,
+                user=self.users[i % len(self.users)],
+                response_data=fake_response_data(form.schema, self.rng, i),
+                submitted_at=now - timedelta(seconds=i),
+            )
+            for i in range(count)
+        ]
+
+
+class DatabaseSource(InMemorySource):
+    """
+    Rows of an existing form, e.g. one made by generate_synthetic_data.
+
+    Responses are returned as unevaluated querysets, so the database fetch
+    is part of the measured time like it is in the API.
+    """
+
+    name = 'database'
+
+    def __init__(self, rng, form_id):
+        super().__init__(rng)
+        self.db_form = Form.objects.get(pk=form_id)
+
+    def form(self, field_count):
+        return self.db_form
+
+    def responses(self, form, count):
+        if form is not self.db_form:
+            return super().responses(form, count)
+        available = FormResponse.objects.filter(form=form).count()
+        if available < count:
+            raise ValueError(f"Form {form.id} has {available} responses, {count} are needed")
+        return (
+            FormResponse.objects.filter(form=form)
+            .select_related('form', 'user')
+            .order_by('-submitted_at', '-id')[:count]
+        )
+
+
+def _fresh(responses):
+    # A queryset caches its rows; clone it so every run queries again
+    return responses.all() if isinstance(responses, QuerySet) else responses
+
+
+def _validate_schema(source, rng):
+    schema = build_schema(500, rng)
+    serializer = FormSerializer()
+    return lambda: serializer.validate_schema(schema)
+
+
+def _validate_responses(source, rng):
+    form = source.form(30)
+    payloads = [fake_response_data(form.schema, rng, i, include_files=False) for i in range(1000)]
+    serializer = FormResponseSerializer()
+
+    def run():
+        for response_data in payloads:
+            serializer.validate({'form': form, 'response_data': dict(response_data)})
+    return run
+
+
+def _serialize(count):
+    def setup(source, rng):
+        form = source.form(EXPORT_FIELDS)
+        responses = source.responses(form, count)
+        return lambda: FormResponseSerializer(_fresh(responses), many=True).data
+    return setup
+
+
+def _export(count):
+    def setup(source, rng):
+        form = source.form(EXPORT_FIELDS)
+        responses = source.responses(form, count)
+        return lambda: generate_excel_export(form, _fresh(responses)).getbuffer().nbytes
+    return setup
+
+
+BENCHMARKS = [
+    Benchmark('validate_schema_500', _validate_schema, 1, repeat=20,
+              description='FormSerializer.validate_schema, 500 fields'),
+    Benchmark('validate_response', _validate_responses, 1000, repeat=10,
+              description='FormResponseSerializer.validate, 1000 responses of a 30-field form'),
+    Benchmark('serialize_10k', _serialize(10000), 10000,
+              description='FormResponseSerializer(many=True), 10k rows'),
+    Benchmark('excel_export_10k', _export(10000), 10000, repeat=3,
+              description='generate_excel_export, 10k rows'),
+    Benchmark('excel_export_100k', _export(100000), 100000, repeat=1,
+              description='generate_excel_export, 100k rows'),
+]
+
+
+def get_environment(source):
+    return {
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'machine': platform.machine(),
+        'database': connection.vendor,
+        'source': source.name,
+    }
+
+
+def run_benchmark(benchmark, source, repeat=None, seed=0):
+    """
+    Time a benchmark and measure its peak memory.
+
+    Args:
+        benchmark: Benchmark to run
+        source: InMemorySource or DatabaseSource providing the inputs
+        repeat: Timed runs (default: the benchmark's own repeat count)
+        seed: Random seed for the generated inputs
+
+    Returns:
+        dict: min/median seconds, seconds per item and peak bytes
+    """
+    run = benchmark.setup(source, random.Random(seed))
+    timings = []
+    for _ in range(repeat or benchmark.repeat):
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+
+    # A separate run: tracing allocations slows everything down
+    gc.collect()
+    tracemalloc.start()
+    try:
+        baseline_bytes = tracemalloc.get_traced_memory()[0]
+        run()
+        peak = tracemalloc.get_traced_memory()[1] - baseline_bytes
+    finally:
+        tracemalloc.stop()
+
+    median = statistics.median(timings)
+    return {
+        'runs': len(timings),
+        'min': min(timings),
+        'median': median,
+        'per_item_us': median / benchmark.items * 1e6,
+        'peak_bytes': peak,
+    }
+
+
+def compare(results, baseline, threshold):
+    """
+    Compare results against baseline results.
+
+    Args:
+        results: {name: result} from run_benchmark
+        baseline: {name: result} loaded from a baseline file
+        threshold: Relative slowdown or memory growth that counts as a regression
+
+    Returns:
+        list: One dict per benchmark with the relative changes and a status
+    """
+    rows = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        row = {'name': name, 'result': result, 'baseline': previous, 'time_change': None, 'memory_change': None}
+        if previous is None:
+            row['status'] = 'new'
+        else:
+            row['time_change'] = result['median'] / previous['median'] - 1 if previous['median'] else 0.0
+            if previous['peak_bytes']:
+                row['memory_change'] = result['peak_bytes'] / previous['peak_bytes'] - 1
+            if row['time_change'] > threshold or (row['memory_change'] or 0) > threshold:
+                row['status'] = 'REGRESSION'
+            elif row['time_change'] < -threshold:
+                row['status'] = 'faster'
+            else:
+                row['status'] = 'ok'
+        rows.append(row)
+    return rows
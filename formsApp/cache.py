@@ -0,0 +1,143 @@
+"""
+Read-through cache of serialized forms.
+
+Rendered form JSON (and the rendered form list) is stored under keys that
+include a version number. Signal handlers in signals.py bump the version
+when a form is saved or deleted or its creator's email changes, so stale
+entries are never read again and simply expire.
+
+The response counters change on every submission and are left out of the
+invalidation: callers overlay the live values, which they read anyway for
+the conditional GET validators.
+
+The keys also hold the columns the conditional GET validators are read
+from (see conditional.py). With a per-process cache such as LocMemCache
+the version bump only reaches the worker that handled the change, but an
+entry built before the change can still never be served under the new
+ETag.
+
+Cold keys are rebuilt by a single request: the first one takes a lock with
+cache.add() while the others wait briefly for its result.
+"""
+
+import hashlib
+
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from forms.metrics import registry
+
+LIST_VERSION_KEY = 'forms:list:version'
+LOCK_POLL_INTERVAL = 0.05
+
+
+def _cache():
+    return caches[settings.FORM_CACHE_ALIAS]
+
+
+def _form_version_key(form_id):
+    return f'forms:{form_id}:version'
+
+
+def _get_version(key):
+    cache = _cache()
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock so a version key evicted from the cache
+        # never comes back with a number used by older entries.
+        version = time.time_ns()
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def _bump_version(key):
+    cache = _cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def invalidate_form(form_id):
+    """
+    Drop the cached representation of a form and of the form list.
+
+    Args:
+        form_id: ID of the changed form
+    """
+    _bump_version(_form_version_key(form_id))
+    _bump_version(LIST_VERSION_KEY)
+
+
+def invalidate_form_list():
+    _bump_version(LIST_VERSION_KEY)
+
+
+def _state_token(state, fields):
+    raw = '|'.join(f'{field}={state.get(field)}' for field in fields)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:16]
+
+
+def _read_through(key, build, kind):
+    cache = _cache()
+    data = cache.get(key)
+    if data is not None:
+        registry.incr('form_cache_hits', kind=kind)
+        return data
+
+    registry.incr('form_cache_misses', kind=kind)
+    lock_key = f'{key}:lock'
+    if cache.add(lock_key, 1, settings.FORM_CACHE_LOCK_TIMEOUT):
+        try:
+            data = build()
+            cache.set(key, data, settings.FORM_CACHE_TIMEOUT)
+        finally:
+            cache.delete(lock_key)
+        return data
+
+    # Another request is rebuilding this key; wait for it rather than
+    # rendering the same payload again.
+    registry.incr('form_cache_lock_waits', kind=kind)
+    deadline = time.monotonic() + settings.FORM_CACHE_LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        data = cache.get(key)
+        if data is not None:
+            return data
+    return build()
+
+
+def get_cached_form(form_id, build, state):
+    """
+    Get the serialized form, building and caching it on a miss.
+
+    Args:
+        form_id: ID of the form
+        build: Callable returning the serialized form
+        state: Result of conditional.get_form_state for the form
+
+    Returns:
+        dict: Serialized form
+    """
+    version = _get_version(_form_version_key(form_id))
+    token = _state_token(state, ('updated_at', 'created_by__updated_at'))
+    return _read_through(f'forms:{form_id}:data:{version}:{token}', build, 'detail')
+
+
+def get_cached_form_list(build, state):
+    """
+    Get the serialized form list, building and caching it on a miss.
+
+    Args:
+        build: Callable returning the list of serialized forms
+        state: Result of conditional.get_form_list_state
+
+    Returns:
+        list: Serialized forms
+    """
+    version = _get_version(LIST_VERSION_KEY)
+    token = _state_token(state, ('count', 'updated_at', 'created_by_updated_at'))
+    return _read_through(f'forms:list:data:{version}:{token}', build, 'list')
@@ -0,0 +1,93 @@
+"""
+Conditional GET support for form and response listings.
+
+Validators are built from a handful of columns read with values() or an
+aggregate, never from the serialized payload, so a poll that comes back
+with a matching If-None-Match is answered with a 304 before anything is
+loaded or serialized.
+
+Only ETags are sent, no Last-Modified: deleting a form or a response
+changes the counts in the state but not necessarily its newest timestamp,
+so If-Modified-Since would keep answering 304 for a list that shrank.
+
+Responses are marked `private, no-cache`: browsers revalidate every time,
+while X-Accel-Expires lets the nginx tier micro-cache them per token.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.db.models import Count, Max, Sum
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+
+from .models import Form
+
+
+def get_form_list_state():
+    return Form.objects.aggregate(
+        count=Count('id'),
+        updated_at=Max('updated_at'),
+        responses=Sum('response_count'),
+        last_submitted_at=Max('last_submitted_at'),
+        created_by_updated_at=Max('created_by__updated_at'),
+    )
+
+
+def get_form_state(form_id):
+    """
+    Read the columns a form's detail and response listing depend on.
+
+    Args:
+        form_id: ID of the form
+
+    Returns:
+        dict: Column values, or None if the form does not exist
+    """
+    try:
+        form_id = int(form_id)
+    except (TypeError, ValueError):
+        return None
+    return Form.objects.filter(pk=form_id).values(
+        'updated_at', 'response_count', 'last_submitted_at', 'created_by__updated_at'
+    ).first()
+
+
+def _etag(request, state):
+    raw = '|'.join([
+        request.get_full_path(),
+        request.META.get('HTTP_ACCEPT', ''),
+        *(f'{key}={state[key]}' for key in sorted(state)),
+    ])
+    return quote_etag(hashlib.sha256(raw.encode('utf-8')).hexdigest()[:32])
+
+
+def conditional_response(request, state, render):
+    """
+    Answer a GET with 304 if the client's copy is current, else render it.
+
+    Args:
+        request: Request being handled
+        state: Dict of values the response content depends on, or None
+            to skip the check (e.g. the object does not exist)
+        render: Callable producing the full response
+
+    Returns:
+        Response: 304 response or the rendered response with validators
+    """
+    if state is None or request.method not in ('GET', 'HEAD'):
+        return render()
+
+    etag = _etag(request, state)
+
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = render()
+        if response.status_code != 200:
+            return response
+
+    response.headers['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    if settings.API_MICROCACHE_SECONDS > 0:
+        response.headers['X-Accel-Expires'] = str(settings.API_MICROCACHE_SECONDS)
+    return response
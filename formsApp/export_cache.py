@@ -0,0 +1,227 @@
+"""
+Disk cache of finished exports.
+
+Files are stored under EXPORT_ROOT/cache and named after the export's
+snapshot key (form, schema version, newest submission, response count,
+format and xlsx renderer), so an unchanged form is served from the cache and any change
+produces a new key. The cache is bounded by EXPORT_CACHE_MAX_BYTES; the
+least recently used files (by modification time, refreshed on every hit)
+are evicted first.
+
+With EXPORT_ACCEL_REDIRECT_LOCATION set, Django only answers with an
+X-Accel-Redirect header and nginx sends the file itself.
+"""
+
+import logging
+import os
+import threading
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+
+from forms.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+_evict_lock = threading.Lock()
+
+
+def get_export_cache_dir():
+    return Path(settings.EXPORT_ROOT) / 'cache'
+
+
+def get_export_cache_path(snapshot_key, export_format):
+    return get_export_cache_dir() / f'{snapshot_key}.{export_format}'
+
+
+def get_cached_export(snapshot_key, export_format):
+    """
+    Look up a cached export and mark it as recently used.
+
+    Args:
+        snapshot_key: Result of get_export_snapshot_key
+        export_format: Export file format
+
+    Returns:
+        Path: The cached file, or None on a miss
+    """
+    path = get_export_cache_path(snapshot_key, export_format)
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        registry.incr('export_cache_misses', format=export_format)
+        return None
+    registry.incr('export_cache_hits', format=export_format)
+    return path
+
+
+def _part_path(path):
+    # Unique per writer, so concurrent builds of one key never share a file
+    return path.with_name(f'{path.name}.{uuid.uuid4().hex}.part')
+
+
+def _commit(part_path, path):
+    os.replace(part_path, path)
+    registry.incr('export_cache_stores')
+    evict_exports()
+
+
+def save_export(data, snapshot_key, export_format):
+    """
+    Store a complete export in the cache.
+
+    Args:
+        data: Export file content (bytes)
+        snapshot_key: Result of get_export_snapshot_key
+        export_format: Export file format
+    """
+    path = get_export_cache_path(snapshot_key, export_format)
+    part_path = _part_path(path)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        part_path.write_bytes(data)
+        _commit(part_path, path)
+    except OSError as e:
+        logger.warning(f"Could not cache export {path.name}: {e}")
+        part_path.unlink(missing_ok=True)
+
+
+def cache_export_chunks(chunks, snapshot_key, export_format):
+    """
+    Pass streamed export chunks through while writing them to the cache.
+
+    The file is only added to the cache once the stream is complete; an
+    interrupted download leaves nothing behind.
+
+    Args:
+        chunks: Iterable of bytes
+        snapshot_key: Result of get_export_snapshot_key
+        export_format: Export file format
+
+    Yields:
+        bytes: The chunks, unchanged
+    """
+    path = get_export_cache_path(snapshot_key, export_format)
+    part_path = _part_path(path)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        part_file = open(part_path, 'wb')
+    except OSError as e:
+        logger.warning(f"Could not cache export {path.name}: {e}")
+        yield from chunks
+        return
+
+    completed = False
+    try:
+        with part_file:
+            for chunk in chunks:
+                part_file.write(chunk)
+                yield chunk
+        completed = True
+    finally:
+        if completed:
+            try:
+                _commit(part_path, path)
+            except OSError as e:
+                logger.warning(f"Could not cache export {path.name}: {e}")
+                part_path.unlink(missing_ok=True)
+        else:
+            part_path.unlink(missing_ok=True)
+
+
+def _cached_files():
+    files = []
+    try:
+        entries = os.scandir(get_export_cache_dir())
+    except FileNotFoundError:
+        return files
+    with entries:
+        for entry in entries:
+            if entry.name.endswith('.part') or not entry.is_file():
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+    return files
+
+
+def evict_exports(max_bytes=None):
+    """
+    Delete the least recently used cached exports until the cache fits in
+    max_bytes.
+
+    Args:
+        max_bytes: Size limit (default: EXPORT_CACHE_MAX_BYTES)
+
+    Returns:
+        int: Number of files deleted
+    """
+    if max_bytes is None:
+        max_bytes = settings.EXPORT_CACHE_MAX_BYTES
+
+    with _evict_lock:
+        files = sorted(_cached_files())
+        total = sum(size for _, size, _ in files)
+        evicted = 0
+        for _, size, path in files:
+            if total <= max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            evicted += 1
+
+    if evicted:
+        registry.incr('export_cache_evictions', evicted)
+    return evicted
+
+
+def get_export_cache_stats():
+    files = _cached_files()
+    return {
+        'files': len(files),
+        'bytes': sum(size for _, size, _ in files),
+        'max_bytes': settings.EXPORT_CACHE_MAX_BYTES,
+    }
+
+
+def export_file_response(path, filename, content_type):
+    """
+    Send a file from EXPORT_ROOT as a download, through nginx when
+    EXPORT_ACCEL_REDIRECT_LOCATION is set.
+
+    Args:
+        path: File path under EXPORT_ROOT
+        filename: Download file name
+        content_type: MIME type of the file
+
+    Returns:
+        HttpResponse: X-Accel-Redirect or FileResponse
+
+    Raises:
+        FileNotFoundError: If the file does not exist
+    """
+    location = settings.EXPORT_ACCEL_REDIRECT_LOCATION
+    if location:
+        path = Path(path)
+        if not path.is_file():
+            raise FileNotFoundError(path)
+        relative = path.resolve().relative_to(Path(settings.EXPORT_ROOT).resolve())
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = location.rstrip('/') + '/' + relative.as_posix()
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+    # FileResponse lets the WSGI server send the file with sendfile()
+    return FileResponse(
+        open(path, 'rb'),
+        as_attachment=True,
+        filename=filename,
+        content_type=content_type,
+    )
@@ -0,0 +1,443 @@
+"""
+Background export jobs.
+
+Jobs are queued in the ExportJob table, which doubles as the work queue:
+the run_export_worker management command claims pending rows and builds
+the files in a process pool, so no external broker is needed.
+
+Exports can also be incremental (see DeltaExport): only the responses
+after a cursor, for clients that sync regularly.
+"""
+
+import hashlib
+import logging
+import os
+import socket
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import ExportJob, FormResponse
+from .pagination import decode_cursor, encode_cursor
+from .querylog import logs_slow_queries
+from .utils import build_write_only_workbook, iter_export_rows, iter_csv_chunks, iter_ndjson_chunks
+
+logger = logging.getLogger(__name__)
+
+EXPORT_CONTENT_TYPES = {
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+TEXT_EXPORT_RENDERERS = {
+    'csv': iter_csv_chunks,
+    'ndjson': iter_ndjson_chunks,
+}
+
+
+def get_export_snapshot(form):
+    """
+    Describe the current state of a form's responses.
+
+    Read from the form's denormalized counters (see aggregates), so no
+    query over the responses is needed.
+
+    Args:
+        form: Form model instance
+
+    Returns:
+        dict: 'last_submitted_at' and 'response_count'
+    """
+    return {
+        'last_submitted_at': form.last_submitted_at,
+        'response_count': form.response_count,
+    }
+
+
+def get_export_snapshot_key(form, export_format, snapshot, delta=None, variant=None):
+    """
+    Build a key that only changes when the export content would change.
+
+    Args:
+        form: Form model instance
+        export_format: Export file format, e.g. 'xlsx'
+        snapshot: Result of get_export_snapshot
+        delta: DeltaExport for incremental exports
+        variant: Name of the renderer, when a format has several whose
+            files differ
+
+    Returns:
+        str: Hex digest identifying the export
+    """
+    last_submitted_at = snapshot['last_submitted_at']
+    parts = [
+        str(form.id),
+        form.updated_at.isoformat(),
+        last_submitted_at.isoformat() if last_submitted_at else '',
+        str(snapshot['response_count']),
+        export_format,
+    ]
+    if variant:
+        parts += ['variant', variant]
+    if delta is not None:
+        parts += ['since', delta.since_token, delta.next_cursor]
+    raw = ':'.join(parts)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def decode_export_cursor(token):
+    """
+    Decode a delta export cursor.
+
+    Returns:
+        tuple: (submitted_at, id) of the last response delivered
+
+    Raises:
+        ValueError: If the token is malformed
+    """
+    value, pk = decode_cursor(token)
+    submitted_at = parse_datetime(value) if isinstance(value, str) else None
+    if submitted_at is None:
+        raise ValueError("Invalid cursor")
+    return submitted_at, pk
+
+
+class DeltaExport:
+    """
+    The responses of a form after a cursor, up to a fixed end position.
+
+    Cursors are opaque tokens encoding the (submitted_at, id) of the last
+    response delivered; an empty since token starts from the first
+    response. The end is the newest response submitted at least
+    EXPORT_DELTA_SETTLE_SECONDS ago, so responses whose transaction was
+    still open when the export ran are not skipped by the next one.
+    next_cursor is where the following export continues.
+    """
+
+    def __init__(self, since_token, end):
+        self.since_token = since_token
+        self.since = decode_export_cursor(since_token) if since_token else None
+        self.end = end
+        self.next_cursor = encode_cursor(*end) if end else since_token
+
+    @classmethod
+    def for_form(cls, form, since_token):
+        """
+        Plan a delta export of a form's current responses.
+
+        Raises:
+            ValueError: If since_token is malformed
+        """
+        since = decode_export_cursor(since_token) if since_token else None
+        settled = timezone.now() - timedelta(seconds=settings.EXPORT_DELTA_SETTLE_SECONDS)
+        end = (
+            FormResponse.objects.filter(form=form, submitted_at__lte=settled)
+            .order_by('-submitted_at', '-id')
+            .values_list('submitted_at', 'id')
+            .first()
+        )
+        if end is None or (since is not None and end <= since):
+            # Nothing new: the next export continues from the same place
+            end = since
+        return cls(since_token, end)
+
+    @classmethod
+    def for_job(cls, job):
+        end = decode_export_cursor(job.next_cursor) if job.next_cursor else None
+        return cls(job.since, end)
+
+    def apply(self, responses):
+        """
+        Restrict a FormResponse queryset to the delta.
+        """
+        if self.end is None:
+            return responses.none()
+
+        # Same lte/gte plus exclude pattern as the keyset pagination, so the
+        # scan stays on the (form, -submitted_at, -id) index range
+        end_at, end_id = self.end
+        responses = responses.filter(submitted_at__lte=end_at).exclude(submitted_at=end_at, id__gt=end_id)
+        if self.since is not None:
+            since_at, since_id = self.since
+            responses = responses.filter(submitted_at__gte=since_at).exclude(
+                submitted_at=since_at, id__lte=since_id
+            )
+        return responses
+
+
+def enqueue_export_job(form, user, export_format='xlsx', since=None):
+    """
+    Queue an export of a form, reusing a job for the same snapshot.
+
+    Args:
+        form: Form model instance
+        user: User requesting the export
+        export_format: Export file format
+        since: Delta export cursor ('' for all responses), None for a
+            full export
+
+    Returns:
+        tuple: (ExportJob, created)
+
+    Raises:
+        ValueError: If since is malformed
+    """
+    delta = DeltaExport.for_form(form, since) if since is not None else None
+    snapshot = get_export_snapshot(form)
+    last_response_id = FormResponse.objects.filter(form=form).aggregate(last=Max('id'))['last']
+    snapshot_key = get_export_snapshot_key(form, export_format, snapshot, delta)
+    active = ExportJob.objects.exclude(status='failed')
+
+    job = active.filter(snapshot_key=snapshot_key).first()
+    if job is not None and job.status == 'done' and not Path(job.file_path).exists():
+        # The file was purged or lost with its volume; build it again
+        ExportJob.objects.filter(id=job.id, status='done').update(
+            status='failed', error="Export file is no longer available"
+        )
+        job = None
+    if job is not None:
+        return job, False
+
+    try:
+        with transaction.atomic():
+            job = ExportJob.objects.create(
+                form=form,
+                requested_by=user,
+                format=export_format,
+                snapshot_key=snapshot_key,
+                last_response_id=last_response_id,
+                since=delta.since_token if delta else None,
+                next_cursor=delta.next_cursor if delta else '',
+            )
+        return job, True
+    except IntegrityError:
+        # Another request queued the same snapshot in the meantime
+        return active.get(snapshot_key=snapshot_key), False
+
+
+def get_worker_id():
+    """Identify the current export worker process as host:pid."""
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def _process_exists(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # Running, as another user
+    return True
+
+
+def claim_pending_jobs(limit, worker=''):
+    """
+    Mark up to `limit` pending jobs as running and return their IDs.
+
+    Rows are locked with SKIP LOCKED so several workers can poll the same
+    table without picking up the same job.
+
+    Args:
+        limit: Maximum number of jobs to claim
+        worker: ID of the claiming worker, see get_worker_id
+
+    Returns:
+        list: IDs of the claimed jobs
+    """
+    with transaction.atomic():
+        job_ids = list(
+            ExportJob.objects.select_for_update(skip_locked=True)
+            .filter(status='pending')
+            .order_by('created_at')
+            .values_list('id', flat=True)[:limit]
+        )
+        if job_ids:
+            ExportJob.objects.filter(id__in=job_ids).update(
+                status='running', started_at=timezone.now(), attempts=F('attempts') + 1, worker=worker
+            )
+    return job_ids
+
+
+def release_crashed_jobs(jobs):
+    """
+    Requeue running jobs whose worker process died.
+
+    A job that already used EXPORT_JOB_MAX_ATTEMPTS claims is marked failed
+    instead, so an export that keeps killing its process (e.g. running out
+    of memory) is not retried forever.
+
+    Args:
+        jobs: QuerySet of ExportJob objects
+
+    Returns:
+        tuple: (requeued, failed) job counts
+    """
+    running = jobs.filter(status='running')
+    failed = running.filter(attempts__gte=settings.EXPORT_JOB_MAX_ATTEMPTS).update(
+        status='failed', error="Export worker process died", finished_at=timezone.now()
+    )
+    requeued = running.update(status='pending', started_at=None, worker='')
+    return requeued, failed
+
+
+def requeue_stale_jobs():
+    """
+    Put jobs left running by a worker that died back in the queue.
+
+    Returns:
+        tuple: (requeued, failed) job counts, see release_crashed_jobs
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.EXPORT_JOB_TIMEOUT)
+    return release_crashed_jobs(ExportJob.objects.filter(started_at__lt=cutoff))
+
+
+def requeue_orphaned_jobs():
+    """
+    Put jobs left running by a worker on this host that has exited back in
+    the queue, however recently they were started.
+
+    Jobs of workers on other hosts are left to requeue_stale_jobs.
+
+    Returns:
+        tuple: (requeued, failed) job counts, see release_crashed_jobs
+    """
+    orphaned = []
+    running = ExportJob.objects.filter(status='running', worker__startswith=f'{socket.gethostname()}:')
+    for job_id, worker in running.values_list('id', 'worker'):
+        pid = worker.rsplit(':', 1)[1]
+        if not pid.isdigit() or not _process_exists(int(pid)):
+            orphaned.append(job_id)
+    if not orphaned:
+        return 0, 0
+    return release_crashed_jobs(ExportJob.objects.filter(id__in=orphaned))
+
+
+def get_export_dir():
+    return Path(settings.EXPORT_ROOT) / 'jobs'
+
+
+def get_export_path(job):
+    return get_export_dir() / f'{job.id}_{job.snapshot_key[:16]}.{job.format}'
+
+
+def purge_expired_exports():
+    """
+    Delete finished jobs older than EXPORT_JOB_RETENTION_SECONDS with their
+    files, and files under EXPORT_ROOT/jobs no job refers to any more
+    (e.g. partial files of a worker that died).
+
+    Returns:
+        tuple: (jobs, files) deleted
+    """
+    if not settings.EXPORT_JOB_RETENTION_SECONDS:
+        return 0, 0
+    cutoff = timezone.now() - timedelta(seconds=settings.EXPORT_JOB_RETENTION_SECONDS)
+    jobs, _ = ExportJob.objects.filter(status__in=['done', 'failed'], finished_at__lt=cutoff).delete()
+
+    kept = {
+        Path(file_path).name
+        for file_path in ExportJob.objects.exclude(file_path='').values_list('file_path', flat=True)
+    }
+    files = 0
+    try:
+        entries = list(os.scandir(get_export_dir()))
+    except FileNotFoundError:
+        return jobs, 0
+    for entry in entries:
+        if entry.name in kept or not entry.is_file():
+            continue
+        try:
+            if entry.stat().st_mtime < cutoff.timestamp():
+                os.unlink(entry.path)
+                files += 1
+        except FileNotFoundError:
+            pass
+    if jobs or files:
+        logger.info(f"Purged {jobs} expired export job(s) and {files} file(s)")
+    return jobs, files
+
+
+@logs_slow_queries('export-job')
+def run_export_job(job_id):
+    """
+    Build the file for a claimed export job.
+
+    Runs inside a worker process of the export pool.
+
+    Args:
+        job_id: ID of a job in the 'running' state
+    """
+    job = ExportJob.objects.select_related('form').get(id=job_id)
+    path = get_export_path(job)
+    # Per attempt: a run requeued as stale may still be writing its file
+    tmp_path = path.with_name(f'{path.name}.{job.attempts}.part')
+    # Results of a run that was requeued in the meantime are dropped
+    claim = ExportJob.objects.filter(id=job_id, status='running', attempts=job.attempts)
+
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        responses = FormResponse.objects.filter(form=job.form)
+        if job.since is not None:
+            responses = DeltaExport.for_job(job).apply(responses)
+        elif job.last_response_id is not None:
+            responses = responses.filter(id__lte=job.last_response_id)
+        responses = responses.order_by('-submitted_at', '-id')
+
+        row_count = write_export_file(job.form, responses, job.format, tmp_path)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logger.error(f"Export job {job_id} failed: {str(e)}")
+        if tmp_path.exists():
+            tmp_path.unlink()
+        claim.update(status='failed', error=str(e), finished_at=timezone.now())
+        return
+
+    claim.update(
+        status='done',
+        file_path=str(path),
+        row_count=row_count,
+        finished_at=timezone.now(),
+    )
+    logger.info(f"Export job {job_id} finished: {row_count} rows written to {path}")
+
+
+def write_export_file(form, responses, export_format, path):
+    """
+    Write an export of the given responses to a file.
+
+    Args:
+        form: Form model instance
+        responses: QuerySet of FormResponse objects
+        export_format: Export file format
+        path: Destination file path
+
+    Returns:
+        int: Number of responses written
+    """
+    row_count = 0
+
+    def counted(rows):
+        nonlocal row_count
+        for row in rows:
+            row_count += 1
+            yield row
+
+    rows = counted(iter_export_rows(responses))
+    if export_format == 'xlsx':
+        workbook = build_write_only_workbook(form, rows)
+        workbook.save(path)
+    elif export_format in TEXT_EXPORT_RENDERERS:
+        with open(path, 'wb') as export_file:
+            for chunk in TEXT_EXPORT_RENDERERS[export_format](form, rows):
+                export_file.write(chunk)
+    else:
+        raise ValueError(f"Unsupported export format '{export_format}'")
+
+    return row_count
+
@@ -0,0 +1,228 @@
+"""
+Filtering and sorting of form responses by field value.
+
+Query parameters such as ?field.department=Sales, ?field.age__gte=30 and
+?ordering=-field.age are checked against the form schema and translated
+into JSON lookups on response_data. An __in filter takes a comma-separated
+list of values; to match values that contain a comma, repeat the parameter
+once per value (?field.city__in=Paris, TX&field.city__in=Rome), which is
+not split.
+
+Number fields are compared as numbers and date fields as ISO dates,
+whether a response stored the value as a JSON number or a string (as
+multipart submissions did). Other fields are compared as JSON values; on
+PostgreSQL their equality filters use JSONB containment (@>), which the
+GIN index on response_data serves. Range filters and sorting use the
+expression from get_field_expression, which the per-form indexes from the
+create_field_index command are built on.
+"""
+
+import hashlib
+
+from django.db import connection
+from django.db.models import Case, F, FloatField, Index, Q, When
+from django.db.models.fields.json import KeyTextTransform, KeyTransform
+from django.db.models.functions import Cast
+from django.db.models.lookups import Regex
+from rest_framework import serializers
+
+from .models import FormResponse
+from .validation import FIELD_CHECKS, STRICT_FIELD_CHECKS
+
+FIELD_PARAM_PREFIX = 'field.'
+ORDERING_PARAM = 'ordering'
+LOOKUP_SEPARATOR = '__'
+
+RANGE_LOOKUPS = ('gt', 'gte', 'lt', 'lte')
+RANGE_FIELD_TYPES = ('number', 'date')
+TEXT_FIELD_TYPES = ('text', 'email', 'textarea')
+LIST_FIELD_TYPES = ('checkbox',)
+UNFILTERABLE_FIELD_TYPES = ('file',)
+
+# Stored values that don't match are left out of filters and sorting
+# instead of failing the cast
+NUMBER_PATTERN = r'^\s*[-+]?([0-9]+\.?[0-9]*|\.[0-9]+)([eE][-+]?[0-9]+)?\s*$'
+ISO_DATE_PATTERN = r'^[0-9]{4}-[0-9]{2}-[0-9]{2}$'
+
+
+def _coerce(field_name, field_type, raw):
+    # Filter values are checked strictly, even where stored values aren't
+    check = FIELD_CHECKS.get(field_type) or STRICT_FIELD_CHECKS.get(field_type)
+    value = check(field_name, raw) if check else raw
+    if value == '':
+        raise serializers.ValidationError(f"Filter value for field '{field_name}' must not be empty")
+    return value
+
+
+def get_field_expression(field_name, field_type):
+    """
+    Build the expression a field's responses are filtered and sorted on.
+
+    Number fields are cast to float and date fields compared as their ISO
+    text, so values stored as JSON numbers and as strings compare alike;
+    other fields are compared as JSON values.
+
+    Args:
+        field_name: Name of the schema field
+        field_type: Type of the schema field
+
+    Returns:
+        Expression: Expression over response_data
+    """
+    if field_type == 'number':
+        text = KeyTextTransform(field_name, 'response_data')
+        return Case(
+            When(Regex(text, NUMBER_PATTERN), then=Cast(text, FloatField())),
+            output_field=FloatField(),
+        )
+    if field_type == 'date':
+        text = KeyTextTransform(field_name, 'response_data')
+        return Case(When(Regex(text, ISO_DATE_PATTERN), then=text))
+    return KeyTransform(field_name, 'response_data')
+
+
+class ResponseQuery:
+    """
+    Field filters and sort order for a form's responses, parsed from the
+    query parameters of a request.
+    """
+
+    def __init__(self, form, query_params):
+        fields = form.schema.get('fields', []) if isinstance(form.schema, dict) else []
+        self.field_types = {field.get('name'): field.get('type') for field in fields}
+        self.filters = []
+        self.ordering_field = None
+        self.ordering_expression = None
+        self.descending = True
+
+        for param in query_params:
+            if param.startswith(FIELD_PARAM_PREFIX):
+                self.filters.extend(self._parse_filters(param[len(FIELD_PARAM_PREFIX):], query_params.getlist(param)))
+
+        ordering = query_params.get(ORDERING_PARAM)
+        if ordering:
+            self._parse_ordering(ordering)
+
+    def _field_type(self, field_name):
+        if field_name not in self.field_types:
+            raise serializers.ValidationError(f"Unknown field '{field_name}'")
+
+        field_type = self.field_types[field_name]
+        if field_type in UNFILTERABLE_FIELD_TYPES:
+            raise serializers.ValidationError(f"Field '{field_name}' cannot be filtered or sorted")
+        return field_type
+
+    def _parse_filters(self, spec, raws):
+        field_name, _, lookup = spec.rpartition(LOOKUP_SEPARATOR)
+        if not field_name or lookup not in RANGE_LOOKUPS + ('in', 'icontains'):
+            field_name, lookup = spec, 'exact'
+
+        field_type = self._field_type(field_name)
+
+        if lookup in RANGE_LOOKUPS and field_type not in RANGE_FIELD_TYPES:
+            raise serializers.ValidationError(
+                f"'{lookup}' filters are only supported on number and date fields"
+            )
+        if lookup == 'icontains' and field_type not in TEXT_FIELD_TYPES:
+            raise serializers.ValidationError(
+                "'icontains' filters are only supported on text fields"
+            )
+
+        if lookup == 'in':
+            # A repeated parameter gives one value per occurrence
+            items = raws if len(raws) > 1 else raws[0].split(',')
+            return [(field_name, field_type, lookup, [_coerce(field_name, field_type, item) for item in items])]
+        return [(field_name, field_type, lookup, [_coerce(field_name, field_type, raw)]) for raw in raws]
+
+    def _parse_ordering(self, ordering):
+        descending = ordering.startswith('-')
+        name = ordering.lstrip('-')
+
+        if name == 'submitted_at':
+            self.descending = descending
+            return
+
+        if not name.startswith(FIELD_PARAM_PREFIX):
+            raise serializers.ValidationError(
+                f"Invalid ordering '{ordering}'. Use 'submitted_at' or 'field.<name>'"
+            )
+
+        field_name = name[len(FIELD_PARAM_PREFIX):]
+        if self._field_type(field_name) in LIST_FIELD_TYPES:
+            raise serializers.ValidationError(f"Field '{field_name}' cannot be sorted")
+
+        self.ordering_field = field_name
+        self.ordering_expression = get_field_expression(field_name, self.field_types[field_name])
+        self.descending = descending
+
+    def apply(self, queryset):
+        """
+        Apply the field filters to a FormResponse queryset.
+
+        The sort order is left to the paginator.
+
+        Args:
+            queryset: QuerySet of FormResponse objects of the form
+
+        Returns:
+            QuerySet: Filtered queryset
+        """
+        for index, (field_name, field_type, lookup, values) in enumerate(self.filters):
+            alias = f'filter_{index}'
+
+            typed = field_type in RANGE_FIELD_TYPES
+            if lookup in ('exact', 'in') and not typed and connection.features.supports_json_field_contains:
+                # Containment is answered from the GIN index on response_data
+                condition = Q()
+                for value in values:
+                    if field_type in LIST_FIELD_TYPES:
+                        value = [value]
+                    condition |= Q(response_data__contains={field_name: value})
+                queryset = queryset.filter(condition)
+                continue
+
+            if field_type in LIST_FIELD_TYPES:
+                raise serializers.ValidationError(
+                    "Filtering on checkbox fields is not supported by this database"
+                )
+
+            if lookup == 'icontains':
+                queryset = queryset.alias(**{alias: KeyTextTransform(field_name, 'response_data')})
+            else:
+                queryset = queryset.alias(**{alias: get_field_expression(field_name, field_type)})
+
+            if lookup == 'in':
+                queryset = queryset.filter(**{f'{alias}__in': values})
+            else:
+                queryset = queryset.filter(**{f'{alias}__{lookup}': values[0]})
+        return queryset
+
+
+def get_field_index_name(form_id, field_name):
+    digest = hashlib.sha1(field_name.encode('utf-8')).hexdigest()[:10]
+    return f'formresponse_f{form_id}_{digest}_idx'
+
+
+def get_field_index(form_id, field_name, field_type):
+    """
+    Build the expression index on one field of one form.
+
+    The index is on the same expression as the filters and sort order, so
+    the planner can use it, and partial on the form, so it stays small and
+    only has to be created for fields that are actually filtered or sorted
+    on.
+
+    Args:
+        form_id: ID of the form
+        field_name: Name of the schema field
+        field_type: Type of the schema field
+
+    Returns:
+        Index: Index on FormResponse
+    """
+    return Index(
+        get_field_expression(field_name, field_type),
+        F('id'),
+        name=get_field_index_name(form_id, field_name),
+        condition=Q(form_id=form_id),
+    )
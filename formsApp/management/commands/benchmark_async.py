@@ -0,0 +1,101 @@
+import json
+import statistics
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+ENDPOINTS = {
+    # name: (sync path, async path, method)
+    'responses': ('/api/forms/{form}/responses/', '/api/async/forms/{form}/responses/', 'GET'),
+    'submit': ('/api/forms/{form}/submit/', '/api/async/forms/{form}/submit/', 'POST'),
+    'me': ('/api/users/me/', '/api/async/users/me/', 'GET'),
+}
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare concurrent-request throughput of the sync and async variants of an "
+        "endpoint against a running server (e.g. gunicorn sync workers vs uvicorn workers)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000', help="Server to benchmark")
+        parser.add_argument('--token', required=True, help="API token sent with every request")
+        parser.add_argument('--endpoint', choices=sorted(ENDPOINTS), default='responses')
+        parser.add_argument('--form', type=int, help="Form ID (responses and submit endpoints)")
+        parser.add_argument(
+            '--data',
+            default='{}',
+            help="JSON body posted by the submit endpoint, e.g. '{\"name\": \"x\"}'",
+        )
+        parser.add_argument('--requests', type=int, default=500, help="Requests per variant")
+        parser.add_argument('--concurrency', type=int, default=32, help="Requests in flight")
+        parser.add_argument('--variant', choices=['sync', 'async', 'both'], default='both')
+
+    def handle(self, *args, **options):
+        sync_path, async_path, method = ENDPOINTS[options['endpoint']]
+        if '{form}' in sync_path and options['form'] is None:
+            raise CommandError(f"--form is required for the {options['endpoint']} endpoint")
+
+        body = None
+        if method == 'POST':
+            try:
+                body = json.dumps(json.loads(options['data'])).encode('utf-8')
+            except ValueError as e:
+                raise CommandError(f"--data is not valid JSON: {e}")
+
+        variants = [('sync', sync_path), ('async', async_path)]
+        if options['variant'] != 'both':
+            variants = [v for v in variants if v[0] == options['variant']]
+
+        self.stdout.write(
+            f"{options['endpoint']}: {options['requests']} requests per variant, "
+            f"concurrency {options['concurrency']}"
+        )
+        self.stdout.write(
+            f"{'variant':<8} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}"
+        )
+        for name, path in variants:
+            url = options['base_url'].rstrip('/') + path.format(form=options['form'])
+            latencies, errors, elapsed = self.run(url, method, body, options)
+            rate = len(latencies) / elapsed if elapsed else 0.0
+            self.stdout.write(
+                f"{name:<8} {rate:>9.1f} {percentile(latencies, 0.5) * 1000:>9.1f} "
+                f"{percentile(latencies, 0.95) * 1000:>9.1f} {percentile(latencies, 0.99) * 1000:>9.1f} "
+                f"{errors:>7}"
+            )
+            if latencies:
+                self.stdout.write(f"         mean {statistics.mean(latencies) * 1000:.1f} ms")
+
+    def run(self, url, method, body, options):
+        headers = {'Authorization': f"Token {options['token']}", 'Accept': 'application/json'}
+        if body is not None:
+            headers['Content-Type'] = 'application/json'
+
+        def request(_):
+            req = urllib.request.Request(url, data=body, headers=headers, method=method)
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(req, timeout=60) as response:
+                    response.read()
+            except (urllib.error.URLError, OSError):
+                return None
+            return time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            results = list(pool.map(request, range(options['requests'])))
+        elapsed = time.perf_counter() - start
+
+        latencies = [result for result in results if result is not None]
+        return latencies, len(results) - len(latencies), elapsed
@@ -0,0 +1,95 @@
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+from django.utils.text import compress_sequence
+
+from formsApp.utils import build_write_only_workbook, iter_csv_chunks, iter_ndjson_chunks
+
+
+class _NullWriter:
+    """File object that only counts the bytes written to it."""
+
+    def __init__(self):
+        self.size = 0
+
+    def write(self, data):
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+
+def make_rows(fields, count):
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    rows = []
+    for i in range(count):
+        response_data = {}
+        for field in fields:
+            if field['type'] == 'number':
+                response_data[field['name']] = random.randint(0, 1000)
+            elif field['type'] == 'email':
+                response_data[field['name']] = f'user{i}@example.com'
+            else:
+                response_data[field['name']] = f'value {i} for {field["name"]}'
+        rows.append((i + 1, f'user{i % 500}@example.com', start + timedelta(seconds=i), response_data))
+    return rows
+
+
+class Command(BaseCommand):
+    help = "Compare export throughput (rows/second) of the xlsx, csv and ndjson renderers"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=50000, help="Number of synthetic responses")
+        parser.add_argument('--fields', type=int, default=10, help="Number of fields in the synthetic schema")
+        parser.add_argument('--gzip', action='store_true', help="Also measure gzip-encoded csv/ndjson")
+
+    def handle(self, *args, **options):
+        field_types = ['text', 'email', 'number', 'textarea']
+        fields = [
+            {'name': f'field_{i}', 'type': field_types[i % len(field_types)]}
+            for i in range(options['fields'])
+        ]
+        form = SimpleNamespace(schema={'fields': fields})
+        rows = make_rows(fields, options['rows'])
+
+        def run_xlsx():
+            writer = _NullWriter()
+            build_write_only_workbook(form, rows).save(writer)
+            return writer.size
+
+        def run_chunks(render, gzip=False):
+            def run():
+                content = render(form, rows)
+                if gzip:
+                    content = compress_sequence(content)
+                return sum(len(chunk) for chunk in content)
+            return run
+
+        cases = [
+            ('xlsx', run_xlsx),
+            ('csv', run_chunks(iter_csv_chunks)),
+            ('ndjson', run_chunks(iter_ndjson_chunks)),
+        ]
+        if options['gzip']:
+            cases += [
+                ('csv+gzip', run_chunks(iter_csv_chunks, gzip=True)),
+                ('ndjson+gzip', run_chunks(iter_ndjson_chunks, gzip=True)),
+            ]
+
+        self.stdout.write(f"{options['rows']} rows, {options['fields']} fields")
+        self.stdout.write(f"{'format':<12} {'seconds':>9} {'rows/s':>12} {'MB':>9} {'vs xlsx':>8}")
+        baseline = None
+        for name, run in cases:
+            start = time.perf_counter()
+            size = run()
+            elapsed = time.perf_counter() - start
+            rate = options['rows'] / elapsed if elapsed else 0.0
+            if baseline is None:
+                baseline = rate
+            self.stdout.write(
+                f"{name:<12} {elapsed:>9.2f} {rate:>12,.0f} {size / 1e6:>9.2f} {rate / baseline:>7.1f}x"
+            )
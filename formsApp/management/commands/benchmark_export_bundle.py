@@ -0,0 +1,94 @@
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.text import compress_sequence
+
+from formsApp.export_bundles import BUNDLE_RENDERERS, stream_export_bundle
+from formsApp.models import Form, FormResponse
+from formsApp.utils import iter_export_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare a multi-form export bundle against exporting the same forms one "
+        "after another, as separate single-form downloads would"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('form_ids', nargs='*', type=int, help="Forms to export")
+        parser.add_argument(
+            '--prefix',
+            help="Export all forms whose name starts with this, e.g. the --prefix of generate_synthetic_data",
+        )
+        parser.add_argument('--format', default='csv', choices=list(BUNDLE_RENDERERS))
+        parser.add_argument('--repeat', type=int, default=3, help="Timed runs of each variant")
+        parser.add_argument('--json-output', help="Also write the results to this JSON file")
+
+    def handle(self, *args, **options):
+        forms = Form.objects.all()
+        if options['form_ids']:
+            forms = forms.filter(id__in=options['form_ids'])
+        elif options['prefix']:
+            forms = forms.filter(name__startswith=options['prefix'])
+        else:
+            raise CommandError("Pass form ids or --prefix")
+        forms = list(forms.order_by('id'))
+        if not forms:
+            raise CommandError("No forms found")
+
+        export_format = options['format']
+        render = BUNDLE_RENDERERS[export_format]
+        rows = FormResponse.objects.filter(form__in=forms).count()
+
+        def run_sequential(gzip=False):
+            size = 0
+            for form in forms:
+                responses = FormResponse.objects.filter(form=form).order_by('-submitted_at', '-id')
+                content = render(form, iter_export_rows(responses))
+                if gzip:
+                    content = compress_sequence(content)
+                for chunk in content:
+                    size += len(chunk)
+            return size
+
+        def run_bundle():
+            return sum(len(chunk) for chunk in stream_export_bundle(forms, export_format))
+
+        def measure(run):
+            timings = []
+            for _ in range(options['repeat']):
+                start = time.perf_counter()
+                size = run()
+                timings.append(time.perf_counter() - start)
+            return statistics.median(timings), size
+
+        self.stdout.write(f"{len(forms)} forms, {rows} responses, {export_format}")
+        results = []
+        variants = [('sequential', run_sequential)]
+        if export_format != 'xlsx':
+            # As sent to clients accepting gzip, comparable to the deflated bundle
+            variants.append(('gzip', lambda: run_sequential(gzip=True)))
+        variants.append(('bundle', run_bundle))
+        for name, run in variants:
+            median, size = measure(run)
+            results.append({'variant': name, 'median': median, 'bytes': size})
+
+        baseline = results[0]['median']
+        self.stdout.write(f"{'variant':>10} {'seconds':>9} {'rows/s':>12} {'MB':>9} {'speedup':>8}")
+        for result in results:
+            result['speedup'] = baseline / result['median']
+            self.stdout.write(
+                f"{result['variant']:>10} {result['median']:>9.2f} {rows / result['median']:>12,.0f} "
+                f"{result['bytes'] / 1e6:>9.1f} {result['speedup']:>7.2f}x"
+            )
+
+        if options['json_output']:
+            with open(options['json_output'], 'w') as f:
+                json.dump({
+                    'forms': len(forms),
+                    'rows': rows,
+                    'format': export_format,
+                    'results': results,
+                }, f, indent=2)
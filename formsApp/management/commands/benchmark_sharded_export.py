@@ -0,0 +1,119 @@
+import json
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from formsApp.exports import EXPORT_CONTENT_TYPES, write_export_file
+from formsApp.models import Form, FormResponse
+from formsApp.sharded_exports import SHARD_LAYOUTS, run_sharded_export
+
+
+def default_process_counts():
+    counts = [1]
+    while counts[-1] * 2 <= (os.cpu_count() or 1):
+        counts.append(counts[-1] * 2)
+    return counts
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the speedup of sharded exports across process counts, against the "
+        "single-process export of the same form"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('form_id', type=int, help="Form to export, e.g. one made by generate_synthetic_data")
+        parser.add_argument('--format', default='xlsx', choices=list(EXPORT_CONTENT_TYPES))
+        parser.add_argument('--layout', default='zip', choices=SHARD_LAYOUTS)
+        parser.add_argument(
+            '--processes',
+            default=','.join(str(count) for count in default_process_counts()),
+            help="Comma-separated process counts (default: powers of two up to the CPU count)",
+        )
+        parser.add_argument(
+            '--shard-size',
+            type=int,
+            help="Responses per part (default: enough parts for the largest process count)",
+        )
+        parser.add_argument('--repeat', type=int, default=3, help="Timed runs per process count")
+        parser.add_argument('--json-output', help="Also write the results to this JSON file")
+
+    def handle(self, *args, **options):
+        try:
+            form = Form.objects.get(id=options['form_id'])
+        except Form.DoesNotExist:
+            raise CommandError(f"Form {options['form_id']} does not exist")
+        try:
+            process_counts = [int(count) for count in options['processes'].split(',')]
+        except ValueError:
+            raise CommandError("--processes must be a comma-separated list of integers")
+
+        responses = FormResponse.objects.filter(form=form)
+        total = responses.count()
+        if not total:
+            raise CommandError("The form has no responses")
+        # At least two parts per process, so the largest pool is not left idle
+        shard_size = options['shard_size'] or max(1, -(-total // (2 * max(process_counts))))
+        shard_size = min(shard_size, settings.EXPORT_SHARD_SIZE)
+        export_format, layout = options['format'], options['layout']
+        extension = 'xlsx' if layout == 'sheets' else 'zip'
+
+        def measure(run):
+            timings = []
+            for _ in range(options['repeat']):
+                start = time.perf_counter()
+                run()
+                timings.append(time.perf_counter() - start)
+            return statistics.median(timings)
+
+        with tempfile.TemporaryDirectory() as work_dir:
+            serial_path = Path(work_dir) / f'serial.{export_format}'
+            sharded_path = Path(work_dir) / f'sharded.{extension}'
+
+            def run_serial():
+                write_export_file(form, responses.order_by('id'), export_format, serial_path)
+
+            def run_sharded(processes):
+                return lambda: run_sharded_export(
+                    form, sharded_path, export_format=export_format, layout=layout,
+                    processes=processes, shard_size=shard_size,
+                )
+
+            self.stdout.write(
+                f"{total} responses, {export_format} parts of {shard_size} rows, {layout} layout, "
+                f"{os.cpu_count()} CPUs"
+            )
+            baseline = measure(run_serial)
+            results = [{'processes': 'serial', 'median': baseline, 'speedup': 1.0, 'efficiency': None}]
+            for processes in process_counts:
+                median = measure(run_sharded(processes))
+                results.append({
+                    'processes': processes,
+                    'median': median,
+                    'speedup': baseline / median,
+                    'efficiency': baseline / median / processes,
+                })
+
+        self.stdout.write(f"{'processes':>9} {'seconds':>9} {'rows/s':>12} {'speedup':>8} {'efficiency':>10}")
+        for result in results:
+            efficiency = '-' if result['efficiency'] is None else f"{result['efficiency'] * 100:.0f}%"
+            self.stdout.write(
+                f"{result['processes']:>9} {result['median']:>9.2f} {total / result['median']:>12,.0f} "
+                f"{result['speedup']:>7.2f}x {efficiency:>10}"
+            )
+
+        if options['json_output']:
+            with open(options['json_output'], 'w') as f:
+                json.dump({
+                    'rows': total,
+                    'format': export_format,
+                    'layout': layout,
+                    'shard_size': shard_size,
+                    'cpu_count': os.cpu_count(),
+                    'results': results,
+                }, f, indent=2)
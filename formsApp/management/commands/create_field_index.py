@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from formsApp.filters import UNFILTERABLE_FIELD_TYPES, get_field_index
+from formsApp.models import Form, FormResponse
+
+
+class Command(BaseCommand):
+    help = "Create (or drop) expression indexes for filtering and sorting a form's responses by field"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--form', type=int, required=True, help="ID of the form")
+        parser.add_argument(
+            '--field',
+            action='append',
+            dest='fields',
+            required=True,
+            help="Name of a schema field to index (repeatable)",
+        )
+        parser.add_argument('--drop', action='store_true', help="Drop the indexes instead of creating them")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError("Field indexes are only supported on PostgreSQL")
+
+        try:
+            form = Form.objects.get(id=options['form'])
+        except Form.DoesNotExist:
+            raise CommandError(f"Form {options['form']} does not exist")
+
+        fields = form.schema.get('fields', []) if isinstance(form.schema, dict) else []
+        field_types = {field.get('name'): field.get('type') for field in fields}
+
+        for field_name in options['fields']:
+            if field_name not in field_types:
+                raise CommandError(f"Form {form.id} has no field '{field_name}'")
+            if field_types[field_name] in UNFILTERABLE_FIELD_TYPES:
+                raise CommandError(f"Field '{field_name}' cannot be filtered or sorted")
+
+        with connection.cursor() as cursor:
+            existing = connection.introspection.get_constraints(cursor, FormResponse._meta.db_table)
+
+        for field_name in options['fields']:
+            index = get_field_index(form.id, field_name, field_types[field_name])
+            # CONCURRENTLY cannot run in a transaction; commands run in autocommit
+            with connection.schema_editor(atomic=False) as schema_editor:
+                if options['drop'] and index.name in existing:
+                    schema_editor.remove_index(FormResponse, index, concurrently=True)
+                elif not options['drop'] and index.name not in existing:
+                    schema_editor.add_index(FormResponse, index, concurrently=True)
+            action = "Dropped" if options['drop'] else "Created"
+            self.stdout.write(f"{action} index on field '{field_name}' of form {form.id}")
@@ -0,0 +1,57 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from formsApp.models import SlowQuery
+
+
+class Command(BaseCommand):
+    help = "Print the slow query log, newest first"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=20, help="Number of entries (0 for all)")
+        parser.add_argument('--origin', help="Only queries from this view or job")
+        parser.add_argument('--min-ms', type=float, help="Only queries at least this slow")
+        parser.add_argument('--with-plan', action='store_true', help="Only queries with an EXPLAIN plan")
+        parser.add_argument('--json', action='store_true', help="One JSON object per line")
+        parser.add_argument('--clear', action='store_true', help="Delete the whole log after printing")
+
+    def handle(self, *args, **options):
+        queries = SlowQuery.objects.all()
+        if options['origin']:
+            queries = queries.filter(origin=options['origin'])
+        if options['min_ms'] is not None:
+            queries = queries.filter(duration_ms__gte=options['min_ms'])
+        if options['with_plan']:
+            queries = queries.exclude(plan='')
+        if options['limit']:
+            queries = queries[:options['limit']]
+
+        for query in queries:
+            if options['json']:
+                self.stdout.write(json.dumps({
+                    'id': query.id,
+                    'recorded_at': query.recorded_at.isoformat(),
+                    'duration_ms': query.duration_ms,
+                    'alias': query.alias,
+                    'origin': query.origin,
+                    'sql': query.sql,
+                    'params': query.params,
+                    'plan': query.plan,
+                }))
+                continue
+
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"#{query.id} {query.recorded_at:%Y-%m-%d %H:%M:%S} "
+                f"{query.duration_ms:.1f}ms {query.origin or '-'} ({query.alias})"
+            ))
+            self.stdout.write(query.sql)
+            if query.params:
+                self.stdout.write(f"params: {query.params}")
+            if query.plan:
+                self.stdout.write(query.plan)
+            self.stdout.write('')
+
+        if options['clear']:
+            deleted, _ = SlowQuery.objects.all().delete()
+            self.stdout.write(f"Deleted {deleted} entries")
@@ -0,0 +1,125 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from formsApp.aggregates import rebuild_form_aggregates, reconcile_response_counters
+from formsApp.models import Form, FormResponse
+from formsApp.synthetic import build_schema, fake_response_data
+
+User = get_user_model()
+
+
+@contextmanager
+def explicit_submitted_at():
+    # submitted_at is auto_now_add; switch that off so bulk inserts keep the
+    # spread-out timestamps set on the objects.
+    field = FormResponse._meta.get_field('submitted_at')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = "Generate synthetic users, forms and responses for load testing"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--forms', type=int, default=10, help="Number of forms")
+        parser.add_argument('--fields', type=int, default=18, help="Fields per form (all nine types are used)")
+        parser.add_argument('--users', type=int, default=100, help="Number of users")
+        parser.add_argument('--responses', type=int, default=100000, help="Total number of responses")
+        parser.add_argument('--days', type=int, default=90, help="Spread submissions over this many past days")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Rows per INSERT")
+        parser.add_argument('--prefix', default='loadtest', help="Prefix of generated usernames and form names")
+        parser.add_argument('--password', default='loadtest-password', help="Password of all generated users")
+        parser.add_argument('--seed', type=int, help="Random seed for reproducible data")
+        parser.add_argument(
+            '--skip-aggregates',
+            action='store_true',
+            help="Do not rebuild the per-field aggregates afterwards",
+        )
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['forms'] < 1:
+            raise CommandError("--users and --forms must be at least 1")
+
+        rng = random.Random(options['seed'])
+        prefix = options['prefix']
+        start = time.perf_counter()
+
+        users = self.create_users(options)
+        owner = next((user for user in users if user.role == 'admin'), users[0])
+        forms = [
+            Form.objects.create(
+                name=f'{prefix} form {i}',
+                description='Synthetic form for load testing',
+                schema=build_schema(options['fields'], rng),
+                created_by=owner,
+            )
+            for i in range(options['forms'])
+        ]
+        self.stdout.write(f"Created {len(users)} users and {len(forms)} forms")
+
+        self.create_responses(options, rng, users, forms)
+
+        form_ids = [form.id for form in forms]
+        reconcile_response_counters(Form.objects.filter(id__in=form_ids))
+        if not options['skip_aggregates']:
+            for form in forms:
+                rebuild_form_aggregates(form)
+
+        self.stdout.write(f"Done in {time.perf_counter() - start:.1f}s")
+
+    def create_users(self, options):
+        prefix = options['prefix']
+        # Hashing is slow on purpose; every user shares one hash
+        password = make_password(options['password'])
+        users = []
+        for i in range(options['users']):
+            if i == 0:
+                role = 'admin'
+            elif i % 10 == 1:
+                role = 'editor'
+            else:
+                role = 'viewer'
+            users.append(User(
+                username=f'{prefix}_{i}',
+                email=f'{prefix}{i}@example.com',
+                role=role,
+                password=password,
+            ))
+        User.objects.bulk_create(users, batch_size=options['batch_size'], ignore_conflicts=True)
+        return list(User.objects.filter(username__startswith=f'{prefix}_').order_by('id'))
+
+    def create_responses(self, options, rng, users, forms):
+        total = options['responses']
+        batch_size = options['batch_size']
+        now = timezone.now()
+        span = options['days'] * 86400
+        user_ids = [user.id for user in users]
+
+        created = 0
+        start = time.perf_counter()
+        with explicit_submitted_at():
+            while created < total:
+                batch = []
+                for seq in range(created, min(created + batch_size, total)):
+                    form = rng.choice(forms)
+                    batch.append(FormResponse(
+                        form_id=form.id,
+                        user_id=rng.choice(user_ids),
+                        response_data=fake_response_data(form.schema, rng, seq),
+                        submitted_at=now - timedelta(seconds=rng.randint(0, span)),
+                    ))
+                FormResponse.objects.bulk_create(batch, batch_size=batch_size)
+                created += len(batch)
+
+                elapsed = time.perf_counter() - start
+                self.stdout.write(f"{created}/{total} responses ({created / elapsed:,.0f} rows/s)")
@@ -0,0 +1,208 @@
+import asyncio
+import json
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from formsApp.synthetic import fake_response_data
+from .benchmark_async import percentile
+
+OPERATIONS = ['submit', 'responses', 'export', 'login', 'forms']
+
+DEFAULT_MIX = 'submit=5,responses=3,export=1,login=1,forms=5'
+
+
+def parse_mix(value):
+    weights = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise CommandError(f"Unknown operation '{name}' in --mix, expected one of {', '.join(OPERATIONS)}")
+        try:
+            weights[name] = float(weight or 1)
+        except ValueError:
+            raise CommandError(f"Invalid weight '{weight}' for {name} in --mix")
+    if not any(weights.values()):
+        raise CommandError("--mix needs at least one operation with a positive weight")
+    return weights
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive a running server with a weighted mix of submit, responses, export-excel, "
+        "login and form reads, then report throughput and p50/p95/p99 latency per operation. "
+        "Use the users created by generate_synthetic_data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000', help="Server to load")
+        parser.add_argument('--duration', type=float, default=30, help="Seconds to run")
+        parser.add_argument('--requests', type=int, help="Stop after this many requests instead of --duration")
+        parser.add_argument('--concurrency', type=int, default=32, help="Requests in flight")
+        parser.add_argument('--mix', default=DEFAULT_MIX, help=f"Operation weights (default {DEFAULT_MIX})")
+        parser.add_argument(
+            '--prefix',
+            default='loadtest',
+            help="Prefix passed to generate_synthetic_data; its admin user drives editor endpoints",
+        )
+        parser.add_argument('--password', default='loadtest-password', help="Password of the synthetic users")
+        parser.add_argument('--users', type=int, default=20, help="Synthetic users to log in as")
+        parser.add_argument('--export-format', choices=['xlsx', 'csv', 'ndjson'], default='csv')
+        parser.add_argument('--page-size', type=int, default=50, help="page_size for responses requests")
+        parser.add_argument('--seed', type=int, help="Random seed")
+        parser.add_argument('--json-output', help="Also write the report to this JSON file")
+
+    def handle(self, *args, **options):
+        try:
+            import httpx
+        except ImportError:
+            raise CommandError("httpx is required for load testing: pipenv install --dev")
+
+        if options['concurrency'] < 1:
+            raise CommandError("--concurrency must be at least 1")
+
+        weights = parse_mix(options['mix'])
+        report = asyncio.run(self.run(httpx, weights, options))
+
+        self.stdout.write(
+            f"{'operation':<10} {'count':>7} {'errors':>7} {'req/s':>9} "
+            f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+        )
+        for name, row in report['operations'].items():
+            self.stdout.write(
+                f"{name:<10} {row['count']:>7} {row['errors']:>7} {row['throughput']:>9.1f} "
+                f"{row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f}"
+            )
+        self.stdout.write(
+            f"total: {report['requests']} requests in {report['elapsed']:.1f}s "
+            f"({report['throughput']:.1f} req/s), {report['errors']} errors"
+        )
+
+        if options['json_output']:
+            with open(options['json_output'], 'w') as f:
+                json.dump(report, f, indent=2)
+
+    async def run(self, httpx, weights, options):
+        rng = random.Random(options['seed'])
+        limits = httpx.Limits(max_connections=options['concurrency'])
+        async with httpx.AsyncClient(base_url=options['base_url'].rstrip('/'), limits=limits, timeout=120) as client:
+            tokens, admin_token, forms = await self.setup(client, options)
+
+            latencies = {name: [] for name in weights}
+            errors = dict.fromkeys(weights, 0)
+            names = list(weights)
+            operation_weights = list(weights.values())
+            budget = {'remaining': options['requests']}
+            deadline = time.perf_counter() + options['duration']
+            sequence = iter(range(10 ** 12))
+
+            def keep_going():
+                if budget['remaining'] is None:
+                    return time.perf_counter() < deadline
+                budget['remaining'] -= 1
+                return budget['remaining'] >= 0
+
+            async def worker():
+                while keep_going():
+                    name = rng.choices(names, weights=operation_weights)[0]
+                    form = rng.choice(forms)
+                    start = time.perf_counter()
+                    try:
+                        response = await self.request(
+                            client, name, form, rng, tokens, admin_token, next(sequence), options
+                        )
+                        ok = response.status_code < 400
+                    except httpx.HTTPError:
+                        ok = False
+                    if ok:
+                        latencies[name].append(time.perf_counter() - start)
+                    else:
+                        errors[name] += 1
+
+            start = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(options['concurrency'])))
+            elapsed = time.perf_counter() - start
+
+        operations = {}
+        for name in names:
+            values = latencies[name]
+            operations[name] = {
+                'count': len(values),
+                'errors': errors[name],
+                'throughput': len(values) / elapsed if elapsed else 0.0,
+                'p50_ms': percentile(values, 0.5) * 1000,
+                'p95_ms': percentile(values, 0.95) * 1000,
+                'p99_ms': percentile(values, 0.99) * 1000,
+            }
+        total = sum(row['count'] for row in operations.values())
+        return {
+            'base_url': options['base_url'],
+            'concurrency': options['concurrency'],
+            'mix': weights,
+            'elapsed': elapsed,
+            'requests': total,
+            'errors': sum(errors.values()),
+            'throughput': total / elapsed if elapsed else 0.0,
+            'operations': operations,
+        }
+
+    async def setup(self, client, options):
+        prefix = options['prefix']
+        emails = [f'{prefix}{i}@example.com' for i in range(max(1, options['users']))]
+        results = await asyncio.gather(*(
+            client.post('/api/users/login/', json={'email': email, 'password': options['password']})
+            for email in emails
+        ))
+        # User 0 is the synthetic admin, which can read responses and export
+        if results[0].status_code != 200:
+            raise CommandError(f"Could not log in as {emails[0]}; run generate_synthetic_data first")
+        logged_in = [
+            (email, response.json()['token'])
+            for email, response in zip(emails, results)
+            if response.status_code == 200
+        ]
+        options['emails'] = [email for email, _ in logged_in]
+        tokens = [token for _, token in logged_in]
+        admin_token = tokens[0]
+
+        response = await client.get('/api/forms/', headers={'Authorization': f'Token {admin_token}'})
+        response.raise_for_status()
+        data = response.json()
+        forms = data['results'] if isinstance(data, dict) else data
+        forms = [form for form in forms if form['name'].startswith(f'{prefix} form')]
+        if not forms:
+            raise CommandError(f"No '{prefix} form' forms found; run generate_synthetic_data first")
+
+        self.stdout.write(f"Logged in {len(tokens)} users, {len(forms)} forms")
+        return tokens, admin_token, forms
+
+    async def request(self, client, name, form, rng, tokens, admin_token, seq, options):
+        if name == 'submit':
+            return await client.post(
+                f"/api/forms/{form['id']}/submit/",
+                json=fake_response_data(form['schema'], rng, seq, include_files=False),
+                headers={'Authorization': f'Token {rng.choice(tokens)}'},
+            )
+        if name == 'responses':
+            return await client.get(
+                f"/api/forms/{form['id']}/responses/",
+                params={'page_size': options['page_size'], 'include_total': 'false'},
+                headers={'Authorization': f'Token {admin_token}'},
+            )
+        if name == 'export':
+            return await client.get(
+                f"/api/forms/{form['id']}/export-excel/",
+                params={} if options['export_format'] == 'xlsx' else {'format': options['export_format']},
+                headers={'Authorization': f'Token {admin_token}'},
+            )
+        if name == 'login':
+            return await client.post('/api/users/login/', json={
+                'email': rng.choice(options['emails']),
+                'password': options['password'],
+            })
+        return await client.get(
+            f"/api/forms/{form['id']}/",
+            headers={'Authorization': f'Token {rng.choice(tokens)}'},
+        )
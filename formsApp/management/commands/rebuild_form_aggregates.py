@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from formsApp.aggregates import rebuild_form_aggregates
+from formsApp.models import Form
+
+
+class Command(BaseCommand):
+    help = "Recompute the per-field response aggregates of forms from scratch"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--form',
+            type=int,
+            action='append',
+            dest='form_ids',
+            help="ID of a form to rebuild (repeatable, default: all forms)",
+        )
+
+    def handle(self, *args, **options):
+        forms = Form.objects.order_by('id')
+        if options['form_ids']:
+            forms = forms.filter(id__in=options['form_ids'])
+
+        for form in forms.iterator():
+            rows = rebuild_form_aggregates(form)
+            self.stdout.write(f"Form {form.id} ({form.name}): {rows} aggregate rows")
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from formsApp.aggregates import reconcile_response_counters
+from formsApp.models import Form
+
+
+class Command(BaseCommand):
+    help = "Correct drift in the denormalized response counters of forms"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--form',
+            type=int,
+            action='append',
+            dest='form_ids',
+            help="ID of a form to check (repeatable, default: all forms)",
+        )
+
+    def handle(self, *args, **options):
+        forms = Form.objects.all()
+        if options['form_ids']:
+            forms = forms.filter(id__in=options['form_ids'])
+
+        corrected = reconcile_response_counters(forms)
+        self.stdout.write(f"Corrected response counters of {corrected} form(s)")
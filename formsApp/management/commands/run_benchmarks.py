@@ -0,0 +1,131 @@
+import json
+import random
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from formsApp.benchmarks import BENCHMARKS, DatabaseSource, InMemorySource, compare, get_environment, run_benchmark
+from formsApp.models import Form
+
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / 'benchmarks' / 'baseline.json'
+
+
+def format_change(change):
+    return '-' if change is None else f'{change * 100:+.1f}%'
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the serializer, validation and export micro-benchmarks, track peak memory with "
+        "tracemalloc and compare against a stored baseline"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'benchmarks',
+            nargs='*',
+            metavar='name',
+            help=f"Benchmarks to run (default all): {', '.join(b.name for b in BENCHMARKS)}",
+        )
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE), help="Baseline JSON file")
+        parser.add_argument(
+            '--save-baseline',
+            action='store_true',
+            help="Store these results in the baseline file (other benchmarks in it are kept)",
+        )
+        parser.add_argument(
+            '--form',
+            type=int,
+            help="Read rows from this form in the database instead of generating them in memory",
+        )
+        parser.add_argument('--repeat', type=int, help="Timed runs per benchmark (default per benchmark)")
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.10,
+            help="Relative slowdown or memory growth reported as a regression (default 0.10)",
+        )
+        parser.add_argument(
+            '--fail-on-regression',
+            action='store_true',
+            help="Exit with an error when any benchmark regressed",
+        )
+        parser.add_argument('--seed', type=int, default=0, help="Random seed for generated inputs")
+        parser.add_argument('--json-output', help="Also write the comparison report to this JSON file")
+
+    def handle(self, *args, **options):
+        by_name = {benchmark.name: benchmark for benchmark in BENCHMARKS}
+        unknown = [name for name in options['benchmarks'] if name not in by_name]
+        if unknown:
+            raise CommandError(f"Unknown benchmark(s): {', '.join(unknown)}")
+        selected = [by_name[name] for name in options['benchmarks']] or BENCHMARKS
+
+        rng = random.Random(options['seed'])
+        if options['form'] is not None:
+            try:
+                source = DatabaseSource(rng, options['form'])
+            except Form.DoesNotExist:
+                raise CommandError(f"Form {options['form']} does not exist")
+        else:
+            source = InMemorySource(rng)
+
+        # In-memory and database runs are not comparable; each has its own baseline
+        baseline_path = Path(options['baseline'])
+        baselines = {}
+        if baseline_path.exists():
+            with open(baseline_path) as f:
+                baselines = json.load(f)
+        baseline = baselines.setdefault(source.name, {'environment': None, 'results': {}})
+
+        environment = get_environment(source)
+        if baseline['environment'] and baseline['environment'] != environment:
+            self.stdout.write(self.style.WARNING(
+                f"Baseline was recorded on {baseline['environment']}, this run is {environment}"
+            ))
+
+        results = {}
+        for benchmark in selected:
+            self.stdout.write(f"{benchmark.name}: {benchmark.description}")
+            try:
+                results[benchmark.name] = run_benchmark(benchmark, source, options['repeat'], options['seed'])
+            except ValueError as e:
+                raise CommandError(f"{benchmark.name}: {e}")
+
+        rows = compare(results, baseline['results'], options['threshold'])
+        self.stdout.write('')
+        self.stdout.write(
+            f"{'benchmark':<20} {'median s':>10} {'us/item':>10} {'peak KB':>9} "
+            f"{'base s':>9} {'time':>8} {'memory':>8}  status"
+        )
+        for row in rows:
+            result, previous = row['result'], row['baseline']
+            base = f"{previous['median']:>9.4f}" if previous else f"{'-':>9}"
+            status = row['status']
+            if status == 'REGRESSION':
+                status = self.style.ERROR(status)
+            elif status == 'faster':
+                status = self.style.SUCCESS(status)
+            self.stdout.write(
+                f"{row['name']:<20} {result['median']:>10.4f} {result['per_item_us']:>10.2f} "
+                f"{result['peak_bytes'] / 1024:>9,.0f} {base} {format_change(row['time_change']):>8} "
+                f"{format_change(row['memory_change']):>8}  {status}"
+            )
+
+        if options['json_output']:
+            with open(options['json_output'], 'w') as f:
+                json.dump({'environment': environment, 'threshold': options['threshold'], 'rows': rows}, f, indent=2)
+
+        if options['save_baseline']:
+            baseline['environment'] = environment
+            baseline['recorded_at'] = timezone.now().isoformat()
+            baseline['results'].update(results)
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(baseline_path, 'w') as f:
+                json.dump(baselines, f, indent=2, sort_keys=True)
+            self.stdout.write(f"Saved baseline to {baseline_path}")
+
+        regressions = [row['name'] for row in rows if row['status'] == 'REGRESSION']
+        if regressions and options['fail_on_regression']:
+            raise CommandError(f"Regressed: {', '.join(regressions)}")
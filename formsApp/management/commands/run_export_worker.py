@@ -0,0 +1,135 @@
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from formsApp.exports import (
+    claim_pending_jobs, get_worker_id, purge_expired_exports, release_crashed_jobs, requeue_orphaned_jobs,
+    requeue_stale_jobs, run_export_job,
+)
+from formsApp.models import ExportJob
+
+# Seconds between sweeps of expired export files
+PURGE_INTERVAL = 3600
+# Seconds between sweeps for jobs running longer than EXPORT_JOB_TIMEOUT
+STALE_INTERVAL = 60
+
+
+def _close_connections():
+    # Forked workers must not share the parent's database sockets
+    connections.close_all()
+
+
+def _create_pool(processes):
+    _close_connections()
+    return ProcessPoolExecutor(
+        max_workers=processes,
+        mp_context=multiprocessing.get_context('fork'),
+        initializer=_close_connections,
+    )
+
+
+class Command(BaseCommand):
+    help = "Build queued form exports in a pool of worker processes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=settings.EXPORT_WORKER_PROCESSES,
+            help="Number of export processes (default: EXPORT_WORKER_PROCESSES)",
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2.0,
+            help="Seconds to wait between queue polls when idle",
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help="Exit once the queue is empty instead of polling forever",
+        )
+
+    def handle(self, *args, **options):
+        processes = max(1, options['processes'])
+        poll_interval = options['poll_interval']
+
+        worker = get_worker_id()
+
+        # Jobs of a previous worker on this host, e.g. before a restart
+        requeued, failed = requeue_orphaned_jobs()
+        if requeued or failed:
+            self.stdout.write(f"Requeued {requeued} orphaned export job(s), {failed} out of attempts")
+
+        pool = _create_pool(processes)
+        self.stdout.write(f"Export worker {worker} started with {processes} process(es)")
+
+        in_flight = {}
+        last_purge = last_stale_check = None
+        try:
+            while True:
+                now = time.monotonic()
+                if last_stale_check is None or now - last_stale_check >= STALE_INTERVAL:
+                    # Jobs of workers that died on other hosts, and jobs that hang
+                    requeued, failed = requeue_stale_jobs()
+                    if requeued or failed:
+                        self.stdout.write(f"Requeued {requeued} stale export job(s), {failed} out of attempts")
+                    last_stale_check = now
+                if last_purge is None or now - last_purge >= PURGE_INTERVAL:
+                    purge_expired_exports()
+                    last_purge = now
+
+                claimed = []
+                free = processes - len(in_flight)
+                if free > 0:
+                    claimed = claim_pending_jobs(free, worker)
+                    try:
+                        for job_id in claimed:
+                            in_flight[pool.submit(run_export_job, job_id)] = job_id
+                    except BrokenProcessPool:
+                        pool = self.replace_broken_pool(pool, processes, in_flight, claimed)
+                        continue
+
+                if not in_flight:
+                    if options['once'] and not claimed:
+                        break
+                    time.sleep(poll_interval)
+                    continue
+
+                done, _ = wait(in_flight, timeout=poll_interval, return_when=FIRST_COMPLETED)
+                if any(isinstance(future.exception(), BrokenProcessPool) for future in done):
+                    pool = self.replace_broken_pool(pool, processes, in_flight)
+                    continue
+                for future in done:
+                    job_id = in_flight.pop(future)
+                    error = future.exception()
+                    if error is not None:
+                        self.stderr.write(f"Export job {job_id} crashed: {error}")
+                    else:
+                        self.stdout.write(f"Export job {job_id} processed")
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping export worker")
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def replace_broken_pool(self, pool, processes, in_flight, claimed=()):
+        """
+        Recover from a worker process that died (e.g. killed for running out
+        of memory), which breaks the whole pool and every job running in it.
+
+        The jobs are requeued, or failed once out of attempts, and a new
+        pool is started.
+        """
+        job_ids = set(in_flight.values()) | set(claimed)
+        in_flight.clear()
+        requeued, failed = release_crashed_jobs(ExportJob.objects.filter(id__in=job_ids))
+        self.stderr.write(
+            f"Export process pool broke: requeued {requeued} job(s), failed {failed} out of attempts"
+        )
+        pool.shutdown(wait=True, cancel_futures=True)
+        return _create_pool(processes)
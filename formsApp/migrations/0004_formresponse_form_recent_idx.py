@@ -0,0 +1,38 @@
+# Generated by Django 6.0.2 on 2026-10-17 06:23
+
+from django.db import migrations, models
+
+INDEX = models.Index(fields=['form', '-submitted_at', '-id'], name='formresponse_form_recent_idx')
+
+
+def create_index(apps, schema_editor):
+    FormResponse = apps.get_model('formsApp', 'FormResponse')
+    if schema_editor.connection.vendor == 'postgresql':
+        # Builds without locking the table against new submissions
+        schema_editor.add_index(FormResponse, INDEX, concurrently=True)
+    else:
+        schema_editor.add_index(FormResponse, INDEX)
+
+
+def drop_index(apps, schema_editor):
+    FormResponse = apps.get_model('formsApp', 'FormResponse')
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.remove_index(FormResponse, INDEX, concurrently=True)
+    else:
+        schema_editor.remove_index(FormResponse, INDEX)
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('formsApp', '0003_form_allow_excel_download'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[migrations.RunPython(create_index, drop_index)],
+            state_operations=[migrations.AddIndex(model_name='formresponse', index=INDEX)],
+        ),
+    ]
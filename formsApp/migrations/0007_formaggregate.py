@@ -0,0 +1,31 @@
+# Generated by Django 6.0.2 on 2026-10-17 06:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('formsApp', '0006_alter_exportjob_format'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FormAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('option', 'Option count'), ('number', 'Number statistics'), ('day', 'Submissions per day')], max_length=10)),
+                ('field_name', models.CharField(blank=True, max_length=255)),
+                ('key', models.CharField(blank=True, max_length=255)),
+                ('count', models.BigIntegerField(default=0)),
+                ('total', models.FloatField(blank=True, null=True)),
+                ('minimum', models.FloatField(blank=True, null=True)),
+                ('maximum', models.FloatField(blank=True, null=True)),
+                ('form', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aggregates', to='formsApp.form')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('form', 'kind', 'field_name', 'key'), name='formaggregate_unique_key')],
+            },
+        ),
+    ]
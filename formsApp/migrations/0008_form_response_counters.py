@@ -0,0 +1,40 @@
+# Generated by Django 6.0.2 on 2026-10-17 07:05
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_response_counters(apps, schema_editor):
+    Form = apps.get_model('formsApp', 'Form')
+    FormResponse = apps.get_model('formsApp', 'FormResponse')
+
+    responses = FormResponse.objects.filter(form=OuterRef('pk')).order_by()
+    Form.objects.update(
+        response_count=Coalesce(
+            Subquery(responses.values('form').annotate(n=Count('id')).values('n')),
+            Value(0),
+        ),
+        last_submitted_at=Subquery(responses.order_by('-submitted_at').values('submitted_at')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('formsApp', '0007_formaggregate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='form',
+            name='last_submitted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='form',
+            name='response_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_response_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 6.0.2 on 2026-10-17 07:41
+
+from django.db import migrations
+
+INDEX_NAME = 'formresponse_data_gin_idx'
+
+
+def create_gin_index(apps, schema_editor):
+    # GIN indexes and JSONB containment only exist on PostgreSQL
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    FormResponse = apps.get_model('formsApp', 'FormResponse')
+    # A failed concurrent build leaves an invalid index behind, which
+    # IF NOT EXISTS would keep; drop it so a rerun builds it again
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM pg_index JOIN pg_class ON pg_class.oid = pg_index.indexrelid '
+            'WHERE pg_class.relname = %s AND NOT pg_index.indisvalid',
+            [INDEX_NAME],
+        )
+        invalid = cursor.fetchone() is not None
+    if invalid:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {INDEX_NAME}')
+    # Builds without locking the table against new submissions
+    schema_editor.execute(
+        f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {INDEX_NAME} ON '
+        f'{schema_editor.quote_name(FormResponse._meta.db_table)} '
+        f'USING gin (response_data jsonb_path_ops)'
+    )
+
+
+def drop_gin_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('formsApp', '0008_form_response_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_gin_index, drop_gin_index),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('formsApp', '0010_slowquery'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exportjob',
+            name='next_cursor',
+            field=models.CharField(blank=True, help_text='Cursor to pass as since for the next delta export', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='exportjob',
+            name='since',
+            field=models.CharField(blank=True, help_text='Cursor a delta export starts after', max_length=255, null=True),
+        ),
+    ]
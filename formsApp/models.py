@@ -17,6 +17,10 @@ class Form(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Denormalized from FormResponse, kept up to date with F() updates.
+    # Run the reconcile_form_counters command to fix any drift.
+    response_count = models.PositiveIntegerField(default=0)
+    last_submitted_at = models.DateTimeField(null=True, blank=True)
     
     class Meta:
         ordering = ['-created_at']
@@ -36,6 +40,140 @@ class FormResponse(models.Model):
     
     class Meta:
         ordering = ['-submitted_at']
+        indexes = [
+            models.Index(fields=['form', '-submitted_at', '-id'], name='formresponse_form_recent_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.email} - {self.form.name} - {self.submitted_at}"
+
+
+class FormAggregate(models.Model):
+    """
+    Running totals over a form's responses, maintained on every insert.
+    
+    One row per (kind, field_name, key):
+    - option: count of an option value of a select/radio/checkbox field
+    - number: count/total/minimum/maximum of a number field (empty key)
+    - day: number of submissions on a date (empty field_name, key YYYY-MM-DD)
+    """
+    KIND_CHOICES = [
+        ('option', 'Option count'),
+        ('number', 'Number statistics'),
+        ('day', 'Submissions per day'),
+    ]
+    
+    form = models.ForeignKey(Form, on_delete=models.CASCADE, related_name='aggregates')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    field_name = models.CharField(max_length=255, blank=True)
+    key = models.CharField(max_length=255, blank=True)
+    count = models.BigIntegerField(default=0)
+    total = models.FloatField(null=True, blank=True)
+    minimum = models.FloatField(null=True, blank=True)
+    maximum = models.FloatField(null=True, blank=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['form', 'kind', 'field_name', 'key'],
+                name='formaggregate_unique_key',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.form.name} - {self.kind} - {self.field_name} - {self.key}"
+
+class ExportJob(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    FORMAT_CHOICES = [
+        ('xlsx', 'Excel'),
+        ('csv', 'CSV'),
+        ('ndjson', 'NDJSON'),
+    ]
+    
+    form = models.ForeignKey(Form, on_delete=models.CASCADE, related_name='export_jobs')
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='export_jobs'
+    )
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES, default='xlsx')
+    snapshot_key = models.CharField(
+        max_length=64,
+        help_text="Hash of the form snapshot and format, used to share builds"
+    )
+    last_response_id = models.BigIntegerField(
+        null=True,
+        blank=True,
+        help_text="Newest response included in the export"
+    )
+    # NULL means a full export, '' a delta export from the first response
+    since = models.CharField(
+        max_length=255,
+        null=True,
+        blank=True,
+        help_text="Cursor a delta export starts after"
+    )
+    next_cursor = models.CharField(
+        max_length=255,
+        blank=True,
+        help_text="Cursor to pass as since for the next delta export"
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0, help_text="Number of times a worker claimed the job")
+    worker = models.CharField(max_length=255, blank=True, help_text="Worker process (host:pid) running the job")
+    file_path = models.CharField(max_length=500, blank=True)
+    row_count = models.PositiveIntegerField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='exportjob_status_idx'),
+        ]
+        constraints = [
+            # Failed jobs don't count, so the same snapshot can be retried
+            models.UniqueConstraint(
+                fields=['snapshot_key'],
+                condition=~models.Q(status='failed'),
+                name='exportjob_unique_active_snapshot',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.form.name} - {self.format} - {self.status}"
+
+
+class SlowQuery(models.Model):
+    """
+    A query that took longer than SLOW_QUERY_THRESHOLD_MS.
+
+    The table is a ring buffer: it is trimmed to the newest
+    SLOW_QUERY_LOG_SIZE rows whenever new entries are saved.
+    """
+    recorded_at = models.DateTimeField()
+    duration_ms = models.FloatField()
+    alias = models.CharField(max_length=100, help_text="Database alias")
+    origin = models.CharField(
+        max_length=255,
+        blank=True,
+        help_text="URL name of the view, or the job that ran the query"
+    )
+    sql = models.TextField()
+    params = models.TextField(blank=True)
+    plan = models.TextField(blank=True, help_text="EXPLAIN output, for sampled queries only")
+    
+    class Meta:
+        ordering = ['-id']
+        verbose_name_plural = 'slow queries'
+    
+    def __str__(self):
+        return f"{self.duration_ms:.0f}ms {self.origin} - {self.sql[:80]}"
@@ -0,0 +1,151 @@
+import base64
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.utils.urls import replace_query_param
+
+
+def encode_cursor(value, pk):
+    """
+    Encode a (sort value, id) position as an opaque cursor token.
+
+    Args:
+        value: Sort value of the response, e.g. its submission datetime
+        pk: ID of the response
+
+    Returns:
+        str: URL-safe cursor token
+    """
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = json.dumps([value, pk], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """
+    Decode a cursor token produced by encode_cursor.
+
+    Args:
+        token: Cursor token string
+
+    Returns:
+        tuple: (sort value, id), datetimes as ISO strings
+
+    Raises:
+        ValueError: If the token is malformed
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        value, pk = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        pk = int(pk)
+    except (TypeError, ValueError, UnicodeError):
+        raise ValueError("Invalid cursor")
+    return value, pk
+
+
+class ResponseKeysetPagination(BasePagination):
+    """
+    Keyset pagination over form responses, newest first by default.
+
+    Pages are selected with a (sort value, id) position instead of an
+    offset, so every page is a bounded index range scan on the
+    (form, -submitted_at, -id) index, or on a field's expression index
+    when sorting by a field, no matter how deep the client pages.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self, ordering_expression=None, descending=True):
+        self.page_size = settings.RESPONSES_PAGE_SIZE
+        self.max_page_size = settings.RESPONSES_MAX_PAGE_SIZE
+        # Expression of the sorted field from ResponseQuery, None to sort by
+        # submission time
+        self.ordering_expression = ordering_expression
+        self.descending = descending
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def _sort_key(self, queryset):
+        if self.ordering_expression is None:
+            return queryset, 'submitted_at'
+
+        # Responses without a value for the field have no position in the
+        # order and are left out.
+        queryset = queryset.annotate(sort_value=self.ordering_expression).filter(sort_value__isnull=False)
+        return queryset, 'sort_value'
+
+    def _decode_position(self, token):
+        value, pk = decode_cursor(token)
+        if self.ordering_expression is None:
+            value = parse_datetime(value) if isinstance(value, str) else None
+            if value is None:
+                raise ValueError("Invalid cursor")
+        return value, pk
+
+    def get_page_queryset(self, queryset, request):
+        """
+        Build the query for the requested page, one row beyond its end.
+
+        Raises:
+            NotFound: If the cursor is malformed
+        """
+        self.request = request
+        self.current_page_size = self.get_page_size(request)
+
+        queryset, self.sort_key = self._sort_key(queryset)
+        if self.descending:
+            queryset = queryset.order_by(f'-{self.sort_key}', '-id')
+        else:
+            queryset = queryset.order_by(self.sort_key, 'id')
+
+        token = request.query_params.get(self.cursor_query_param)
+        if token:
+            try:
+                value, pk = self._decode_position(token)
+            except ValueError:
+                raise NotFound(self.invalid_cursor_message)
+            # The lte/gte filter keeps the scan on the index range; the
+            # exclude drops rows of the same sort value already returned.
+            if self.descending:
+                queryset = queryset.filter(**{f'{self.sort_key}__lte': value}).exclude(
+                    **{self.sort_key: value, 'id__gte': pk}
+                )
+            else:
+                queryset = queryset.filter(**{f'{self.sort_key}__gte': value}).exclude(
+                    **{self.sort_key: value, 'id__lte': pk}
+                )
+
+        return queryset[:self.current_page_size + 1]
+
+    def set_page(self, results):
+        self.has_next = len(results) > self.current_page_size
+        self.page = results[:self.current_page_size]
+        return self.page
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.set_page(list(self.get_page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        return self.set_page([obj async for obj in self.get_page_queryset(queryset, request)])
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+
+        last = self.page[-1]
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encode_cursor(getattr(last, self.sort_key), last.id))
@@ -0,0 +1,176 @@
+"""
+Slow query log.
+
+With SLOW_QUERY_THRESHOLD_MS set, every database connection gets an
+execute wrapper timing its queries. Slower queries are kept in memory with
+the view (or job) they came from and, for a sample of them, their EXPLAIN
+plan. They are written to the SlowQuery table once the request or job is
+over, so the log never adds writes to the request's own transaction.
+"""
+
+import contextvars
+import functools
+import logging
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import DatabaseError, transaction
+from django.db.backends.signals import connection_created
+from django.utils import timezone
+
+from forms.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+SQL_MAX_LENGTH = 10000
+PARAMS_MAX_LENGTH = 2000
+
+# Holds a one-item list with the origin name, so process_view can fill in
+# the view after the context variable was set
+_origin = contextvars.ContextVar('slow_query_origin', default=None)
+# Set while the log runs its own queries (EXPLAIN, saving), which are not timed
+_capturing = contextvars.ContextVar('slow_query_capturing', default=False)
+
+_pending = deque(maxlen=max(1, settings.SLOW_QUERY_LOG_SIZE))
+_flush_lock = threading.Lock()
+
+
+@contextmanager
+def _capture():
+    token = _capturing.set(True)
+    try:
+        yield
+    finally:
+        _capturing.reset(token)
+
+
+def _explain(connection, sql, params):
+    if not connection.features.supports_explaining_query_execution:
+        return ''
+    if not sql.lstrip()[:6].upper().startswith(('SELECT', 'WITH')):
+        return ''
+
+    # Plan only: ANALYZE would run the query a second time
+    options = {'analyze': False} if 'ANALYZE' in getattr(connection.ops, 'explain_options', ()) else {}
+    prefix = connection.ops.explain_query_prefix(**options)
+    try:
+        # A savepoint keeps a failed EXPLAIN from breaking the caller's transaction
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute(f'{prefix} {sql}', params)
+            rows = cursor.fetchall()
+    except DatabaseError as e:
+        return f'EXPLAIN failed: {e}'
+    return '\n'.join(' '.join(str(column) for column in row) for row in rows)
+
+
+def log_slow_queries(execute, sql, params, many, context):
+    """Database execute wrapper recording queries slower than the threshold."""
+    if _capturing.get():
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    result = execute(sql, params, many, context)
+    duration = time.perf_counter() - start
+
+    if duration * 1000 >= settings.SLOW_QUERY_THRESHOLD_MS:
+        connection = context['connection']
+        plan = ''
+        if not many and random.random() < settings.SLOW_QUERY_EXPLAIN_SAMPLE_RATE:
+            with _capture():
+                plan = _explain(connection, sql, params)
+
+        origin = _origin.get()
+        _pending.append({
+            'recorded_at': timezone.now(),
+            'duration_ms': duration * 1000,
+            'alias': connection.alias,
+            'origin': (origin[0] or '')[:255] if origin else '',
+            'sql': sql[:SQL_MAX_LENGTH],
+            'params': repr(params)[:PARAMS_MAX_LENGTH] if params else '',
+            'plan': plan,
+        })
+        registry.incr('slow_queries', alias=connection.alias)
+    return result
+
+
+def install_slow_query_log(sender=None, connection=None, **kwargs):
+    # connection_created receiver; the wrapper stays for the connection's lifetime
+    if log_slow_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(log_slow_queries)
+
+
+def flush_slow_queries(**kwargs):
+    """
+    Save the pending slow queries and trim the table to SLOW_QUERY_LOG_SIZE
+    rows. Also a request_finished receiver.
+    """
+    if not _pending:
+        return
+
+    from .models import SlowQuery
+
+    with _flush_lock:
+        entries = []
+        while _pending:
+            entries.append(SlowQuery(**_pending.popleft()))
+        if not entries:
+            return
+
+        try:
+            with _capture():
+                created = SlowQuery.objects.bulk_create(entries)
+                newest = created[-1].id or SlowQuery.objects.order_by('-id').values_list('id', flat=True).first()
+                SlowQuery.objects.filter(id__lte=newest - settings.SLOW_QUERY_LOG_SIZE).delete()
+        except DatabaseError as e:
+            logger.warning(f"Could not save {len(entries)} slow queries: {e}")
+
+
+def enable():
+    """Time the queries of every connection and save slow ones after each request."""
+    connection_created.connect(install_slow_query_log, dispatch_uid='formsApp.querylog.install')
+    request_finished.connect(flush_slow_queries, dispatch_uid='formsApp.querylog.flush')
+
+
+@contextmanager
+def query_origin(name=None):
+    """
+    Attribute the slow queries run inside the block to name.
+
+    Yields:
+        list: One-item list holding the name; replace the item to rename
+    """
+    holder = [name]
+    token = _origin.set(holder)
+    try:
+        yield holder
+    finally:
+        _origin.reset(token)
+
+
+def set_query_origin(name):
+    """Rename the origin of the enclosing query_origin block, if any."""
+    holder = _origin.get()
+    if holder is not None:
+        holder[0] = name
+
+
+def logs_slow_queries(name):
+    """
+    Decorator for work outside requests (e.g. export jobs): attribute its
+    slow queries to name and save them when it returns.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with query_origin(name):
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    flush_slow_queries()
+        return wrapper
+    return decorator
@@ -1,14 +1,21 @@
 from rest_framework import serializers
-from .models import Form, FormResponse
+from django.urls import reverse
+from forms.instrumentation import TimedListSerializer, TimedSerializerMixin
+from .models import Form, FormResponse, ExportJob
+from .validation import get_form_validator
 
 
-class FormSerializer(serializers.ModelSerializer):
+class FormSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     created_by = serializers.ReadOnlyField(source='created_by.email')
     
     class Meta:
         model = Form
-        fields = ['id', 'name', 'description', 'schema', 'allow_excel_download', 'created_by', 'created_at', 'updated_at']
-        read_only_fields = ['created_by', 'created_at', 'updated_at']
+        list_serializer_class = TimedListSerializer
+        fields = [
+            'id', 'name', 'description', 'schema', 'allow_excel_download', 'created_by',
+            'response_count', 'last_submitted_at', 'created_at', 'updated_at',
+        ]
+        read_only_fields = ['created_by', 'response_count', 'last_submitted_at', 'created_at', 'updated_at']
     
     def validate_schema(self, value):
         if not isinstance(value, dict):
@@ -40,12 +47,13 @@ class FormSerializer(serializers.ModelSerializer):
         return value
 
 
-class FormResponseSerializer(serializers.ModelSerializer):
+class FormResponseSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     user = serializers.ReadOnlyField(source='user.email')
     form_name = serializers.ReadOnlyField(source='form.name')
     
     class Meta:
         model = FormResponse
+        list_serializer_class = TimedListSerializer
         fields = ['id', 'form', 'form_name', 'user', 'response_data', 'submitted_at']
         read_only_fields = ['user', 'submitted_at']
     
@@ -56,27 +64,41 @@ class FormResponseSerializer(serializers.ModelSerializer):
         if not form:
             raise serializers.ValidationError("Form is required")
         
-        schema = form.schema
-        fields = schema.get('fields', [])
+        # Validate against the compiled (and cached) form schema
+        data['response_data'] = get_form_validator(form).validate(response_data)
         
-        # Check required fields
-        for field in fields:
-            field_name = field.get('name')
-            is_required = field.get('required', False)
-            
-            if is_required and field_name not in response_data:
-                raise serializers.ValidationError(
-                    f"Field '{field_name}' is required"
-                )
+        return data
 
-            if field_name in response_data:
-                value = response_data[field_name]
-                field_type = field.get('type')
 
-                if field_type == 'email' and value:
-                    if '@' not in str(value):
-                        raise serializers.ValidationError(
-                            f"Field '{field_name}' must be a valid email"
-                        )
+class ExportJobSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    form_name = serializers.ReadOnlyField(source='form.name')
+    requested_by = serializers.ReadOnlyField(source='requested_by.email')
+    download_url = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = ExportJob
+        list_serializer_class = TimedListSerializer
+        fields = [
+            'id', 'form', 'form_name', 'format', 'status', 'row_count', 'error', 'since', 'next_cursor',
+            'requested_by', 'created_at', 'started_at', 'finished_at', 'download_url',
+        ]
+        read_only_fields = fields
+    
+    def get_download_url(self, obj):
+        if obj.status != 'done':
+            return None
         
-        return data
+        url = reverse('exportjob-download', kwargs={'pk': obj.pk})
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+
+class DirectUploadFileSerializer(serializers.Serializer):
+    field = serializers.CharField(max_length=255)
+    filename = serializers.CharField(max_length=255)
+    content_type = serializers.CharField(max_length=255, default='application/octet-stream')
+
+
+class DirectUploadRequestSerializer(serializers.Serializer):
+    method = serializers.ChoiceField(choices=['post', 'put'], default='post')
+    files = DirectUploadFileSerializer(many=True, allow_empty=False)
@@ -0,0 +1,255 @@
+"""
+Sharded exports for very large forms.
+
+A form's responses are split into id ranges of EXPORT_SHARD_SIZE rows and
+each range is rendered by a separate process of a process pool. The parts
+are then assembled into either:
+
+- 'zip': a ZIP of the part files with a manifest.json describing them, for
+  any export format
+- 'sheets': a single xlsx workbook with one sheet per part, which also gets
+  around the 1,048,576 row limit of an Excel sheet
+
+Rows are exported in id order, which is also submission order.
+"""
+
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+from openpyxl import Workbook
+
+from .exports import write_export_file
+from .models import Form, FormResponse
+
+SHARD_LAYOUTS = ('zip', 'sheets')
+
+# One header row per sheet
+MAX_SHEET_ROWS = 1048576 - 1
+
+
+def plan_shards(responses, shard_size):
+    """
+    Split responses into consecutive id ranges of at most shard_size rows.
+
+    Walks the primary key index with one bounded query per shard, so
+    planning stays cheap for millions of rows.
+
+    Args:
+        responses: QuerySet of FormResponse objects
+        shard_size: Maximum number of responses per shard
+
+    Returns:
+        list: (first_id, last_id) tuples, both inclusive
+    """
+    ids = responses.order_by('id').values_list('id', flat=True)
+    shards = []
+    last_id = None
+    while True:
+        remaining = ids if last_id is None else ids.filter(id__gt=last_id)
+        first_id = remaining.first()
+        if first_id is None:
+            break
+        end = list(remaining[shard_size - 1:shard_size])
+        last_id = end[0] if end else remaining.last()
+        shards.append((first_id, last_id))
+    return shards
+
+
+def _close_connections():
+    # Forked workers must not share the parent's database sockets
+    connections.close_all()
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def render_shard(form_id, first_id, last_id, export_format, path):
+    """
+    Render one id range of a form's responses to a part file.
+
+    Runs inside a worker process of the shard pool.
+
+    Args:
+        form_id: ID of the form
+        first_id: First response id of the shard (inclusive)
+        last_id: Last response id of the shard (inclusive)
+        export_format: Export file format
+        path: Destination file path
+
+    Returns:
+        dict: Manifest entry for the part
+    """
+    form = Form.objects.get(id=form_id)
+    responses = FormResponse.objects.filter(
+        form_id=form_id, id__gte=first_id, id__lte=last_id
+    ).order_by('id')
+    row_count = write_export_file(form, responses, export_format, path)
+    return {
+        'file': Path(path).name,
+        'first_id': first_id,
+        'last_id': last_id,
+        'rows': row_count,
+        'bytes': os.path.getsize(path),
+        'sha256': _file_sha256(path),
+    }
+
+
+def merge_workbook_parts(part_paths, sheet_names, path):
+    """
+    Combine single-sheet xlsx parts into one workbook with a sheet per part.
+
+    The worksheet XML of each part is copied as is. openpyxl writes strings
+    inline, so sheets do not share a string table, and the parts register
+    their cell styles in the same order (header first, then file links), so
+    the style table of the part with the most styles is valid for all.
+
+    Args:
+        part_paths: xlsx files written by render_shard
+        sheet_names: Sheet name for each part
+        path: Destination file path
+    """
+    # Workbook, relationships and content types for the sheets come from an
+    # empty workbook with the right sheets
+    skeleton = Workbook(write_only=True)
+    for name in sheet_names:
+        skeleton.create_sheet(name)
+    skeleton_file = BytesIO()
+    skeleton.save(skeleton_file)
+
+    parts = [zipfile.ZipFile(part_path) for part_path in part_paths]
+    try:
+        styles = max((part.read('xl/styles.xml') for part in parts), key=len)
+        with zipfile.ZipFile(skeleton_file) as skeleton_zip, \
+                zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as workbook_zip:
+            for name in skeleton_zip.namelist():
+                if name.startswith('xl/worksheets/'):
+                    continue
+                workbook_zip.writestr(name, styles if name == 'xl/styles.xml' else skeleton_zip.read(name))
+
+            for index, part in enumerate(parts, start=1):
+                names = set(part.namelist())
+                for source, target in (
+                    ('xl/worksheets/sheet1.xml', f'xl/worksheets/sheet{index}.xml'),
+                    ('xl/worksheets/_rels/sheet1.xml.rels', f'xl/worksheets/_rels/sheet{index}.xml.rels'),
+                ):
+                    if source not in names:
+                        continue
+                    with part.open(source) as src, workbook_zip.open(target, 'w', force_zip64=True) as dst:
+                        shutil.copyfileobj(src, dst, 1024 * 1024)
+    finally:
+        for part in parts:
+            part.close()
+
+
+def write_parts_zip(form, export_format, parts, work_dir, path):
+    """
+    Write part files and their manifest to a ZIP archive.
+
+    Args:
+        form: Form model instance
+        export_format: Export file format of the parts
+        parts: Manifest entries returned by render_shard
+        work_dir: Directory holding the part files
+        path: Destination file path
+    """
+    manifest = {
+        'form_id': form.id,
+        'form_name': form.name,
+        'format': export_format,
+        'created_at': timezone.now().isoformat(),
+        'rows': sum(part['rows'] for part in parts),
+        'parts': parts,
+    }
+    # xlsx parts are already compressed
+    compression = zipfile.ZIP_STORED if export_format == 'xlsx' else zipfile.ZIP_DEFLATED
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('manifest.json', json.dumps(manifest, indent=2))
+        for part in parts:
+            archive.write(Path(work_dir) / part['file'], part['file'], compress_type=compression)
+
+
+def run_sharded_export(form, path, export_format='xlsx', layout='zip', processes=None,
+                       shard_size=None, last_response_id=None):
+    """
+    Export a form's responses in parallel shards.
+
+    Args:
+        form: Form model instance
+        path: Destination file path (.zip for the 'zip' layout, .xlsx for 'sheets')
+        export_format: Export file format of the parts
+        layout: 'zip' or 'sheets'
+        processes: Number of worker processes (default: EXPORT_SHARD_PROCESSES)
+        shard_size: Responses per shard (default: EXPORT_SHARD_SIZE)
+        last_response_id: Only export responses up to this id
+
+    Returns:
+        list: Manifest entries of the parts, in id order
+
+    Raises:
+        ValueError: If the options are invalid or the form has no responses
+    """
+    if layout not in SHARD_LAYOUTS:
+        raise ValueError(f"Invalid layout '{layout}'. Valid layouts are: {', '.join(SHARD_LAYOUTS)}")
+    if layout == 'sheets' and export_format != 'xlsx':
+        raise ValueError("The 'sheets' layout requires the xlsx format")
+    processes = max(1, processes or settings.EXPORT_SHARD_PROCESSES)
+    shard_size = shard_size or settings.EXPORT_SHARD_SIZE
+    if export_format == 'xlsx' and not 0 < shard_size <= MAX_SHEET_ROWS:
+        raise ValueError(f"Shard size must be between 1 and {MAX_SHEET_ROWS} for xlsx")
+
+    responses = FormResponse.objects.filter(form=form)
+    if last_response_id is not None:
+        responses = responses.filter(id__lte=last_response_id)
+    shards = plan_shards(responses, shard_size)
+    if not shards:
+        raise ValueError("No responses found for this form")
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=path.parent, prefix='.shards-') as work_dir:
+        stem = f"{form.name.replace(' ', '_')}_responses"
+        part_paths = [
+            Path(work_dir) / f'{stem}_part{index:04d}.{export_format}'
+            for index in range(1, len(shards) + 1)
+        ]
+
+        _close_connections()
+        with ProcessPoolExecutor(
+            max_workers=min(processes, len(shards)),
+            mp_context=multiprocessing.get_context('fork'),
+            initializer=_close_connections,
+        ) as pool:
+            futures = [
+                pool.submit(render_shard, form.id, first_id, last_id, export_format, str(part_path))
+                for (first_id, last_id), part_path in zip(shards, part_paths)
+            ]
+            parts = [future.result() for future in futures]
+
+        tmp_path = path.with_name(path.name + '.part')
+        try:
+            if layout == 'sheets':
+                sheet_names = [f'Responses {index}' for index in range(1, len(parts) + 1)]
+                merge_workbook_parts(part_paths, sheet_names, tmp_path)
+            else:
+                write_parts_zip(form, export_format, parts, work_dir, tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    return parts
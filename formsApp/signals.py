@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .aggregates import collect_deleted_responses, remove_deleted_responses
+from .cache import invalidate_form, invalidate_form_list
+from .models import Form, FormResponse
+
+
+@receiver(pre_delete, sender=settings.AUTH_USER_MODEL)
+def count_responses_of_deleted_user(sender, instance, **kwargs):
+    # The user's responses are removed by the cascade; remember which
+    # forms lose responses so their counters and aggregates can be adjusted
+    # afterwards.
+    instance._deleted_responses = collect_deleted_responses(
+        FormResponse.objects.filter(user=instance)
+    )
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def update_counters_of_deleted_user(sender, instance, **kwargs):
+    deleted = getattr(instance, '_deleted_responses', None)
+    if deleted:
+        remove_deleted_responses(deleted)
+
+
+@receiver(post_save, sender=Form)
+@receiver(post_delete, sender=Form)
+def drop_cached_form(sender, instance, **kwargs):
+    invalidate_form(instance.pk)
+
+
+@receiver(pre_save, sender=settings.AUTH_USER_MODEL)
+def detect_email_change(sender, instance, **kwargs):
+    if instance.pk is None:
+        return
+    old_email = sender.objects.filter(pk=instance.pk).values_list('email', flat=True).first()
+    instance._email_changed = old_email is not None and old_email != instance.email
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def drop_cached_forms_of_user(sender, instance, **kwargs):
+    # Serialized forms include the creator's email
+    if not getattr(instance, '_email_changed', False):
+        return
+    for form_id in Form.objects.filter(created_by=instance).values_list('id', flat=True):
+        invalidate_form(form_id)
+    invalidate_form_list()
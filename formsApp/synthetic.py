@@ -0,0 +1,90 @@
+"""
+Realistic synthetic forms and responses for load tests and benchmarks.
+"""
+
+import random
+from datetime import date, timedelta
+
+FIELD_TYPES = ['text', 'email', 'number', 'textarea', 'select', 'checkbox', 'radio', 'date', 'file']
+
+WORDS = (
+    'alpha bravo charlie delta echo foxtrot golf hotel india juliet kilo lima '
+    'mike november oscar papa quebec romeo sierra tango uniform victor whiskey'
+).split()
+
+OPTION_SETS = [
+    ['Sales', 'Engineering', 'Marketing', 'Support', 'Finance'],
+    ['Yes', 'No', 'Maybe'],
+    ['Very satisfied', 'Satisfied', 'Neutral', 'Unsatisfied'],
+    ['Morning', 'Afternoon', 'Evening'],
+]
+
+
+def build_schema(field_count, rng=random):
+    """
+    Build a form schema using every field type.
+
+    Args:
+        field_count: Number of fields
+        rng: Random number generator
+
+    Returns:
+        dict: Schema accepted by FormSerializer.validate_schema
+    """
+    fields = []
+    for i in range(field_count):
+        field_type = FIELD_TYPES[i % len(FIELD_TYPES)]
+        field = {
+            'name': f'{field_type}_{i}',
+            'label': f'{field_type.title()} question {i}',
+            'type': field_type,
+            # File fields stay optional so submissions need no upload
+            'required': field_type != 'file' and rng.random() < 0.3,
+        }
+        if field_type in ('select', 'checkbox', 'radio'):
+            field['options'] = rng.choice(OPTION_SETS)
+        fields.append(field)
+    return {'fields': fields}
+
+
+def fake_value(field, rng=random, seq=0):
+    field_type = field['type']
+    if field_type == 'text':
+        return ' '.join(rng.choices(WORDS, k=rng.randint(1, 4)))
+    if field_type == 'textarea':
+        return ' '.join(rng.choices(WORDS, k=rng.randint(10, 60)))
+    if field_type == 'email':
+        return f'person{seq}@example.com'
+    if field_type == 'number':
+        return rng.randint(0, 1000)
+    if field_type in ('select', 'radio'):
+        return rng.choice(field['options'])
+    if field_type == 'checkbox':
+        return rng.sample(field['options'], rng.randint(1, len(field['options'])))
+    if field_type == 'date':
+        return (date(2020, 1, 1) + timedelta(days=rng.randint(0, 2000))).isoformat()
+    return None
+
+
+def fake_response_data(schema, rng=random, seq=0, include_files=True):
+    """
+    Build submission data that passes the schema's validation.
+
+    Args:
+        schema: Form schema
+        rng: Random number generator
+        seq: Sequence number, used for unique-looking values
+        include_files: Whether to fill file fields with fake S3 URLs
+
+    Returns:
+        dict: Response data keyed by field name
+    """
+    response_data = {}
+    for field in schema.get('fields', []):
+        if field['type'] == 'file':
+            if include_files and rng.random() < 0.5:
+                response_data[field['name']] = f'https://example-bucket.s3.amazonaws.com/media/forms/synthetic/{seq}.pdf'
+            continue
+        if field['required'] or rng.random() < 0.8:
+            response_data[field['name']] = fake_value(field, rng, seq)
+    return response_data
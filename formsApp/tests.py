@@ -1,3 +1,1212 @@
-from django.test import TestCase
+import io
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import boto3
+import requests
+from asgiref.sync import sync_to_async
+from django.contrib import admin
+from django.core.cache import cache, caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.core.signals import request_finished
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.http import QueryDict
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from moto import mock_aws
+from openpyxl import load_workbook
+from rest_framework import serializers
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from accounts.authentication import token_cache
+from accounts.models import User
+from forms.metrics import registry
+
+from . import querylog
+from .aggregates import decrement_response_counters, rebuild_form_aggregates
+from .cache import get_cached_form, get_cached_form_list
+from .conditional import get_form_list_state, get_form_state
+from .exports import (
+    claim_pending_jobs, enqueue_export_job, get_worker_id, purge_expired_exports, release_crashed_jobs,
+    requeue_orphaned_jobs, requeue_stale_jobs, run_export_job,
+)
+from .filters import ResponseQuery, get_field_index_name
+from .models import ExportJob, Form, FormAggregate, FormResponse, SlowQuery
+from .pagination import decode_cursor, encode_cursor
+from .sharded_exports import (
+    merge_workbook_parts, plan_shards, render_shard, run_sharded_export, write_parts_zip,
+)
+from .synthetic import FIELD_TYPES
+from .utils import (
+    FileUploadError, get_s3_client, get_s3_file_url, reset_s3_client, upload_file_to_s3, upload_files_to_s3,
+)
+from .validation import CompiledFormSchema
+
+SCHEMA = {
+    'fields': [
+        {'name': 'name', 'type': 'text', 'required': True},
+        {'name': 'email', 'type': 'email'},
+        {'name': 'age', 'type': 'number'},
+        {'name': 'dept', 'type': 'select', 'options': ['Sales', 'Eng']},
+        {'name': 'tags', 'type': 'checkbox', 'options': ['a', 'b']},
+        {'name': 'when', 'type': 'date'},
+        {'name': 'cv', 'type': 'file'},
+    ]
+}
+
+
+class FormTestCase(TestCase):
+    """Users, a form and API clients shared by the tests below."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='admin-password', role='admin'
+        )
+        cls.viewer = User.objects.create_user(
+            username='viewer', email='viewer@example.com', password='viewer-password', role='viewer'
+        )
+        cls.form = Form.objects.create(
+            name='Survey', schema=SCHEMA, created_by=cls.admin, allow_excel_download=True
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.admin_client = self.client_for(self.admin)
+        self.viewer_client = self.client_for(self.viewer)
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def submit(self, data, form=None):
+        form = form or self.form
+        return self.viewer_client.post(f'/api/forms/{form.id}/submit/', data, format='json')
+
+    def create_responses(self, count, form=None, start=None):
+        """Insert responses one second apart, oldest first."""
+        form = form or self.form
+        start = start or timezone.now() - timedelta(days=1)
+        responses = []
+        for index in range(count):
+            response = FormResponse.objects.create(
+                form=form, user=self.viewer, response_data={'name': f'r{index}', 'age': index}
+            )
+            # submitted_at is auto_now_add
+            response.submitted_at = start + timedelta(seconds=index)
+            response.save(update_fields=['submitted_at'])
+            responses.append(response)
+        return responses
+
+
+class KeysetPaginationTests(FormTestCase):
+    def test_cursor_round_trip(self):
+        submitted_at = timezone.now()
+        self.assertEqual(decode_cursor(encode_cursor(submitted_at, 42)), (submitted_at.isoformat(), 42))
+        self.assertEqual(decode_cursor(encode_cursor('Sales', 7)), ('Sales', 7))
+
+    def test_malformed_cursor(self):
+        for token in ('not-a-cursor', encode_cursor('x', 'y')[:-2], ''):
+            with self.assertRaises(ValueError):
+                decode_cursor(token)
+
+    def test_pages_cover_all_responses_once(self):
+        responses = self.create_responses(7)
+        url = f'/api/forms/{self.form.id}/responses/?page_size=3'
+        seen = []
+        while url:
+            page = self.admin_client.get(url)
+            self.assertEqual(page.status_code, 200)
+            seen += [response['id'] for response in page.data['responses']]
+            url = page.data['next']
+
+        # Newest first, no gaps or duplicates across pages
+        self.assertEqual(seen, [response.id for response in reversed(responses)])
+
+    def test_ties_on_submitted_at_are_broken_by_id(self):
+        responses = self.create_responses(4)
+        FormResponse.objects.filter(form=self.form).update(submitted_at=responses[0].submitted_at)
+
+        first = self.admin_client.get(f'/api/forms/{self.form.id}/responses/?page_size=2')
+        second = self.admin_client.get(first.data['next'])
+        ids = [response['id'] for response in first.data['responses'] + second.data['responses']]
+        self.assertEqual(ids, sorted((response.id for response in responses), reverse=True))
+        self.assertIsNone(second.data['next'])
+
+    def test_invalid_cursor_is_a_404(self):
+        page = self.admin_client.get(f'/api/forms/{self.form.id}/responses/?cursor=garbage')
+        self.assertEqual(page.status_code, 404)
+
+
+class ResponseFilterTests(FormTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        rows = [
+            {'name': 'Ann', 'age': 30, 'dept': 'Sales', 'when': '2024-03-01'},
+            # Multipart submissions stored numbers as strings
+            {'name': 'Bob', 'age': '9', 'dept': 'Eng', 'when': '2024-01-15'},
+            # Dates of non-strict forms may be in any format
+            {'name': 'Cy, Jr.', 'age': '100', 'dept': 'Eng', 'when': '03/01/2024'},
+            {'name': 'Dee', 'age': '', 'dept': 'Sales'},
+        ]
+        for data in rows:
+            FormResponse.objects.create(form=cls.form, user=cls.viewer, response_data=data)
+
+    def names(self, query, ordered=False):
+        page = self.admin_client.get(f'/api/forms/{self.form.id}/responses/?{query}')
+        self.assertEqual(page.status_code, 200, page.data)
+        names = [response['response_data']['name'] for response in page.data['responses']]
+        return names if ordered else set(names)
+
+    def test_exact(self):
+        self.assertEqual(self.names('field.dept=Eng'), {'Bob', 'Cy, Jr.'})
+        self.assertEqual(self.names('field.age=9'), {'Bob'})
+        self.assertEqual(self.names('field.age=30.0'), {'Ann'})
+        self.assertEqual(self.names('field.when=2024-01-15'), {'Bob'})
+
+    def test_in(self):
+        self.assertEqual(self.names('field.dept__in=Sales,Eng'), {'Ann', 'Bob', 'Cy, Jr.', 'Dee'})
+        self.assertEqual(self.names('field.age__in=9,30'), {'Ann', 'Bob'})
+        # A single parameter is split on commas, a repeated one isn't
+        self.assertEqual(self.names('field.name__in=Cy, Jr.'), set())
+        self.assertEqual(self.names('field.name__in=Cy, Jr.&field.name__in=Ann'), {'Ann', 'Cy, Jr.'})
+
+    def test_range_compares_numbers_and_dates(self):
+        self.assertEqual(self.names('field.age__gte=10'), {'Ann', 'Cy, Jr.'})
+        self.assertEqual(self.names('field.age__lt=10'), {'Bob'})
+        self.assertEqual(self.names('field.age__gt=9&field.age__lte=30'), {'Ann'})
+        self.assertEqual(self.names('field.when__gte=2024-02-01'), {'Ann'})
+        self.assertEqual(self.names('field.when__lt=2025-01-01'), {'Ann', 'Bob'})
+
+    def test_icontains(self):
+        self.assertEqual(self.names('field.name__icontains=jr'), {'Cy, Jr.'})
+
+    def test_ordering(self):
+        self.assertEqual(self.names('ordering=field.age', ordered=True), ['Bob', 'Ann', 'Cy, Jr.'])
+        self.assertEqual(self.names('ordering=-field.age', ordered=True), ['Cy, Jr.', 'Ann', 'Bob'])
+        self.assertEqual(self.names('ordering=field.when', ordered=True), ['Bob', 'Ann'])
+        self.assertEqual(self.names('ordering=field.name', ordered=True), ['Ann', 'Bob', 'Cy, Jr.', 'Dee'])
+
+    def test_ordering_pages(self):
+        url = f'/api/forms/{self.form.id}/responses/?ordering=-field.age&page_size=1'
+        seen = []
+        while url:
+            page = self.admin_client.get(url)
+            self.assertEqual(page.status_code, 200)
+            seen += [response['response_data']['name'] for response in page.data['responses']]
+            url = page.data['next']
+        self.assertEqual(seen, ['Cy, Jr.', 'Ann', 'Bob'])
+
+    def test_invalid_params_are_a_400(self):
+        for query in (
+            'field.age__gte=abc',
+            'field.age__in=9,x',
+            'field.when__lt=yesterday',
+            'field.when=03/01/2024',
+            'field.nope=1',
+            'field.dept__gt=a',
+            'field.dept__icontains=a',
+            'field.cv=x',
+            'field.name=',
+            'ordering=name',
+            'ordering=field.tags',
+        ):
+            with self.subTest(query=query):
+                page = self.admin_client.get(f'/api/forms/{self.form.id}/responses/?{query}')
+                self.assertEqual(page.status_code, 400)
+
+
+@skipUnless(connection.vendor == 'postgresql', "Field indexes are only supported on PostgreSQL")
+class FieldIndexCommandTests(TransactionTestCase):
+    # CREATE INDEX CONCURRENTLY cannot run inside the transaction of a TestCase
+
+    def setUp(self):
+        admin = User.objects.create_user(username='admin', email='admin@example.com', password='x', role='admin')
+        self.form = Form.objects.create(name='Survey', schema=SCHEMA, created_by=admin)
+        FormResponse.objects.bulk_create(
+            FormResponse(form=self.form, user=admin, response_data={'name': f'r{index}', 'age': str(index)})
+            for index in range(2000)
+        )
+
+    def indexes(self):
+        with connection.cursor() as cursor:
+            return connection.introspection.get_constraints(cursor, FormResponse._meta.db_table)
+
+    def test_create_and_drop(self):
+        name = get_field_index_name(self.form.id, 'age')
+        call_command('create_field_index', form=self.form.id, fields=['age'], stdout=io.StringIO())
+        self.assertIn(name, self.indexes())
+        # Creating it again is a no-op
+        call_command('create_field_index', form=self.form.id, fields=['age'], stdout=io.StringIO())
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {connection.ops.quote_name(FormResponse._meta.db_table)}')
+
+        # The range filters and sort order are on the indexed expression
+        query = ResponseQuery(self.form, QueryDict('field.age__gte=1990&ordering=field.age'))
+        queryset = query.apply(FormResponse.objects.filter(form=self.form))
+        queryset = queryset.annotate(sort_value=query.ordering_expression).order_by('sort_value', 'id')[:5]
+        self.assertIn(name, queryset.explain())
+        ages = [response.response_data['age'] for response in queryset]
+        self.assertEqual(ages, ['1990', '1991', '1992', '1993', '1994'])
+
+        call_command('create_field_index', form=self.form.id, fields=['age'], drop=True, stdout=io.StringIO())
+        self.assertNotIn(name, self.indexes())
+
+    def test_unknown_field(self):
+        with self.assertRaisesMessage(CommandError, "has no field 'nope'"):
+            call_command('create_field_index', form=self.form.id, fields=['nope'])
+
+
+class ValidationTests(FormTestCase):
+    def test_numbers_are_coerced(self):
+        validator = CompiledFormSchema(SCHEMA)
+        for value, expected in (('42', 42), ('4.5', 4.5), (7, 7), (2.5, 2.5), ('', '')):
+            self.assertEqual(validator.validate({'name': 'x', 'age': value})['age'], expected)
+
+    def test_invalid_numbers_are_rejected(self):
+        validator = CompiledFormSchema(SCHEMA)
+        for value in ('abc', True, False, 'nan', 'inf', float('nan'), [1]):
+            with self.assertRaisesMessage(serializers.ValidationError, "Field 'age' must be a number"):
+                validator.validate({'name': 'x', 'age': value})
+
+    def test_required_field(self):
+        with self.assertRaisesMessage(serializers.ValidationError, "Field 'name' is required"):
+            CompiledFormSchema(SCHEMA).validate({'age': 1})
+
+    def test_dates_are_only_checked_on_strict_fields(self):
+        lenient = CompiledFormSchema(SCHEMA)
+        self.assertEqual(lenient.validate({'name': 'x', 'when': '03/14/2024'})['when'], '03/14/2024')
+
+        strict = CompiledFormSchema({'fields': [{'name': 'when', 'type': 'date', 'strict': True}]})
+        self.assertEqual(strict.validate({'when': '2024-03-14'})['when'], '2024-03-14')
+        for value in ('03/14/2024', '2024-02-30', 20240314):
+            with self.assertRaisesMessage(serializers.ValidationError, "must be a date in YYYY-MM-DD format"):
+                strict.validate({'when': value})
+
+    def test_submission_stores_coerced_values(self):
+        response = self.submit({'name': 'Ada', 'age': '36', 'when': 'soon'})
+        self.assertEqual(response.status_code, 201)
+        stored = FormResponse.objects.get(form=self.form)
+        self.assertEqual(stored.response_data['age'], 36)
+        self.assertEqual(stored.response_data['when'], 'soon')
+
+        response = self.submit({'name': 'Bob', 'age': True})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("must be a number", str(response.data))
+
+
+class AsyncViewTests(FormTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.admin_key = Token.objects.create(user=cls.admin).key
+        cls.viewer_key = Token.objects.create(user=cls.viewer).key
+
+    def setUp(self):
+        super().setUp()
+        token_cache.clear()
+        self.addCleanup(token_cache.clear)
+
+    def headers(self, key):
+        return {'Authorization': f'Token {key}'}
+
+    async def test_submit(self):
+        response = await self.async_client.post(
+            f'/api/async/forms/{self.form.id}/submit/',
+            {'name': 'Ann', 'age': '30'},
+            content_type='application/json',
+            headers=self.headers(self.viewer_key),
+        )
+        self.assertEqual(response.status_code, 201)
+        data = response.json()['data']
+        self.assertEqual((data['user'], data['response_data']), ('viewer@example.com', {'name': 'Ann', 'age': 30}))
+
+        form = await Form.objects.aget(pk=self.form.pk)
+        self.assertEqual(form.response_count, 1)
+        self.assertTrue(await FormAggregate.objects.filter(form=form).aexists())
+
+    async def test_invalid_submission(self):
+        response = await self.async_client.post(
+            f'/api/async/forms/{self.form.id}/submit/',
+            {'age': 'old'},
+            content_type='application/json',
+            headers=self.headers(self.viewer_key),
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(await FormResponse.objects.filter(form=self.form).aexists())
+
+        response = await self.async_client.post(
+            '/api/async/forms/0/submit/', {'name': 'Ann'},
+            content_type='application/json', headers=self.headers(self.viewer_key),
+        )
+        self.assertEqual(response.status_code, 404)
+
+    async def test_responses(self):
+        await sync_to_async(self.create_responses)(4)
+        url = f'/api/async/forms/{self.form.id}/responses/?page_size=2&field.age__gte=1'
+        response = await self.async_client.get(url, headers=self.headers(self.admin_key))
+        self.assertEqual(response.status_code, 200)
+        page = response.json()
+        self.assertEqual([row['response_data']['name'] for row in page['responses']], ['r3', 'r2'])
+        self.assertIsNotNone(page['next'])
+
+        response = await self.async_client.get(
+            f'/api/async/forms/{self.form.id}/responses/?field.age__gte=x', headers=self.headers(self.admin_key)
+        )
+        self.assertEqual(response.status_code, 400)
+
+    async def test_responses_need_an_editor(self):
+        response = await self.async_client.get(
+            f'/api/async/forms/{self.form.id}/responses/', headers=self.headers(self.viewer_key)
+        )
+        self.assertEqual(response.status_code, 403)
+
+    async def test_authentication_failures(self):
+        url = f'/api/async/forms/{self.form.id}/responses/'
+        for headers in ({}, self.headers('not-a-token')):
+            with self.subTest(headers=headers):
+                response = await self.async_client.get(url, headers=headers)
+                self.assertEqual(response.status_code, 401)
+                self.assertEqual(response.headers['WWW-Authenticate'], 'Token')
+
+
+class AggregateTests(FormTestCase):
+    def submit_all(self):
+        self.assertEqual(self.submit({'name': 'a', 'age': 30, 'dept': 'Sales', 'tags': ['a', 'b']}).status_code, 201)
+        self.assertEqual(self.submit({'name': 'b', 'age': '10.5', 'dept': 'Eng'}).status_code, 201)
+        response = self.viewer_client.post(
+            f'/api/forms/{self.form.id}/submit-bulk/',
+            [{'name': 'c', 'age': 50, 'dept': 'Sales', 'tags': ['b']}, {'name': 'd', 'tags': []}, {'age': 1}],
+            format='json',
+        )
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual((response.data['created'], response.data['failed']), (2, 1))
+
+    def aggregate_rows(self):
+        return list(
+            FormAggregate.objects.filter(form=self.form)
+            .order_by('kind', 'field_name', 'key')
+            .values_list('kind', 'field_name', 'key', 'count', 'total', 'minimum', 'maximum')
+        )
+
+    def check_summary(self):
+        summary = self.admin_client.get(f'/api/forms/{self.form.id}/summary/').data
+        self.assertEqual(summary['total_responses'], 4)
+        self.assertEqual(summary['fields']['dept']['options'], {'Sales': 2, 'Eng': 1})
+        self.assertEqual(summary['fields']['tags']['options'], {'a': 1, 'b': 2})
+        age = summary['fields']['age']
+        self.assertEqual((age['count'], age['sum'], age['min'], age['max']), (3, 90.5, 10.5, 50))
+        self.assertEqual(sum(summary['submissions_per_day'].values()), 4)
+
+        self.form.refresh_from_db()
+        self.assertEqual(self.form.response_count, 4)
+
+    def test_submissions_update_aggregates(self):
+        self.submit_all()
+        self.check_summary()
+
+        incremental = self.aggregate_rows()
+        rebuild_form_aggregates(self.form)
+        self.assertEqual(self.aggregate_rows(), incremental)
+
+    def test_per_row_updates_without_upsert_support(self):
+        with mock.patch.object(connection.features, 'supports_update_conflicts_with_target', False):
+            self.submit_all()
+        self.check_summary()
+
+        incremental = self.aggregate_rows()
+        rebuild_form_aggregates(self.form)
+        self.assertEqual(self.aggregate_rows(), incremental)
+
+
+    def test_deleted_responses_are_subtracted(self):
+        self.submit_all()
+        model_admin = admin.site._registry[FormResponse]
+        responses = FormResponse.objects.filter(form=self.form)
+        # c held the maximum age
+        model_admin.delete_model(None, responses.get(response_data__name='c'))
+        model_admin.delete_queryset(None, responses.filter(response_data__name='d'))
+
+        summary = self.admin_client.get(f'/api/forms/{self.form.id}/summary/').data
+        self.assertEqual(summary['total_responses'], 2)
+        self.assertEqual(summary['fields']['dept']['options'], {'Sales': 1, 'Eng': 1})
+        self.assertEqual(summary['fields']['tags']['options'], {'a': 1, 'b': 1})
+        age = summary['fields']['age']
+        self.assertEqual((age['count'], age['sum'], age['min'], age['max']), (2, 40.5, 10.5, 30))
+        self.form.refresh_from_db()
+        self.assertEqual(self.form.response_count, 2)
+
+        incremental = self.aggregate_rows()
+        rebuild_form_aggregates(self.form)
+        self.assertEqual(self.aggregate_rows(), incremental)
+
+        # The user's responses go with the user
+        self.viewer.delete()
+        summary = self.admin_client.get(f'/api/forms/{self.form.id}/summary/').data
+        self.assertEqual((summary['total_responses'], summary['fields']['age']['count']), (0, 0))
+        self.assertEqual(self.aggregate_rows(), [])
+
+class ConditionalRequestTests(FormTestCase):
+    def test_unchanged_listing_is_not_modified(self):
+        url = f'/api/forms/{self.form.id}/responses/'
+        first = self.admin_client.get(url)
+        self.assertEqual(first.status_code, 200)
+        self.assertNotIn('Last-Modified', first.headers)
+
+        again = self.admin_client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again['ETag'], first['ETag'])
+
+        self.submit({'name': 'new'})
+        changed = self.admin_client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], first['ETag'])
+
+    def test_deleting_an_older_response_changes_the_etag(self):
+        oldest, newest = self.create_responses(2)
+        Form.objects.filter(pk=self.form.pk).update(response_count=2, last_submitted_at=newest.submitted_at)
+        url = f'/api/forms/{self.form.id}/responses/'
+        first = self.admin_client.get(url)
+
+        # As the admin does; the newest submission time stays the same
+        oldest.delete()
+        decrement_response_counters({self.form.id: 1})
+
+        after = self.admin_client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(after.status_code, 200)
+        self.assertEqual([response['id'] for response in after.data['responses']], [newest.id])
+
+    def test_deleting_a_form_changes_the_list_etag(self):
+        other = Form.objects.create(name='Other', schema=SCHEMA, created_by=self.admin)
+        first = self.admin_client.get('/api/forms/')
+        self.assertEqual(self.admin_client.get('/api/forms/', HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+        self.assertEqual(self.admin_client.delete(f'/api/forms/{other.id}/').status_code, 204)
+        after = self.admin_client.get('/api/forms/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(after.status_code, 200)
+        self.assertNotEqual(after['ETag'], first['ETag'])
+
+
+class ExportTestCase(FormTestCase):
+    """Exports written to a temporary EXPORT_ROOT."""
+
+    def setUp(self):
+        super().setUp()
+        export_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, export_root, ignore_errors=True)
+        self.export_root = Path(export_root)
+        self.enterContext(override_settings(EXPORT_ROOT=self.export_root, EXPORT_ACCEL_REDIRECT_LOCATION=''))
+
+    def export(self, **params):
+        response = self.admin_client.get(f'/api/forms/{self.form.id}/export-excel/', params)
+        if response.streaming:
+            response.body = b''.join(response.streaming_content)
+        else:
+            response.body = response.content
+        return response
+
+    def cached_files(self):
+        return sorted(path.name for path in (self.export_root / 'cache').glob('*.*'))
+
+
+@override_settings(EXPORT_CACHE_MAX_BYTES=10 * 1024 * 1024)
+class ExportCacheTests(ExportTestCase):
+    def test_repeat_export_is_served_from_the_cache(self):
+        self.submit({'name': 'a', 'age': 1})
+        first = self.export(format='csv')
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(len(self.cached_files()), 1)
+
+        with mock.patch('formsApp.viewsets.stream_csv_export') as render:
+            second = self.export(format='csv')
+        render.assert_not_called()
+        self.assertEqual(second.body, first.body)
+
+    def test_new_response_misses_the_cache(self):
+        self.submit({'name': 'a', 'age': 1})
+        first = self.export(format='csv')
+        self.submit({'name': 'b', 'age': 2})
+        second = self.export(format='csv')
+
+        self.assertEqual(len(self.cached_files()), 2)
+        self.assertEqual(second.body.count(b'\n'), first.body.count(b'\n') + 1)
+
+    def test_xlsx_renderers_are_cached_apart(self):
+        self.submit({'name': 'a', 'age': 1})
+        streamed = self.export(stream='true')
+        workbook = self.export(stream='false')
+
+        self.assertEqual(len(self.cached_files()), 2)
+        self.assertEqual(self.export(stream='true').body, streamed.body)
+        self.assertEqual(self.export(stream='false').body, workbook.body)
+
+
+@override_settings(EXPORT_DELTA_SETTLE_SECONDS=0)
+class DeltaExportTests(ExportTestCase):
+    def delta(self, since):
+        response = self.export(format='ndjson', since=since)
+        self.assertEqual(response.status_code, 200)
+        ids = [json.loads(line)['Submission ID'] for line in response.body.splitlines()]
+        return ids, response['X-Next-Cursor']
+
+    def test_deltas_continue_from_the_cursor(self):
+        responses = self.create_responses(3)
+        ids, cursor = self.delta('')
+        self.assertEqual(sorted(ids), [response.id for response in responses])
+
+        newer = self.create_responses(2, start=timezone.now() - timedelta(hours=1))
+        ids, next_cursor = self.delta(cursor)
+        self.assertEqual(sorted(ids), [response.id for response in newer])
+
+        # Nothing new: an empty export and the same cursor
+        self.assertEqual(self.delta(next_cursor), ([], next_cursor))
+
+    def test_responses_within_the_settle_time_wait_for_the_next_delta(self):
+        settled = self.create_responses(1)
+        recent = self.create_responses(1, start=timezone.now())
+        with self.settings(EXPORT_DELTA_SETTLE_SECONDS=3600):
+            ids, cursor = self.delta('')
+        self.assertEqual(ids, [settled[0].id])
+        self.assertEqual(self.delta(cursor)[0], [recent[0].id])
+
+    def test_invalid_cursor(self):
+        response = self.export(format='ndjson', since='garbage')
+        self.assertEqual(response.status_code, 400)
+
+
+class ShardedExportTests(ExportTestCase):
+    # Shards are rendered in-process: forked pool workers cannot see the
+    # test database
+
+    def render_shards(self, export_format, shard_size=3):
+        shards = plan_shards(FormResponse.objects.filter(form=self.form), shard_size)
+        paths = [self.export_root / f'part{index}.{export_format}' for index in range(len(shards))]
+        parts = [
+            render_shard(self.form.id, first_id, last_id, export_format, str(path))
+            for (first_id, last_id), path in zip(shards, paths)
+        ]
+        return parts, paths
+
+    def test_plan_shards(self):
+        ids = [response.id for response in self.create_responses(7)]
+        shards = plan_shards(FormResponse.objects.filter(form=self.form), 3)
+        self.assertEqual(shards, [(ids[0], ids[2]), (ids[3], ids[5]), (ids[6], ids[6])])
+        self.assertEqual(plan_shards(FormResponse.objects.none(), 3), [])
+
+    def test_merged_workbook_has_a_sheet_per_part(self):
+        ids = [response.id for response in self.create_responses(7)]
+        parts, paths = self.render_shards('xlsx')
+        self.assertEqual([part['rows'] for part in parts], [3, 3, 1])
+
+        merged = self.export_root / 'merged.xlsx'
+        merge_workbook_parts(paths, ['One', 'Two', 'Three'], merged)
+        workbook = load_workbook(merged, read_only=True)
+        self.assertEqual(workbook.sheetnames, ['One', 'Two', 'Three'])
+        exported = [
+            row[0]
+            for sheet in workbook.worksheets
+            for row in sheet.iter_rows(min_row=2, values_only=True)
+        ]
+        self.assertEqual(exported, ids)
+        self.assertEqual(next(workbook.worksheets[1].iter_rows(values_only=True))[0], 'Submission ID')
+
+    def test_parts_zip_manifest(self):
+        self.create_responses(5)
+        parts, paths = self.render_shards('csv')
+        archive_path = self.export_root / 'parts.zip'
+        write_parts_zip(self.form, 'csv', parts, self.export_root, archive_path)
+
+        with zipfile.ZipFile(archive_path) as archive:
+            manifest = json.loads(archive.read('manifest.json'))
+            self.assertEqual(manifest['rows'], 5)
+            self.assertEqual(sorted(archive.namelist()), sorted(['manifest.json'] + [path.name for path in paths]))
+
+    def test_invalid_options(self):
+        path = self.export_root / 'out.zip'
+        with self.assertRaisesMessage(ValueError, "requires the xlsx format"):
+            run_sharded_export(self.form, path, export_format='csv', layout='sheets')
+        with self.assertRaisesMessage(ValueError, "No responses found"):
+            run_sharded_export(self.form, path, export_format='csv')
+
+
+class ExportBundleTests(TransactionTestCase):
+    # The bundle's rows are read by a helper thread with its own database
+    # connection, which only sees committed data
+
+    def setUp(self):
+        self.admin = User.objects.create_user(username='admin', email='admin@example.com', role='admin')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.forms = [
+            Form.objects.create(name=name, schema=SCHEMA, created_by=self.admin, allow_excel_download=True)
+            for name in ('First form', 'Second/form', 'Empty')
+        ]
+        for form, count in zip(self.forms, (3, 2, 0)):
+            FormResponse.objects.bulk_create(
+                FormResponse(form=form, user=self.admin, response_data={'name': f'{form.name} {index}'})
+                for index in range(count)
+            )
+
+    def bundle(self, export_format, form_ids=None):
+        form_ids = form_ids or [form.id for form in self.forms]
+        return self.client.post('/api/forms/export-bundle/', {'forms': form_ids, 'format': export_format}, format='json')
+
+    def test_bundle_has_a_file_per_form(self):
+        response = self.bundle('ndjson')
+        self.assertEqual(response.status_code, 200)
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+
+        first, second, empty = self.forms
+        self.assertEqual(archive.namelist(), [
+            f'{first.id}_First_form_responses.ndjson',
+            f'{second.id}_Second_form_responses.ndjson',
+            f'{empty.id}_Empty_responses.ndjson',
+        ])
+        for form, name in zip(self.forms, archive.namelist()):
+            rows = [json.loads(line) for line in archive.read(name).splitlines()]
+            self.assertEqual(
+                sorted(row['name'] for row in rows),
+                sorted(FormResponse.objects.filter(form=form).values_list('response_data__name', flat=True)),
+            )
+
+    def test_xlsx_bundle(self):
+        response = self.bundle('xlsx', [self.forms[0].id])
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        workbook = load_workbook(io.BytesIO(archive.read(archive.namelist()[0])), read_only=True)
+        self.assertEqual(len(list(workbook.active.iter_rows(min_row=2))), 3)
+
+    def test_forms_must_allow_downloads(self):
+        Form.objects.filter(pk=self.forms[1].pk).update(allow_excel_download=False)
+        response = self.bundle('csv')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.data['forms'], [self.forms[1].id])
+        self.assertEqual(self.bundle('csv', [self.forms[0].id, 999999]).status_code, 404)
+
+
+@override_settings(
+    AWS_ACCESS_KEY_ID='testing',
+    AWS_SECRET_ACCESS_KEY='testing',
+    AWS_STORAGE_BUCKET_NAME='uploads',
+    AWS_S3_REGION_NAME='us-east-1',
+    AWS_S3_ENDPOINT_URL='',
+    S3_STREAMING_UPLOADS=True,
+)
+class S3TestCase(FormTestCase):
+    """Storage mocked by moto, with an 'uploads' bucket."""
+
+    def setUp(self):
+        super().setUp()
+        self.enterContext(mock_aws())
+        reset_s3_client()
+        self.addCleanup(reset_s3_client)
+        self.s3 = boto3.client('s3', region_name='us-east-1')
+        self.s3.create_bucket(Bucket='uploads')
+
+    def stored_keys(self):
+        return [obj['Key'] for obj in self.s3.list_objects_v2(Bucket='uploads').get('Contents', [])]
+
+
+class S3ClientTests(S3TestCase):
+    def test_client_is_shared(self):
+        client = get_s3_client()
+        with ThreadPoolExecutor(4) as executor:
+            self.assertEqual(set(executor.map(lambda _: get_s3_client(), range(8))), {client})
+
+        reset_s3_client()
+        self.assertIsNot(get_s3_client(), client)
+
+    def test_missing_credentials(self):
+        reset_s3_client()
+        with self.settings(AWS_SECRET_ACCESS_KEY=''), self.assertRaises(ValueError):
+            get_s3_client()
+
+    def test_addressing_style(self):
+        client = get_s3_client()
+        self.assertEqual(client.meta.config.s3['addressing_style'], 'virtual')
+        self.assertTrue(client.generate_presigned_url(
+            'get_object', Params={'Bucket': 'uploads', 'Key': 'a.pdf'}
+        ).startswith('https://uploads.s3.amazonaws.com/a.pdf?'))
+
+        # Local stand-ins only understand path-style addressing
+        reset_s3_client()
+        with self.settings(AWS_S3_ENDPOINT_URL='http://minio:9000'):
+            client = get_s3_client()
+            self.assertEqual(client.meta.config.s3['addressing_style'], 'path')
+            self.assertTrue(client.generate_presigned_url(
+                'get_object', Params={'Bucket': 'uploads', 'Key': 'a.pdf'}
+            ).startswith('http://minio:9000/uploads/a.pdf?'))
+            self.assertEqual(get_s3_file_url('a.pdf'), 'http://minio:9000/uploads/a.pdf')
+
+    def files(self):
+        return {
+            'cv': SimpleUploadedFile('cv.pdf', b'%PDF', 'application/pdf'),
+            'photo': SimpleUploadedFile('me.png', b'PNG', 'image/png'),
+        }
+
+    def test_parallel_upload(self):
+        urls = upload_files_to_s3(self.files(), self.form.id)
+        self.assertEqual(sorted(urls), ['cv', 'photo'])
+        keys = self.stored_keys()
+        self.assertEqual(len(keys), 2)
+        for field_name, url in urls.items():
+            [key] = [key for key in keys if url.endswith(key)]
+            self.assertIn(f'/{field_name}_', key)
+
+    def test_failure_of_one_file_is_raised(self):
+        upload = upload_file_to_s3
+
+        def fail_photo(file, form_id, field_name):
+            if field_name == 'photo':
+                raise OSError('connection reset')
+            return upload(file, form_id, field_name)
+
+        with mock.patch('formsApp.utils.upload_file_to_s3', fail_photo):
+            with self.assertRaisesMessage(FileUploadError, 'connection reset') as raised:
+                upload_files_to_s3(self.files(), self.form.id)
+        self.assertEqual(raised.exception.field_name, 'photo')
+
+
+class StreamingUploadTests(S3TestCase):
+    def post(self, data):
+        return self.viewer_client.post(f'/api/forms/{self.form.id}/submit/', data, format='multipart')
+
+    def pending_uploads(self):
+        return self.s3.list_multipart_uploads(Bucket='uploads').get('Uploads', [])
+
+    def test_file_is_stored_with_the_submission(self):
+        response = self.post({'name': 'a', 'cv': SimpleUploadedFile('cv.pdf', b'%PDF' * 100, 'application/pdf')})
+        self.assertEqual(response.status_code, 201)
+
+        [key] = self.stored_keys()
+        self.assertTrue(response.data['data']['response_data']['cv'].endswith(key))
+        self.assertEqual(self.s3.get_object(Bucket='uploads', Key=key)['Body'].read(), b'%PDF' * 100)
+
+    def test_invalid_submission_discards_its_files(self):
+        response = self.post({'cv': SimpleUploadedFile('cv.pdf', b'x' * 1000, 'application/pdf')})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.stored_keys(), [])
+
+    def test_invalid_submission_aborts_multipart_uploads(self):
+        big = SimpleUploadedFile('big.bin', b'x' * (6 * 1024 * 1024), 'application/octet-stream')
+        response = self.post({'age': 'not a number', 'name': 'a', 'cv': big})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.stored_keys(), [])
+        self.assertEqual(self.pending_uploads(), [])
+
+    def test_only_the_used_file_is_kept(self):
+        files = [SimpleUploadedFile(f'cv{index}.pdf', b'x', 'application/pdf') for index in range(2)]
+        response = self.post({'name': 'a', 'cv': files})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(self.stored_keys()), 1)
+
+    def test_storage_failure(self):
+        with self.settings(AWS_STORAGE_BUCKET_NAME='missing'), self.assertLogs('formsApp.uploads', 'ERROR'):
+            response = self.post({'name': 'a', 'cv': SimpleUploadedFile('cv.pdf', b'x', 'application/pdf')})
+        self.assertEqual(response.status_code, 500)
+        self.assertIn('Failed to upload file for field cv', response.data['error'])
+        self.assertFalse(FormResponse.objects.filter(form=self.form).exists())
+
+
+class DirectUploadTests(S3TestCase):
+    def issue(self, method='post', client=None, field='cv'):
+        client = client or self.viewer_client
+        response = client.post(
+            f'/api/forms/{self.form.id}/upload-urls/',
+            {'method': method, 'files': [{'field': field, 'filename': 'cv.pdf', 'content_type': 'application/pdf'}]},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        [upload] = response.data['uploads']
+        return upload
+
+    def submit_key(self, key, client=None):
+        client = client or self.viewer_client
+        return client.post(f'/api/forms/{self.form.id}/submit/', {'name': 'a', 'cv': key}, format='json')
+
+    def test_presigned_post(self):
+        upload = self.issue('post')
+        self.assertEqual(upload['upload']['method'], 'POST')
+        self.assertEqual(upload['upload']['fields']['Content-Type'], 'application/pdf')
+        target = upload['upload']
+        stored = requests.post(target['url'], data=target['fields'], files={'file': ('cv.pdf', b'%PDF')})
+        self.assertLess(stored.status_code, 300)
+
+        response = self.submit_key(upload['key'])
+        self.assertEqual(response.status_code, 201, response.data)
+        [key] = self.stored_keys()
+        self.assertTrue(upload['key'].startswith(f'{key}:'))
+        self.assertTrue(response.data['data']['response_data']['cv'].endswith(key))
+
+    def test_presigned_put(self):
+        upload = self.issue('put')
+        target = upload['upload']
+        self.assertEqual((target['method'], target['headers']), ('PUT', {'Content-Type': 'application/pdf'}))
+        stored = requests.put(target['url'], data=b'%PDF', headers=target['headers'])
+        self.assertEqual(stored.status_code, 200)
+        self.assertEqual(self.submit_key(upload['key']).status_code, 201)
+
+    def test_foreign_or_unsigned_key_is_refused(self):
+        upload = self.issue('put')
+        requests.put(upload['upload']['url'], data=b'%PDF', headers=upload['upload']['headers'])
+        object_key, _, signature = upload['key'].rpartition(':')
+
+        # Issued to another user, not signed, or signed for another key
+        for key, client in (
+            (upload['key'], self.admin_client),
+            (object_key, self.viewer_client),
+            (f'{object_key}x:{signature}', self.viewer_client),
+        ):
+            with self.subTest(key=key):
+                response = self.submit_key(key, client)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('Failed to verify file for field cv', response.data['error'])
+        self.assertFalse(FormResponse.objects.filter(form=self.form).exists())
+
+    def test_missing_upload(self):
+        response = self.submit_key(self.issue()['key'])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'File for field cv was not found in storage')
+
+    def test_only_file_fields(self):
+        response = self.viewer_client.post(
+            f'/api/forms/{self.form.id}/upload-urls/',
+            {'files': [{'field': 'name', 'filename': 'cv.pdf'}]},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(EXPORT_JOB_MAX_ATTEMPTS=3, EXPORT_JOB_RETENTION_SECONDS=3600)
+class ExportJobTests(ExportTestCase):
+    def run_job(self):
+        job, created = enqueue_export_job(self.form, self.admin, 'csv')
+        self.assertEqual(claim_pending_jobs(10), [job.id])
+        run_export_job(job.id)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done')
+        return job
+
+    def test_finished_job_is_reused(self):
+        self.submit({'name': 'a'})
+        job = self.run_job()
+        self.assertEqual(job.row_count, 1)
+        self.assertTrue(os.path.exists(job.file_path))
+        self.assertEqual(enqueue_export_job(self.form, self.admin, 'csv'), (job, False))
+
+    def test_download_requires_downloads_to_be_enabled(self):
+        self.submit({'name': 'a'})
+        job = self.run_job()
+        url = f'/api/exports/{job.id}/download/'
+        response = self.admin_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'Submission ID', b''.join(response.streaming_content))
+
+        Form.objects.filter(pk=self.form.pk).update(allow_excel_download=False)
+        self.assertEqual(self.admin_client.get(url).status_code, 403)
+
+    def test_missing_file_is_built_again(self):
+        self.submit({'name': 'a'})
+        job = self.run_job()
+        os.unlink(job.file_path)
+
+        new_job, created = enqueue_export_job(self.form, self.admin, 'csv')
+        self.assertTrue(created)
+        self.assertNotEqual(new_job.id, job.id)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), ('failed', "Export file is no longer available"))
+
+    def test_crashed_jobs_are_retried_until_max_attempts(self):
+        job, _ = enqueue_export_job(self.form, self.admin, 'csv')
+        for attempt in range(1, 4):
+            self.assertEqual(claim_pending_jobs(10), [job.id])
+            job.refresh_from_db()
+            self.assertEqual(job.attempts, attempt)
+            requeued, failed = release_crashed_jobs(ExportJob.objects.filter(id=job.id))
+            self.assertEqual((requeued, failed), (1, 0) if attempt < 3 else (0, 1))
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), ('failed', "Export worker process died"))
+        self.assertEqual(claim_pending_jobs(10), [])
+
+    def test_jobs_of_an_exited_worker_are_picked_up_again(self):
+        self.submit({'name': 'a'})
+        job, _ = enqueue_export_job(self.form, self.admin, 'csv')
+        exited = subprocess.Popen([sys.executable, '-c', ''])
+        exited.wait()
+        self.assertEqual(claim_pending_jobs(10, f'{socket.gethostname()}:{exited.pid}'), [job.id])
+
+        # A job started just now is not stale yet, but its worker is gone
+        self.assertEqual(requeue_stale_jobs(), (0, 0))
+        self.assertEqual(requeue_orphaned_jobs(), (1, 0))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.worker), ('pending', ''))
+
+        self.assertEqual(claim_pending_jobs(10, get_worker_id()), [job.id])
+        run_export_job(job.id)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.row_count), ('done', 2, 1))
+
+    def test_jobs_of_running_workers_are_left_alone(self):
+        job, _ = enqueue_export_job(self.form, self.admin, 'csv')
+        claim_pending_jobs(10, get_worker_id())
+        ExportJob.objects.filter(id=job.id).update(worker='other-host:1')
+        self.assertEqual(requeue_orphaned_jobs(), (0, 0))
+
+    @override_settings(EXPORT_JOB_TIMEOUT=60)
+    def test_hanging_job_is_requeued_and_its_late_result_dropped(self):
+        self.submit({'name': 'a'})
+        job, _ = enqueue_export_job(self.form, self.admin, 'csv')
+        claim_pending_jobs(10, get_worker_id())
+
+        def hang(*args):
+            # Still running after EXPORT_JOB_TIMEOUT; the job is claimed again
+            ExportJob.objects.filter(id=job.id).update(started_at=timezone.now() - timedelta(minutes=5))
+            self.assertEqual(requeue_stale_jobs(), (1, 0))
+            self.assertEqual(claim_pending_jobs(10, get_worker_id()), [job.id])
+            return 1
+
+        with mock.patch('formsApp.exports.write_export_file', side_effect=hang):
+            run_export_job(job.id)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('running', 2))
+
+    def test_purge_expired_exports(self):
+        self.submit({'name': 'a'})
+        job = self.run_job()
+        orphan = Path(job.file_path).with_name('orphan.csv.part')
+        orphan.write_bytes(b'partial')
+        recent = Path(job.file_path).with_name('recent.csv.part')
+        recent.write_bytes(b'partial')
+
+        self.assertEqual(purge_expired_exports(), (0, 0))
+
+        old = (timezone.now() - timedelta(hours=2)).timestamp()
+        os.utime(orphan, (old, old))
+        ExportJob.objects.filter(id=job.id).update(finished_at=timezone.now() - timedelta(hours=2))
+        self.assertEqual(purge_expired_exports(), (1, 1))
+        self.assertFalse(ExportJob.objects.filter(id=job.id).exists())
+        self.assertFalse(orphan.exists())
+        self.assertTrue(recent.exists())
+
+
+@override_settings(EXPORT_CACHE_MAX_BYTES=0)
+class ExcelExportTests(ExportTestCase):
+    def rows(self, response):
+        self.assertEqual(response.status_code, 200)
+        workbook = load_workbook(io.BytesIO(response.body), read_only=True)
+        return [list(row) for row in workbook.active.iter_rows(values_only=True)]
+
+    def test_streamed_workbook_matches_the_in_memory_one(self):
+        self.submit({'name': 'Ada', 'age': 36, 'tags': ['a', 'b'], 'when': '2024-03-14'})
+        self.submit({'name': 'Bob', 'dept': 'Eng'})
+
+        streamed = self.rows(self.export(stream='true'))
+        self.assertEqual(streamed, self.rows(self.export(stream='false')))
+        self.assertEqual(streamed[0][:4], ['Submission ID', 'User Email', 'Submitted At', 'name'])
+        self.assertEqual(sorted(row[3] for row in streamed[1:]), ['Ada', 'Bob'])
+
+    def test_form_without_responses(self):
+        self.assertEqual(self.export(stream='true').status_code, 404)
+
+    def test_rows_are_exported_newest_first_with_ties_by_id(self):
+        # Inserted directly, so the form's response counter is still 0
+        responses = self.create_responses(3)
+        FormResponse.objects.filter(id=responses[0].id).update(submitted_at=responses[1].submitted_at)
+
+        for stream in ('true', 'false'):
+            with self.subTest(stream=stream):
+                ids = [row[0] for row in self.rows(self.export(stream=stream))[1:]]
+                self.assertEqual(ids, [responses[2].id, responses[1].id, responses[0].id])
+
+    def test_streamed_workbook_is_timed(self):
+        self.submit({'name': 'Ada', 'age': 36})
+        registry.reset()
+        self.addCleanup(registry.reset)
+
+        with override_settings(PERFORMANCE_INSTRUMENTATION=True):
+            client = self.client_for(self.admin)
+            response = client.get(f'/api/forms/{self.form.id}/export-excel/', {'stream': 'true'})
+        self.assertIn('total;dur=', response.headers['Server-Timing'])
+
+        # The workbook is rendered while the content is sent, and only then
+        # is the request recorded
+        self.assertNotIn('http_request_excel_seconds', self.timings())
+        with self.assertLogs('forms.performance') as logs:
+            b''.join(response.streaming_content)
+        self.assertIn('excel_ms', logs.records[0].performance)
+        excel = self.timings()['http_request_excel_seconds']
+        self.assertEqual(excel['count'], 1)
+        self.assertGreater(excel['sum'], 0)
+        self.assertEqual(self.timings()['http_request_db_seconds']['count'], 1)
+
+    def timings(self):
+        return {timing['name']: timing for timing in registry.snapshot()['timings']}
+
+
+class SyntheticDataTests(TestCase):
+    def test_generate_synthetic_data(self):
+        call_command(
+            'generate_synthetic_data', forms=3, users=5, responses=60, fields=9, batch_size=25,
+            seed=1, prefix='synthetic', stdout=io.StringIO(),
+        )
+        forms = Form.objects.filter(name__startswith='synthetic')
+        self.assertEqual(forms.count(), 3)
+        self.assertEqual(User.objects.filter(username__startswith='synthetic_').count(), 5)
+        self.assertEqual(sum(form.response_count for form in forms), 60)
+
+        for form in forms:
+            validator = CompiledFormSchema(form.schema)
+            self.assertEqual({field.get('type') for field in form.schema['fields']}, set(FIELD_TYPES))
+            for response in FormResponse.objects.filter(form=form):
+                validator.validate(response.response_data)
+            if form.response_count:
+                self.assertEqual(
+                    sum(FormAggregate.objects.filter(form=form, kind='day').values_list('count', flat=True)),
+                    form.response_count,
+                )
+
+
+class FormCacheTests(FormTestCase):
+    def cached_form(self, state=None):
+        build = mock.Mock(return_value={'id': self.form.id})
+        data = get_cached_form(self.form.id, build, state or get_form_state(self.form.id))
+        self.assertEqual(data, {'id': self.form.id})
+        return build.call_count
+
+    def test_read_through(self):
+        self.assertEqual(self.cached_form(), 1)
+        self.assertEqual(self.cached_form(), 0)
+
+        build = mock.Mock(return_value=[])
+        get_cached_form_list(build, get_form_list_state())
+        get_cached_form_list(build, get_form_list_state())
+        self.assertEqual(build.call_count, 1)
+
+    def test_save_and_delete_invalidate(self):
+        state = get_form_state(self.form.id)
+        self.cached_form(state)
+        self.form.save()
+        self.assertEqual(self.cached_form(state), 1)
+
+        other = Form.objects.create(name='Other', schema=SCHEMA, created_by=self.admin)
+        list_state = get_form_list_state()
+        build = mock.Mock(return_value=[])
+        get_cached_form_list(build, list_state)
+        other.delete()
+        get_cached_form_list(build, list_state)
+        self.assertEqual(build.call_count, 2)
+
+    def test_change_missed_by_this_process_is_not_served(self):
+        url = f'/api/forms/{self.form.id}/'
+        first = self.admin_client.get(url)
+        self.assertEqual(first.data['name'], 'Survey')
+
+        # Saved by another worker: its invalidation did not reach this
+        # process's cache
+        Form.objects.filter(pk=self.form.pk).update(name='Renamed', updated_at=timezone.now())
+        second = self.admin_client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.data['name'], 'Renamed')
+        self.assertEqual(self.admin_client.get('/api/forms/').data[0]['name'], 'Renamed')
+
+    def hold_lock(self, on_wait=None):
+        """Make the rebuild lock look taken by another request."""
+        form_cache = caches['default']
+        add = form_cache.add
+        lock_keys = []
+
+        def add_unless_lock(key, *args, **kwargs):
+            if key.endswith(':lock'):
+                lock_keys.append(key)
+                return False
+            return add(key, *args, **kwargs)
+
+        def sleep(seconds):
+            if on_wait is not None:
+                form_cache.set(lock_keys[-1].removesuffix(':lock'), on_wait)
+
+        return [
+            mock.patch.object(form_cache, 'add', side_effect=add_unless_lock),
+            mock.patch('formsApp.cache.time.sleep', side_effect=sleep),
+        ]
+
+    def test_concurrent_build_is_awaited(self):
+        # The request holding the lock stores its result while we wait
+        for patch in self.hold_lock(on_wait={'id': 'other'}):
+            self.enterContext(patch)
+        build = mock.Mock()
+        self.assertEqual(get_cached_form(self.form.id, build, get_form_state(self.form.id)), {'id': 'other'})
+        build.assert_not_called()
+
+    @override_settings(FORM_CACHE_LOCK_WAIT=0.2)
+    def test_lock_wait_times_out(self):
+        for patch in self.hold_lock():
+            self.enterContext(patch)
+        self.assertEqual(self.cached_form(), 1)
+
+
+@override_settings(SLOW_QUERY_THRESHOLD_MS=1e-6, SLOW_QUERY_EXPLAIN_SAMPLE_RATE=1.0)
+class SlowQueryLogTests(FormTestCase):
+    def setUp(self):
+        super().setUp()
+        querylog._pending.clear()
+        self.addCleanup(querylog._pending.clear)
+        # Installed on new connections by querylog.enable(); the test
+        # connection is already open
+        self.enterContext(connection.execute_wrapper(querylog.log_slow_queries))
+
+    def test_job_queries_are_saved(self):
+        @querylog.logs_slow_queries('test-job')
+        def job():
+            return Form.objects.filter(name='Survey').count()
+
+        self.assertEqual(job(), 1)
+        # Saving the entry is not logged itself
+        [entry] = SlowQuery.objects.all()
+        self.assertEqual((entry.origin, entry.alias), ('test-job', 'default'))
+        self.assertIn('formsApp_form', entry.sql)
+        self.assertIn('Survey', entry.params)
+        self.assertTrue(entry.plan)
+        self.assertFalse(entry.plan.startswith('EXPLAIN failed'))
+
+    def test_view_queries_are_attributed_to_the_view(self):
+        querylog.enable()
+        self.addCleanup(request_finished.disconnect, dispatch_uid='formsApp.querylog.flush')
+        self.addCleanup(connection_created.disconnect, dispatch_uid='formsApp.querylog.install')
+
+        self.assertEqual(self.client_for(self.admin).get('/api/forms/').status_code, 200)
+        self.assertEqual(set(SlowQuery.objects.values_list('origin', flat=True)), {'form-list'})
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=60000)
+    def test_fast_queries_are_not_saved(self):
+        querylog.logs_slow_queries('test-job')(Form.objects.count)()
+        self.assertFalse(SlowQuery.objects.exists())
+
+    @override_settings(SLOW_QUERY_LOG_SIZE=2, SLOW_QUERY_EXPLAIN_SAMPLE_RATE=0.0)
+    def test_only_the_newest_are_kept(self):
+        @querylog.logs_slow_queries('test-job')
+        def job():
+            for name in ('a', 'b', 'c'):
+                Form.objects.filter(name=name).exists()
+
+        job()
+        entries = list(SlowQuery.objects.values_list('params', 'plan'))
+        self.assertEqual(len(entries), 2)
+        self.assertIn("'c'", entries[0][0])
+        self.assertEqual({plan for _, plan in entries}, {''})
@@ -0,0 +1,289 @@
+"""
+Streaming upload of submission files to storage.
+
+S3StreamingUploadHandler sits in front of Django's upload handlers for
+form submissions. Each chunk of a file field is appended to a buffer of one
+multipart part, and every full part is sent to storage while the rest of
+the request is still being received. A file is never held in memory or
+spooled to disk as a whole, and it is not read a second time for the
+upload: memory per upload stays at one part of S3_STREAMING_UPLOAD_PART_SIZE
+(at least the 5MB S3 minimum), briefly two while a full part is handed
+over. Files smaller than a part are sent with a single PUT.
+
+Works with any S3 compatible storage, including a local stand-in such as
+moto server or MinIO (see AWS_S3_ENDPOINT_URL).
+"""
+
+import base64
+import hashlib
+import logging
+import time
+
+from botocore.exceptions import BotoCoreError, ClientError
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, StopFutureHandlers
+from django.http.multipartparser import MultiPartParserError
+
+from forms.instrumentation import timed
+from forms.metrics import registry
+
+from .models import Form
+from .utils import FileUploadError, get_s3_client, get_s3_file_url, get_upload_key
+from .validation import get_form_validator
+
+logger = logging.getLogger(__name__)
+
+S3_MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+def _b64_sha256(digest):
+    return base64.b64encode(digest).decode('ascii')
+
+
+class S3MultipartWriter:
+    """
+    Write an object to storage part by part as data arrives.
+
+    The SHA-256 of the whole object is computed on the fly. Every part is
+    sent with its own checksum, which storage verifies.
+    """
+
+    def __init__(self, key, content_type, part_size=None):
+        self.client = get_s3_client()
+        self.bucket = settings.AWS_STORAGE_BUCKET_NAME
+        self.key = key
+        self.content_type = content_type or 'application/octet-stream'
+        self.part_size = max(S3_MIN_PART_SIZE, part_size or settings.S3_STREAMING_UPLOAD_PART_SIZE)
+        self.upload_id = None
+        self.parts = []
+        self.buffer = bytearray()
+        self.size = 0
+        self.sha256 = hashlib.sha256()
+        self.completed = False
+        self.elapsed = 0.0
+
+    def write(self, data):
+        self.sha256.update(data)
+        self.size += len(data)
+        self.buffer += data
+        if len(self.buffer) >= self.part_size:
+            # Parts only need to be at least 5MB, so the whole buffer (one
+            # chunk over part_size at most) is sent and released at once
+            part, self.buffer = bytes(self.buffer), bytearray()
+            self._upload_part(part)
+
+    @timed('s3')
+    def _upload_part(self, data):
+        start = time.perf_counter()
+        if self.upload_id is None:
+            self.upload_id = self.client.create_multipart_upload(
+                Bucket=self.bucket,
+                Key=self.key,
+                ContentType=self.content_type,
+                ChecksumAlgorithm='SHA256',
+            )['UploadId']
+        part_number = len(self.parts) + 1
+        checksum = _b64_sha256(hashlib.sha256(data).digest())
+        result = self.client.upload_part(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self.upload_id,
+            PartNumber=part_number,
+            Body=data,
+            ChecksumSHA256=checksum,
+        )
+        self.parts.append({'ETag': result['ETag'], 'PartNumber': part_number, 'ChecksumSHA256': checksum})
+        self.elapsed += time.perf_counter() - start
+
+    @timed('s3')
+    def complete(self):
+        """Send the remaining data and finish the object."""
+        start = time.perf_counter()
+        if self.upload_id is None:
+            self.client.put_object(
+                Bucket=self.bucket,
+                Key=self.key,
+                Body=bytes(self.buffer),
+                ContentType=self.content_type,
+                ChecksumSHA256=_b64_sha256(self.sha256.digest()),
+            )
+        else:
+            if self.buffer:
+                self._upload_part(bytes(self.buffer))
+            self.client.complete_multipart_upload(
+                Bucket=self.bucket,
+                Key=self.key,
+                UploadId=self.upload_id,
+                MultipartUpload={'Parts': self.parts},
+            )
+        self.buffer = bytearray()
+        self.completed = True
+        self.elapsed += time.perf_counter() - start
+
+    def abort(self):
+        """Remove everything written so far: the parts, or the finished object."""
+        self.buffer = bytearray()
+        try:
+            if self.completed:
+                self.client.delete_object(Bucket=self.bucket, Key=self.key)
+            elif self.upload_id is not None:
+                self.client.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id)
+        except (BotoCoreError, ClientError) as e:
+            # Incomplete multipart uploads are also removed by the bucket's lifecycle rules
+            logger.warning(f"Could not discard upload {self.key}: {e}")
+
+
+class StreamedUploadedFile(UploadedFile):
+    """A file already stored by S3StreamingUploadHandler; it has no content to read."""
+
+    def __init__(self, writer, name, content_type, charset=None, content_type_extra=None):
+        super().__init__(None, name, content_type, writer.size, charset, content_type_extra)
+        self.writer = writer
+        self.key = writer.key
+        self.url = get_s3_file_url(writer.key)
+        self.sha256 = writer.sha256.hexdigest()
+
+    def open(self, mode=None):
+        raise ValueError("Streamed uploads are stored remotely and cannot be opened")
+
+    def close(self):
+        pass
+
+
+class S3StreamingUploadHandler(FileUploadHandler):
+    """
+    Upload handler sending the file fields of a form submission straight to
+    storage. Other files are passed on to the next handlers.
+
+    The file fields are looked up when the first file arrives, from the
+    form given to set_streaming_upload_form (the view's already fetched
+    form). Only when the body is parsed before the view gets there, e.g.
+    by the CSRF check of session authentication, is the form queried here.
+
+    Call discard_streamed_uploads when the submission is rejected, so the
+    stored files are removed again.
+    """
+
+    def __init__(self, request, form_id):
+        super().__init__(request)
+        self.form_id = form_id
+        self.form = None
+        self.file_fields = None
+        self.writer = None
+        self.writers = []
+
+    def _get_file_fields(self):
+        form = self.form
+        if form is None:
+            try:
+                form = Form.objects.filter(id=self.form_id).first()
+            except ValueError:
+                form = None  # Not a form id; the view answers with a 404
+        return set(get_form_validator(form).file_fields) if form is not None else set()
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self.writer = None
+        if self.file_fields is None:
+            self.file_fields = self._get_file_fields()
+        if field_name not in self.file_fields:
+            return
+
+        try:
+            self.writer = S3MultipartWriter(
+                get_upload_key(self.form_id, field_name, self.file_name or ''),
+                self.content_type,
+            )
+        except ValueError as e:
+            raise FileUploadError(field_name, e)
+        self.writers.append(self.writer)
+        raise StopFutureHandlers()
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.writer is None:
+            return raw_data
+
+        if self.writer.size + len(raw_data) > settings.S3_STREAMING_UPLOAD_MAX_SIZE:
+            self.discard()
+            raise MultiPartParserError(
+                f"File for field {self.field_name} is larger than "
+                f"{settings.S3_STREAMING_UPLOAD_MAX_SIZE} bytes"
+            )
+        try:
+            self.writer.write(raw_data)
+        except (BotoCoreError, ClientError) as e:
+            self._fail(e)
+        return None
+
+    def file_complete(self, file_size):
+        if self.writer is None:
+            return None
+
+        try:
+            self.writer.complete()
+        except (BotoCoreError, ClientError) as e:
+            self._fail(e)
+
+        registry.observe('s3_upload_seconds', self.writer.elapsed)
+        registry.incr('s3_upload_bytes', self.writer.size)
+        logger.info(
+            f"File streamed to S3 in {self.writer.elapsed * 1000:.0f}ms "
+            f"({self.writer.size} bytes, sha256 {self.writer.sha256.hexdigest()}): {self.writer.key}"
+        )
+        uploaded = StreamedUploadedFile(
+            self.writer, self.file_name, self.content_type, self.charset, self.content_type_extra
+        )
+        self.writer = None
+        return uploaded
+
+    def upload_interrupted(self):
+        self.discard()
+
+    def _fail(self, error):
+        registry.incr('s3_upload_failures')
+        logger.error(f"S3 streaming upload failed: {str(error)}")
+        field_name = self.field_name
+        self.discard()
+        raise FileUploadError(field_name, Exception(f"Failed to upload file to S3: {str(error)}"))
+
+    def discard(self, keep=()):
+        """
+        Remove the files stored by this handler.
+
+        Args:
+            keep: StreamedUploadedFile objects to leave in storage
+        """
+        kept = {uploaded.writer for uploaded in keep}
+        for writer in self.writers:
+            if writer not in kept:
+                writer.abort()
+        self.writers = [writer for writer in self.writers if writer in kept]
+        self.writer = None
+
+
+def set_streaming_upload_form(request, form):
+    """
+    Hand the form a submission is for to the request's streaming upload
+    handler, before the body is parsed.
+
+    Args:
+        request: Request whose upload handlers stream the files
+        form: Form model instance fetched by the view
+    """
+    for handler in request.upload_handlers:
+        if isinstance(handler, S3StreamingUploadHandler):
+            handler.form = form
+
+
+def discard_streamed_uploads(request, keep=()):
+    """
+    Remove the files streamed to storage while parsing a request.
+
+    Args:
+        request: Request whose upload handlers streamed the files
+        keep: StreamedUploadedFile objects used by the saved submission
+    """
+    for handler in request.upload_handlers:
+        if isinstance(handler, S3StreamingUploadHandler):
+            handler.discard(keep)
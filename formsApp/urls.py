@@ -1,10 +1,16 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .viewsets import FormViewSet
+from .viewsets import FormViewSet, ExportJobViewSet
+from .views import MetricsView
+from . import async_views
 
 router = DefaultRouter()
 router.register(r'forms', FormViewSet, basename='form')
+router.register(r'exports', ExportJobViewSet, basename='exportjob')
 
 urlpatterns = [
+    path('metrics/', MetricsView.as_view(), name='metrics'),
+    path('async/forms/<int:pk>/submit/', async_views.submit, name='async-form-submit'),
+    path('async/forms/<int:pk>/responses/', async_views.responses, name='async-form-responses'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
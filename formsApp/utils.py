@@ -1,15 +1,158 @@
 import os
+import io
+import csv
+import json
+import queue
+import threading
+import time
+import uuid
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor
 from django.conf import settings
+from django.utils.crypto import constant_time_compare, salted_hmac
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, PatternFill, Alignment
+from openpyxl.utils import get_column_letter
 from io import BytesIO
 from datetime import datetime
 import logging
 
+from forms.instrumentation import timed, timed_iter
+from forms.metrics import registry
+
 logger = logging.getLogger(__name__)
 
+EXPORT_BASE_HEADERS = ["Submission ID", "User Email", "Submitted At"]
+
+
+class FileUploadError(Exception):
+    """Raised when uploading the file of a form field fails."""
+    
+    def __init__(self, field_name, error):
+        super().__init__(str(error))
+        self.field_name = field_name
+        self.error = error
+
+
+_s3_client = None
+_s3_client_lock = threading.Lock()
+_upload_executor = None
+_upload_executor_lock = threading.Lock()
+
+
+def get_s3_client():
+    """
+    Get the process-wide S3 client, creating it on first use.
+    
+    boto3 clients are thread-safe, so one client (and its connection pool)
+    is shared by every request and upload thread of the worker process.
+    
+    Returns:
+        S3 client
+    
+    Raises:
+        ValueError: If AWS credentials are not configured
+    """
+    global _s3_client
+    
+    if _s3_client is None:
+        if not all([settings.AWS_ACCESS_KEY_ID, settings.AWS_SECRET_ACCESS_KEY, settings.AWS_STORAGE_BUCKET_NAME]):
+            raise ValueError("AWS credentials are not configured. Please set AWS environment variables.")
+        
+        with _s3_client_lock:
+            if _s3_client is None:
+                session = boto3.session.Session(
+                    aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+                    aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+                    region_name=settings.AWS_S3_REGION_NAME
+                )
+                _s3_client = session.client(
+                    's3',
+                    endpoint_url=settings.AWS_S3_ENDPOINT_URL or None,
+                    config=Config(
+                        max_pool_connections=settings.AWS_S3_MAX_POOL_CONNECTIONS,
+                        retries={'max_attempts': 3, 'mode': 'standard'},
+                        # Presigned URLs must be SigV4 and point at the bucket's
+                        # regional virtual-hosted endpoint, or they fail outside
+                        # us-east-1 and on newer buckets. Local stand-ins only
+                        # understand path-style addressing.
+                        signature_version='s3v4',
+                        s3={'addressing_style': 'path' if settings.AWS_S3_ENDPOINT_URL else 'virtual'}
+                    )
+                )
+    return _s3_client
+
+
+def reset_s3_client():
+    """Drop the shared S3 client, e.g. after changing S3 settings in tests."""
+    global _s3_client
+    with _s3_client_lock:
+        _s3_client = None
+
+
+def get_s3_transfer_config():
+    return TransferConfig(
+        multipart_threshold=settings.AWS_S3_MULTIPART_THRESHOLD,
+        multipart_chunksize=settings.AWS_S3_MULTIPART_CHUNKSIZE,
+        max_concurrency=settings.AWS_S3_MAX_CONCURRENCY
+    )
+
+
+def get_upload_executor():
+    """
+    Get the process-wide thread pool used for concurrent file uploads.
+    
+    Returns:
+        ThreadPoolExecutor: Pool bounded by S3_UPLOAD_MAX_WORKERS
+    """
+    global _upload_executor
+    
+    if _upload_executor is None:
+        with _upload_executor_lock:
+            if _upload_executor is None:
+                _upload_executor = ThreadPoolExecutor(
+                    max_workers=settings.S3_UPLOAD_MAX_WORKERS,
+                    thread_name_prefix='s3-upload'
+                )
+    return _upload_executor
+
+
+def get_s3_file_url(s3_key):
+    """
+    Get the public URL of an object in the storage bucket.
+    
+    Args:
+        s3_key: Key of the object in the bucket
+    
+    Returns:
+        str: Public URL of the object
+    """
+    if settings.AWS_S3_ENDPOINT_URL:
+        return f'{settings.AWS_S3_ENDPOINT_URL.rstrip("/")}/{settings.AWS_STORAGE_BUCKET_NAME}/{s3_key}'
+    return f'https://{settings.AWS_STORAGE_BUCKET_NAME}.s3.{settings.AWS_S3_REGION_NAME}.amazonaws.com/{s3_key}'
+
+
+def get_upload_key(form_id, field_name, filename):
+    """
+    Build the storage key for a file uploaded with a submission.
+    
+    Args:
+        form_id: ID of the form
+        field_name: Name of the field in the form schema
+        filename: Original file name, for its extension
+    
+    Returns:
+        str: Object key in the storage bucket
+    """
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    file_extension = os.path.splitext(filename)[1]
+    # The suffix keeps files uploaded within the same second apart
+    return f'media/forms/{form_id}/{field_name}_{timestamp}_{uuid.uuid4().hex[:8]}{file_extension}'
+
 
 def upload_file_to_s3(file, form_id, field_name):
     """
@@ -26,21 +169,12 @@ def upload_file_to_s3(file, form_id, field_name):
     Raises:
         Exception: If upload fails
     """
-    if not all([settings.AWS_ACCESS_KEY_ID, settings.AWS_SECRET_ACCESS_KEY, settings.AWS_STORAGE_BUCKET_NAME]):
-        raise ValueError("AWS credentials are not configured. Please set AWS environment variables.")
+    s3_client = get_s3_client()
+    start = time.perf_counter()
     
     try:
-        s3_client = boto3.client(
-            's3',
-            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-            region_name=settings.AWS_S3_REGION_NAME
-        )
-        
         # Generate unique file name
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        file_extension = os.path.splitext(file.name)[1]
-        s3_key = f'media/forms/{form_id}/{field_name}_{timestamp}{file_extension}'
+        s3_key = get_upload_key(form_id, field_name, file.name)
         
         # Upload file without ACL (use bucket policy for public access instead)
         s3_client.upload_fileobj(
@@ -49,23 +183,212 @@ def upload_file_to_s3(file, form_id, field_name):
             s3_key,
             ExtraArgs={
                 'ContentType': file.content_type
-            }
+            },
+            Config=get_s3_transfer_config()
         )
         
         # Generate public URL
-        file_url = f'https://{settings.AWS_STORAGE_BUCKET_NAME}.s3.{settings.AWS_S3_REGION_NAME}.amazonaws.com/{s3_key}'
+        file_url = get_s3_file_url(s3_key)
         
-        logger.info(f"File uploaded successfully to S3: {file_url}")
+        elapsed = time.perf_counter() - start
+        registry.observe('s3_upload_seconds', elapsed)
+        registry.incr('s3_upload_bytes', file.size or 0)
+        logger.info(f"File uploaded successfully to S3 in {elapsed * 1000:.0f}ms: {file_url}")
         return file_url
         
     except ClientError as e:
+        registry.incr('s3_upload_failures')
         logger.error(f"S3 upload failed: {str(e)}")
         raise Exception(f"Failed to upload file to S3: {str(e)}")
     except Exception as e:
+        registry.incr('s3_upload_failures')
         logger.error(f"Unexpected error during S3 upload: {str(e)}")
         raise
 
 
+@timed('s3')
+def upload_files_to_s3(files, form_id):
+    """
+    Upload the files of several form fields concurrently.
+    
+    Args:
+        files: Dict mapping field names to UploadedFile objects
+        form_id: ID of the form
+    
+    Returns:
+        dict: Field names mapped to public URLs of the uploaded files
+    
+    Raises:
+        FileUploadError: For the first field whose upload failed
+    """
+    if len(files) == 1:
+        field_name, file = next(iter(files.items()))
+        try:
+            return {field_name: upload_file_to_s3(file, form_id, field_name)}
+        except Exception as e:
+            raise FileUploadError(field_name, e)
+    
+    executor = get_upload_executor()
+    futures = {
+        field_name: executor.submit(upload_file_to_s3, file, form_id, field_name)
+        for field_name, file in files.items()
+    }
+    
+    urls = {}
+    errors = []
+    for field_name, future in futures.items():
+        try:
+            urls[field_name] = future.result()
+        except Exception as e:
+            errors.append(FileUploadError(field_name, e))
+    
+    if errors:
+        raise errors[0]
+    return urls
+
+
+class UploadNotFoundError(FileUploadError):
+    """Raised when a direct upload referenced by a submission does not exist."""
+
+
+def get_direct_upload_prefix(form_id, field_name):
+    return f'media/forms/{form_id}/uploads/{field_name}/'
+
+
+def _sign_direct_upload(s3_key, form_id, field_name, user_id):
+    value = f'{user_id}:{form_id}:{field_name}:{s3_key}'
+    return salted_hmac('formsApp.direct-upload', value, algorithm='sha256').hexdigest()
+
+
+def create_direct_upload(form_id, field_name, filename, content_type, user_id, method='post'):
+    """
+    Create a presigned target the client can upload a file to directly.
+    
+    The returned key is the object key with a signature over the user, form
+    and field appended, so a submission can only reference uploads issued
+    to its user for the same form and field.
+    
+    Args:
+        form_id: ID of the form
+        field_name: Name of the file field in the form schema
+        filename: Original file name, used for the extension
+        content_type: MIME type the file will be uploaded with
+        user_id: ID of the user the upload is issued to
+        method: 'post' for a presigned POST form, 'put' for a presigned URL
+    
+    Returns:
+        dict: Signed key and the upload target (url plus fields or headers)
+    """
+    s3_client = get_s3_client()
+    file_extension = os.path.splitext(filename or '')[1]
+    s3_key = f'{get_direct_upload_prefix(form_id, field_name)}{uuid.uuid4().hex}{file_extension}'
+    expires = settings.PRESIGNED_UPLOAD_EXPIRES
+    
+    if method == 'put':
+        url = s3_client.generate_presigned_url(
+            'put_object',
+            Params={
+                'Bucket': settings.AWS_STORAGE_BUCKET_NAME,
+                'Key': s3_key,
+                'ContentType': content_type
+            },
+            ExpiresIn=expires
+        )
+        upload = {'method': 'PUT', 'url': url, 'headers': {'Content-Type': content_type}}
+    else:
+        presigned = s3_client.generate_presigned_post(
+            settings.AWS_STORAGE_BUCKET_NAME,
+            s3_key,
+            Fields={'Content-Type': content_type},
+            Conditions=[
+                {'Content-Type': content_type},
+                ['content-length-range', 1, settings.PRESIGNED_UPLOAD_MAX_SIZE]
+            ],
+            ExpiresIn=expires
+        )
+        upload = {'method': 'POST', 'url': presigned['url'], 'fields': presigned['fields']}
+    
+    signed_key = f'{s3_key}:{_sign_direct_upload(s3_key, form_id, field_name, user_id)}'
+    return {'field': field_name, 'key': signed_key, 'expires_in': expires, 'upload': upload}
+
+
+def verify_direct_upload(signed_key, form_id, field_name, user_id):
+    """
+    Check that a directly uploaded object was issued to the user for this
+    form and field, exists and is within size limits.
+    
+    Args:
+        signed_key: Key returned by create_direct_upload
+        form_id: ID of the form submitted to
+        field_name: Name of the file field the key was sent for
+        user_id: ID of the submitting user
+    
+    Returns:
+        str: Public URL of the object
+    
+    Raises:
+        UploadNotFoundError: If the object does not exist
+        ValueError: If the key was not issued for this submission or the
+            object is larger than allowed
+    """
+    s3_key, _, signature = signed_key.rpartition(':')
+    if not constant_time_compare(signature, _sign_direct_upload(s3_key, form_id, field_name, user_id)):
+        raise ValueError("Upload key was not issued for this form field and user")
+    
+    start = time.perf_counter()
+    try:
+        head = get_s3_client().head_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=s3_key)
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+            raise UploadNotFoundError(None, f"Uploaded file '{s3_key}' was not found")
+        raise
+    finally:
+        registry.observe('s3_head_seconds', time.perf_counter() - start)
+    
+    # PUT uploads are not covered by the content-length-range condition
+    if head['ContentLength'] > settings.PRESIGNED_UPLOAD_MAX_SIZE:
+        raise ValueError(f"Uploaded file is larger than {settings.PRESIGNED_UPLOAD_MAX_SIZE} bytes")
+    
+    return get_s3_file_url(s3_key)
+
+
+def verify_direct_uploads(keys, form_id, user_id):
+    """
+    Verify several direct uploads concurrently.
+    
+    Args:
+        keys: Dict mapping field names to keys returned by create_direct_upload
+        form_id: ID of the form submitted to
+        user_id: ID of the submitting user
+    
+    Returns:
+        dict: Field names mapped to public URLs of the objects
+    
+    Raises:
+        FileUploadError: For the first field that could not be verified
+    """
+    executor = get_upload_executor()
+    futures = {
+        field_name: executor.submit(verify_direct_upload, signed_key, form_id, field_name, user_id)
+        for field_name, signed_key in keys.items()
+    }
+    
+    urls = {}
+    errors = []
+    for field_name, future in futures.items():
+        try:
+            urls[field_name] = future.result()
+        except UploadNotFoundError as e:
+            errors.append(UploadNotFoundError(field_name, e.error))
+        except Exception as e:
+            errors.append(FileUploadError(field_name, e))
+    
+    if errors:
+        raise errors[0]
+    return urls
+
+
+@timed('excel')
 def generate_excel_export(form, responses):
     """
     Generate Excel file from form responses.
@@ -91,9 +414,7 @@ def generate_excel_export(form, responses):
     header_alignment = Alignment(horizontal="center", vertical="center")
     
     # Create headers
-    headers = ["Submission ID", "User Email", "Submitted At"]
-    for field in fields:
-        headers.append(field.get('name', 'Unknown'))
+    headers = get_export_headers(fields)
     
     # Write headers
     for col_idx, header in enumerate(headers, start=1):
@@ -164,3 +485,315 @@ def get_file_fields(schema):
     """
     fields = schema.get('fields', [])
     return [field.get('name') for field in fields if field.get('type') == 'file']
+
+
+def get_export_headers(fields):
+    """
+    Get the export column headers for a list of schema fields.
+    
+    Args:
+        fields: List of field definitions from the form schema
+    
+    Returns:
+        list: Fixed submission columns followed by one column per field
+    """
+    return EXPORT_BASE_HEADERS + [field.get('name', 'Unknown') for field in fields]
+
+
+def iter_export_rows(responses, chunk_size=None):
+    """
+    Iterate over responses as plain tuples using a server-side cursor.
+    
+    Args:
+        responses: QuerySet of FormResponse objects
+        chunk_size: Number of rows fetched from the database per round trip
+    
+    Returns:
+        iterator: (id, user email, submitted_at, response_data) tuples
+    """
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    return responses.values_list(
+        'id', 'user__email', 'submitted_at', 'response_data'
+    ).iterator(chunk_size=chunk_size)
+
+
+def build_write_only_workbook(form, rows):
+    """
+    Build a write-only Excel workbook from export rows.
+    
+    Rows are spooled to a temporary file by openpyxl as they are appended,
+    so memory usage does not grow with the number of responses.
+    
+    Args:
+        form: Form model instance
+        rows: Iterable of tuples as produced by iter_export_rows
+    
+    Returns:
+        Workbook: Write-only workbook ready to be saved
+    """
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet("Form Responses")
+    fields = form.schema.get('fields', [])
+    headers = get_export_headers(fields)
+    
+    header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
+    header_font = Font(color="FFFFFF", bold=True, size=12)
+    header_alignment = Alignment(horizontal="center", vertical="center")
+    link_font = Font(color="0563C1", underline="single")
+    
+    # Layout has to be set before the first row is written
+    for col_idx in range(1, len(headers) + 1):
+        worksheet.column_dimensions[get_column_letter(col_idx)].width = 20
+    worksheet.freeze_panes = 'A2'
+    
+    header_cells = []
+    for header in headers:
+        cell = WriteOnlyCell(worksheet, value=header)
+        cell.fill = header_fill
+        cell.font = header_font
+        cell.alignment = header_alignment
+        header_cells.append(cell)
+    worksheet.append(header_cells)
+    
+    field_specs = [(field.get('name'), field.get('type') == 'file') for field in fields]
+    for response_id, user_email, submitted_at, response_data in rows:
+        row = [response_id, user_email, submitted_at.strftime('%Y-%m-%d %H:%M:%S')]
+        response_data = response_data or {}
+        for field_name, is_file in field_specs:
+            field_value = response_data.get(field_name, '')
+            if is_file and field_value:
+                cell = WriteOnlyCell(worksheet, value=field_value)
+                cell.hyperlink = field_value
+                cell.font = link_font
+                row.append(cell)
+            else:
+                row.append(str(field_value) if field_value else '')
+        worksheet.append(row)
+    
+    return workbook
+
+
+def stream_excel_export(form, responses, chunk_size=None):
+    """
+    Generate an Excel export as a stream of bytes.
+    
+    Responses are read with a chunked server-side cursor and the workbook
+    is compressed and yielded piece by piece, so peak memory stays flat
+    regardless of the number of responses. The first byte is only sent
+    once every row has been written, see iter_xlsx_chunks. The time spent
+    producing the chunks is counted as Excel time of the request.
+    
+    Args:
+        form: Form model instance
+        responses: QuerySet of FormResponse objects
+        chunk_size: Number of rows fetched from the database per round trip
+    
+    Returns:
+        iterator: Chunks (bytes) of the .xlsx file
+    """
+    return timed_iter('excel', iter_xlsx_chunks(form, iter_export_rows(responses, chunk_size)))
+
+
+def iter_xlsx_chunks(form, rows):
+    """
+    Render export rows as an Excel workbook, yielded piece by piece.
+    
+    openpyxl spools all rows to a temporary file before it writes the
+    archive, so nothing is yielded until every row has been consumed: the
+    time to first byte is the whole render time. Only the compression of
+    the archive overlaps with sending it. Use CSV or NDJSON, which are
+    sent as the rows are read, when that delay matters.
+    
+    Args:
+        form: Form model instance
+        rows: Iterable of tuples as produced by iter_export_rows
+    
+    Yields:
+        bytes: Chunks of the .xlsx file
+    """
+    workbook = build_write_only_workbook(form, rows)
+    yield from _stream_workbook(workbook)
+
+
+def iter_csv_chunks(form, rows, buffer_size=64 * 1024):
+    """
+    Render export rows as CSV, in the same column order as the Excel export.
+    
+    Args:
+        form: Form model instance
+        rows: Iterable of tuples as produced by iter_export_rows
+        buffer_size: Approximate size of each yielded chunk
+    
+    Yields:
+        bytes: UTF-8 encoded CSV chunks
+    """
+    fields = form.schema.get('fields', [])
+    field_names = [field.get('name') for field in fields]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(get_export_headers(fields))
+    
+    for response_id, user_email, submitted_at, response_data in rows:
+        response_data = response_data or {}
+        row = [response_id, user_email, submitted_at.strftime('%Y-%m-%d %H:%M:%S')]
+        for field_name in field_names:
+            field_value = response_data.get(field_name, '')
+            row.append(str(field_value) if field_value else '')
+        writer.writerow(row)
+        
+        if buffer.tell() >= buffer_size:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def iter_ndjson_chunks(form, rows, buffer_size=64 * 1024):
+    """
+    Render export rows as newline-delimited JSON, one object per response.
+    
+    Keys follow the Excel export column order; field values keep their
+    JSON types.
+    
+    Args:
+        form: Form model instance
+        rows: Iterable of tuples as produced by iter_export_rows
+        buffer_size: Approximate size of each yielded chunk
+    
+    Yields:
+        bytes: UTF-8 encoded NDJSON chunks
+    """
+    fields = form.schema.get('fields', [])
+    headers = get_export_headers(fields)
+    field_names = [field.get('name') for field in fields]
+    encoder = json.JSONEncoder(separators=(',', ':'), default=str)
+    lines = []
+    size = 0
+    
+    for response_id, user_email, submitted_at, response_data in rows:
+        response_data = response_data or {}
+        values = [response_id, user_email, submitted_at.isoformat()]
+        values.extend(response_data.get(field_name) for field_name in field_names)
+        line = encoder.encode(dict(zip(headers, values)))
+        lines.append(line)
+        size += len(line) + 1
+        
+        if size >= buffer_size:
+            lines.append('')
+            yield '\n'.join(lines).encode('utf-8')
+            lines = []
+            size = 0
+    
+    if lines:
+        lines.append('')
+        yield '\n'.join(lines).encode('utf-8')
+
+
+def stream_csv_export(form, responses, chunk_size=None):
+    """
+    Generate a CSV export as a stream of bytes from a server-side cursor.
+    
+    Args:
+        form: Form model instance
+        responses: QuerySet of FormResponse objects
+        chunk_size: Number of rows fetched from the database per round trip
+    
+    Yields:
+        bytes: Chunks of the CSV file
+    """
+    yield from iter_csv_chunks(form, iter_export_rows(responses, chunk_size))
+
+
+def stream_ndjson_export(form, responses, chunk_size=None):
+    """
+    Generate an NDJSON export as a stream of bytes from a server-side cursor.
+    
+    Args:
+        form: Form model instance
+        responses: QuerySet of FormResponse objects
+        chunk_size: Number of rows fetched from the database per round trip
+    
+    Yields:
+        bytes: Chunks of the NDJSON file
+    """
+    yield from iter_ndjson_chunks(form, iter_export_rows(responses, chunk_size))
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+class _QueueWriter(io.RawIOBase):
+    """Unseekable file object that hands buffered writes over to a queue."""
+    
+    def __init__(self, chunks, cancelled, buffer_size):
+        self._chunks = chunks
+        self._cancelled = cancelled
+        self._buffer_size = buffer_size
+        self._buffer = bytearray()
+    
+    def writable(self):
+        return True
+    
+    def write(self, data):
+        self._buffer += data
+        if len(self._buffer) >= self._buffer_size:
+            self.flush()
+        return len(data)
+    
+    def flush(self):
+        if self._buffer:
+            self.put(bytes(self._buffer))
+            self._buffer.clear()
+    
+    def put(self, item):
+        while True:
+            if self._cancelled.is_set():
+                raise ExportCancelled()
+            try:
+                self._chunks.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+
+def _stream_workbook(workbook, buffer_size=64 * 1024, max_chunks=16):
+    # openpyxl can only save in one blocking call, so the archive is written
+    # from a helper thread into a bounded queue that the response drains.
+    chunks = queue.Queue(maxsize=max_chunks)
+    cancelled = threading.Event()
+    writer = _QueueWriter(chunks, cancelled, buffer_size)
+    errors = []
+    
+    def save():
+        try:
+            workbook.save(writer)
+            writer.flush()
+        except ExportCancelled:
+            pass
+        except Exception as e:
+            logger.error(f"Streaming Excel export failed: {str(e)}")
+            errors.append(e)
+        finally:
+            try:
+                writer.put(None)
+            except ExportCancelled:
+                pass
+    
+    thread = threading.Thread(target=save, name='excel-export-writer', daemon=True)
+    thread.start()
+    try:
+        while True:
+            chunk = chunks.get()
+            if chunk is None:
+                break
+            yield chunk
+    finally:
+        # Client went away or the stream finished: release the writer thread
+        cancelled.set()
+        thread.join()
+    
+    if errors:
+        raise errors[0]
@@ -1,3 +1,31 @@
-from django.shortcuts import render
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework.permissions import IsAuthenticated
 
-# Create your views here.
+from accounts.authentication import token_cache
+from accounts.permissions import IsAdmin
+from forms.db import get_pool_stats
+from forms.metrics import registry
+from .export_cache import get_export_cache_stats
+from .validation import validator_cache
+
+
+class MetricsView(APIView):
+    """
+    Performance counters and timings of the worker serving the request.
+    """
+    permission_classes = [IsAuthenticated, IsAdmin]
+    
+    def get(self, request):
+        metrics = registry.snapshot()
+        metrics['form_validator_cache'] = {
+            'size': len(validator_cache),
+            'maxsize': validator_cache.maxsize,
+        }
+        metrics['auth_token_cache'] = {
+            'size': len(token_cache),
+            'maxsize': token_cache.maxsize,
+        }
+        metrics['db_pools'] = get_pool_stats()
+        metrics['export_cache'] = get_export_cache_stats()
+        return Response(metrics)
@@ -1,57 +1,204 @@
-from rest_framework import viewsets, status
+from rest_framework import viewsets, mixins, status, serializers
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.http import HttpResponse
+from django.conf import settings
+from django.db import transaction
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence
 
-from .models import Form, FormResponse
-from .serializers import FormSerializer, FormResponseSerializer
+from .models import Form, FormResponse, ExportJob
+from .serializers import (
+    FormSerializer,
+    FormResponseSerializer,
+    ExportJobSerializer,
+    DirectUploadRequestSerializer,
+)
 from .permissions import IsAdminOrReadOnly, CanSubmitForm, CanViewResponses
-from .utils import upload_file_to_s3, generate_excel_export, has_file_fields, get_file_fields
+from .pagination import ResponseKeysetPagination
+from .filters import ResponseQuery
+from .conditional import conditional_response, get_form_list_state, get_form_state
+from .cache import get_cached_form, get_cached_form_list
+from .utils import (
+    upload_files_to_s3,
+    create_direct_upload,
+    get_direct_upload_prefix,
+    verify_direct_uploads,
+    FileUploadError,
+    UploadNotFoundError,
+    generate_excel_export,
+    stream_excel_export,
+    stream_csv_export,
+    stream_ndjson_export,
+)
+from .validation import get_form_validator
+from .uploads import (
+    S3StreamingUploadHandler, StreamedUploadedFile, discard_streamed_uploads, set_streaming_upload_form
+)
+from .exports import (
+    EXPORT_CONTENT_TYPES, DeltaExport, enqueue_export_job, get_export_snapshot, get_export_snapshot_key
+)
+from .export_bundles import stream_export_bundle
+from .export_cache import cache_export_chunks, export_file_response, get_cached_export, save_export
+from .aggregates import apply_response_aggregates, increment_response_counters, get_form_summary
 
 
 class FormViewSet(viewsets.ModelViewSet):
-    queryset = Form.objects.all()
+    queryset = Form.objects.select_related('created_by')
     serializer_class = FormSerializer
     permission_classes = [IsAuthenticated, IsAdminOrReadOnly]
     
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
     
+    def initialize_request(self, request, *args, **kwargs):
+        request = super().initialize_request(request, *args, **kwargs)
+        # Installed before authentication, whose CSRF check may already
+        # parse the body for session users
+        if self.action == 'submit' and settings.S3_STREAMING_UPLOADS:
+            request.upload_handlers.insert(0, S3StreamingUploadHandler(request, kwargs.get('pk')))
+        return request
+    
+    def handle_exception(self, exc):
+        if isinstance(exc, FileUploadError):
+            # Also raised outside submit: the CSRF check of session
+            # authentication parses the body in initial()
+            discard_streamed_uploads(self.request)
+            return Response(
+                {'error': f'Failed to upload file for field {exc.field_name}: {str(exc)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+        return super().handle_exception(exc)
+    
+    def perform_content_negotiation(self, request, force=False):
+        # On exports ?format= picks the file format, not a response renderer,
+        # so fall back to the default renderer instead of returning a 404.
+        if self.action == 'export_excel':
+            force = True
+        return super().perform_content_negotiation(request, force)
+    
+    def list(self, request, *args, **kwargs):
+        state = get_form_list_state()
+        return conditional_response(request, state, lambda: self._list_forms(state))
+    
+    def retrieve(self, request, *args, **kwargs):
+        state = get_form_state(kwargs['pk'])
+        if state is None:
+            return super().retrieve(request, *args, **kwargs)
+        return conditional_response(request, state, lambda: self._retrieve_form(kwargs['pk'], state))
+    
+    def _with_counters(self, data, response_count, last_submitted_at):
+        # Counters change on every submission and are not part of the
+        # cached representation; overlay the current values.
+        data = dict(data)
+        data['response_count'] = response_count
+        data['last_submitted_at'] = (
+            serializers.DateTimeField().to_representation(last_submitted_at) if last_submitted_at else None
+        )
+        return data
+    
+    def _list_forms(self, state):
+        forms = get_cached_form_list(lambda: self.get_serializer(self.get_queryset(), many=True).data, state)
+        counters = {
+            form_id: (response_count, last_submitted_at)
+            for form_id, response_count, last_submitted_at
+            in Form.objects.values_list('id', 'response_count', 'last_submitted_at')
+        }
+        return Response([
+            self._with_counters(data, *counters.get(data['id'], (0, None)))
+            for data in forms
+        ])
+    
+    def _retrieve_form(self, pk, state):
+        data = get_cached_form(int(pk), lambda: self.get_serializer(self.get_object()).data, state)
+        return Response(self._with_counters(data, state['response_count'], state['last_submitted_at']))
+    
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated, CanSubmitForm])
     def submit(self, request, pk=None):
         form = self.get_object()
+        set_streaming_upload_form(request, form)
+        
+        try:
+            response = self._submit(request, form)
+        except Exception:
+            discard_streamed_uploads(request)
+            raise
+        if response.status_code != status.HTTP_201_CREATED:
+            # Files streamed to storage while parsing belong to no submission
+            discard_streamed_uploads(request)
+        return response
+    
+    def _submit(self, request, form):
+        # A FileUploadError while parsing is answered by handle_exception
+        data = request.data
         
         # Convert QueryDict to regular dict for multipart/form-data
         # This handles both JSON and multipart submissions
-        if hasattr(request.data, 'dict'):
+        if hasattr(data, 'dict'):
             # Multipart form data (QueryDict)
-            response_data = dict(request.data)
+            response_data = dict(data)
             # QueryDict stores values as lists, get first value for each key
             response_data = {k: v[0] if isinstance(v, list) and len(v) == 1 else v 
                            for k, v in response_data.items()}
         else:
             # JSON data (dict)
-            response_data = dict(request.data)
+            response_data = dict(data)
         
         # Check if form has file fields
-        if has_file_fields(form.schema):
-            file_field_names = get_file_fields(form.schema)
+        validator = get_form_validator(form)
+        streamed = []
+        if validator.has_file_fields:
+            files = {
+                field_name: request.FILES[field_name]
+                for field_name in validator.file_fields
+                if field_name in request.FILES
+            }
+            # Files sent to storage while the request was parsed
+            streamed = [file for file in files.values() if isinstance(file, StreamedUploadedFile)]
+            response_data.update({
+                field_name: file.url
+                for field_name, file in files.items()
+                if isinstance(file, StreamedUploadedFile)
+            })
+            # Upload the other files of the submission concurrently
+            buffered = {
+                field_name: file
+                for field_name, file in files.items()
+                if not isinstance(file, StreamedUploadedFile)
+            }
+            if buffered:
+                try:
+                    # Store S3 URLs in response data
+                    response_data.update(upload_files_to_s3(buffered, form.id))
+                except FileUploadError as e:
+                    return Response(
+                        {'error': f'Failed to upload file for field {e.field_name}: {str(e)}'},
+                        status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                    )
             
-            # Process file uploads
-            for field_name in file_field_names:
-                if field_name in request.FILES:
-                    try:
-                        file = request.FILES[field_name]
-                        # Upload to S3 and get URL
-                        file_url = upload_file_to_s3(file, form.id, field_name)
-                        # Store URL in response data
-                        response_data[field_name] = file_url
-                    except Exception as e:
-                        return Response(
-                            {'error': f'Failed to upload file for field {field_name}: {str(e)}'},
-                            status=status.HTTP_500_INTERNAL_SERVER_ERROR
-                        )
+            # Files uploaded directly to storage (see upload_urls) are sent as
+            # the signed keys upload_urls returned
+            keys = {
+                field_name: response_data[field_name]
+                for field_name in validator.file_fields
+                if field_name not in files
+                and isinstance(response_data.get(field_name), str)
+                and response_data[field_name].startswith(get_direct_upload_prefix(form.id, field_name))
+            }
+            if keys:
+                try:
+                    response_data.update(verify_direct_uploads(keys, form.id, request.user.id))
+                except UploadNotFoundError as e:
+                    return Response(
+                        {'error': f'File for field {e.field_name} was not found in storage'},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+                except FileUploadError as e:
+                    return Response(
+                        {'error': f'Failed to verify file for field {e.field_name}: {str(e)}'},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
         
         serializer_data = {
             'form': form.id,
@@ -60,7 +207,12 @@ class FormViewSet(viewsets.ModelViewSet):
         
         serializer = FormResponseSerializer(data=serializer_data)
         if serializer.is_valid():
-            serializer.save(user=request.user)
+            with transaction.atomic():
+                form_response = serializer.save(user=request.user)
+                increment_response_counters(form, [form_response])
+                apply_response_aggregates(form, [form_response])
+            # Extra files sent for the same field are not part of the response
+            discard_streamed_uploads(request, keep=streamed)
             return Response(
                 {
                     'message': 'Form submitted successfully',
@@ -71,26 +223,205 @@ class FormViewSet(viewsets.ModelViewSet):
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
+    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated, CanSubmitForm], url_path='upload-urls')
+    def upload_urls(self, request, pk=None):
+        """
+        Get presigned targets for uploading files straight to storage.
+        
+        Upload each file to its target, then pass the returned 'key' as the
+        field value to submit. The file bytes never go through the app. A key
+        is signed for the requesting user, the form and the field, and is
+        refused in any other submission.
+        """
+        form = self.get_object()
+        
+        serializer = DirectUploadRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        file_fields = get_form_validator(form).file_fields
+        files = serializer.validated_data['files']
+        for file in files:
+            if file['field'] not in file_fields:
+                return Response(
+                    {'error': f"Field '{file['field']}' is not a file field of this form"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        
+        try:
+            uploads = [
+                create_direct_upload(
+                    form.id,
+                    file['field'],
+                    file['filename'],
+                    file['content_type'],
+                    request.user.id,
+                    method=serializer.validated_data['method']
+                )
+                for file in files
+            ]
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        
+        return Response({'uploads': uploads})
+    
+    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated, CanSubmitForm], url_path='submit-bulk')
+    def submit_bulk(self, request, pk=None):
+        """
+        Submit many responses to a form in one request.
+        
+        Accepts a JSON list of response_data objects (or {"responses": [...]}).
+        Valid items are inserted in batches inside a single transaction;
+        the result lists the outcome of every item by its index.
+        """
+        form = self.get_object()
+        
+        items = request.data
+        if isinstance(items, dict):
+            items = items.get('responses')
+        
+        if not isinstance(items, list) or not items:
+            return Response(
+                {'error': 'Expected a non-empty list of responses'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if len(items) > settings.BULK_SUBMIT_MAX_ITEMS:
+            return Response(
+                {'error': f'At most {settings.BULK_SUBMIT_MAX_ITEMS} responses can be submitted at once'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        validator = get_form_validator(form)
+        results = []
+        valid = []
+        
+        for index, response_data in enumerate(items):
+            try:
+                cleaned = validator.validate(response_data)
+            except serializers.ValidationError as e:
+                results.append({'index': index, 'status': 'invalid', 'errors': e.detail})
+                continue
+            
+            result = {'index': index, 'status': 'created'}
+            results.append(result)
+            valid.append((result, FormResponse(form=form, user=request.user, response_data=cleaned)))
+        
+        if valid:
+            with transaction.atomic():
+                created = FormResponse.objects.bulk_create(
+                    [response for _, response in valid],
+                    batch_size=settings.BULK_SUBMIT_BATCH_SIZE
+                )
+                increment_response_counters(form, created)
+                apply_response_aggregates(form, created)
+            
+            for (result, _), response in zip(valid, created):
+                result['id'] = response.id
+        
+        if not valid:
+            response_status = status.HTTP_400_BAD_REQUEST
+        elif len(valid) < len(items):
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_201_CREATED
+        
+        return Response(
+            {
+                'created': len(valid),
+                'failed': len(items) - len(valid),
+                'results': results
+            },
+            status=response_status
+        )
+    
     @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated, CanViewResponses])
     def responses(self, request, pk=None):
+        """
+        List form responses, newest first, one page at a time.
+        
+        Follow the returned 'next' link to page through the responses.
+        Pass ?page_size=N to change the page size and ?include_total=false
+        to leave out the response count.
+        
+        Filter by field value with ?field.<name>=value or
+        ?field.<name>__in=a,b, with ?field.<name>__gt/gte/lt/lte= on number
+        and date fields and with ?field.<name>__icontains= on text fields.
+        Sort with ?ordering=[-]field.<name> or ?ordering=submitted_at;
+        responses without a value for the sort field are left out.
+        
+        Supports conditional requests with If-None-Match.
+        """
+        return conditional_response(request, get_form_state(pk), lambda: self._list_responses(request))
+    
+    def _list_responses(self, request):
         form = self.get_object()
-        responses = FormResponse.objects.filter(form=form)
-        serializer = FormResponseSerializer(responses, many=True)
+        query = ResponseQuery(form, request.query_params)
+        responses = (
+            FormResponse.objects.filter(form=form)
+            .select_related('form', 'user')
+            .only(
+                'id', 'response_data', 'submitted_at',
+                'form', 'form__name', 'user', 'user__email',
+            )
+        )
+        responses = query.apply(responses)
+        
+        paginator = ResponseKeysetPagination(query.ordering_expression, query.descending)
+        page = paginator.paginate_queryset(responses, request, view=self)
+        serializer = FormResponseSerializer(page, many=True)
+        
+        include_total = request.query_params.get('include_total', 'true').lower() not in ('0', 'false', 'no')
         
         return Response({
             'form': form.name,
-            'total_responses': responses.count(),
+            'total_responses': form.response_count if include_total else None,
+            'next': paginator.get_next_link(),
             'responses': serializer.data
         })
     
+    @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated, CanViewResponses])
+    def summary(self, request, pk=None):
+        """
+        Summarize form responses: option counts and statistics of number
+        fields, plus submissions per day. Read from pre-computed aggregates.
+        """
+        form = self.get_object()
+        summary = get_form_summary(form)
+        
+        return Response({'form': form.name, **summary})
+    
     @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated, CanViewResponses], url_path='export-excel')
     def export_excel(self, request, pk=None):
         """
         Export form responses as Excel file.
         Only available if form has allow_excel_download enabled.
+        
+        Pass ?stream=true (or ?stream=false) to override the
+        EXCEL_EXPORT_STREAMING setting. Streaming exports are generated
+        from a server-side cursor with flat memory use; the workbook is
+        sent while it is compressed, after all rows have been written.
+        
+        Pass ?format=csv or ?format=ndjson for flat exports. These are
+        always streamed and are gzip-encoded when the client accepts it.
+        
+        With EXPORT_CACHE_MAX_BYTES set, finished exports are cached on
+        disk by form snapshot and repeat downloads of an unchanged form are
+        served from the cache.
+        
+        Pass ?since=<cursor> for a delta export of the responses submitted
+        after the cursor (?since= with no value starts from the first
+        response). The cursor for the next delta export is returned in the
+        X-Next-Cursor header.
         """
         form = self.get_object()
         
+        export_format = request.query_params.get('format', 'xlsx')
+        if export_format not in EXPORT_CONTENT_TYPES:
+            return Response(
+                {'error': f"Invalid export format '{export_format}'. Valid formats are: {', '.join(EXPORT_CONTENT_TYPES)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
         # Check if Excel download is allowed for this form
         if not form.allow_excel_download:
             return Response(
@@ -99,25 +430,96 @@ class FormViewSet(viewsets.ModelViewSet):
             )
         
         # Get all responses for this form
-        responses = FormResponse.objects.filter(form=form).order_by('-submitted_at')
+        # id breaks ties, so rows with the same submission time keep their
+        # order between exports and the (form, -submitted_at, -id) index is used
+        responses = FormResponse.objects.filter(form=form).order_by('-submitted_at', '-id')
         
-        if not responses.exists():
+        since = request.query_params.get('since')
+        delta = None
+        if since is not None:
+            try:
+                delta = DeltaExport.for_form(form, since)
+            except ValueError:
+                return Response(
+                    {'error': 'Invalid since cursor'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            # An empty delta is a valid answer, not a missing export
+            responses = delta.apply(responses)
+        elif not responses.exists():
             return Response(
                 {'error': 'No responses found for this form'},
                 status=status.HTTP_404_NOT_FOUND
             )
         
+        filename = f"{form.name.replace(' ', '_')}_responses.{export_format}"
+        content_type = EXPORT_CONTENT_TYPES[export_format]
+        
+        stream = request.query_params.get('stream')
+        if stream is None:
+            stream = settings.EXCEL_EXPORT_STREAMING
+        else:
+            stream = stream.lower() in ('1', 'true', 'yes')
+        
+        snapshot_key = None
+        if settings.EXPORT_CACHE_MAX_BYTES and delta is None:
+            snapshot = get_export_snapshot(form)
+            # The streamed and in-memory workbooks are written differently
+            variant = ('stream' if stream else 'workbook') if export_format == 'xlsx' else None
+            snapshot_key = get_export_snapshot_key(form, export_format, snapshot, variant=variant)
+            cached = get_cached_export(snapshot_key, export_format)
+            if cached is not None:
+                try:
+                    return export_file_response(cached, filename, content_type)
+                except FileNotFoundError:
+                    pass  # Evicted in the meantime; build it again
+            # Export exactly the snapshot the key describes
+            if snapshot['last_submitted_at'] is not None:
+                responses = responses.filter(submitted_at__lte=snapshot['last_submitted_at'])
+        
+        if export_format in ('csv', 'ndjson'):
+            stream_export = stream_csv_export if export_format == 'csv' else stream_ndjson_export
+            content = stream_export(form, responses)
+            if snapshot_key:
+                content = cache_export_chunks(content, snapshot_key, export_format)
+            
+            gzip = 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+            if gzip:
+                content = compress_sequence(content)
+            
+            response = StreamingHttpResponse(content, content_type=content_type)
+            response['Content-Disposition'] = f'attachment; filename="{filename}"'
+            if gzip:
+                response['Content-Encoding'] = 'gzip'
+            if delta:
+                response['X-Next-Cursor'] = delta.next_cursor
+            patch_vary_headers(response, ('Accept-Encoding',))
+            return response
+        
+        if stream:
+            content = stream_excel_export(form, responses)
+            if snapshot_key:
+                content = cache_export_chunks(content, snapshot_key, export_format)
+            response = StreamingHttpResponse(content, content_type=content_type)
+            response['Content-Disposition'] = f'attachment; filename="{filename}"'
+            if delta:
+                response['X-Next-Cursor'] = delta.next_cursor
+            return response
+        
         try:
             # Generate Excel file
             excel_file = generate_excel_export(form, responses)
+            if snapshot_key:
+                save_export(excel_file.getvalue(), snapshot_key, export_format)
             
             # Create HTTP response with Excel file
-            filename = f"{form.name.replace(' ', '_')}_responses.xlsx"
             response = HttpResponse(
                 excel_file.getvalue(),
-                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+                content_type=content_type
             )
             response['Content-Disposition'] = f'attachment; filename="{filename}"'
+            if delta:
+                response['X-Next-Cursor'] = delta.next_cursor
             
             return response
             
@@ -125,4 +527,137 @@ class FormViewSet(viewsets.ModelViewSet):
             return Response(
                 {'error': f'Failed to generate Excel file: {str(e)}'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
\ No newline at end of file
+            )
+    
+    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated, CanViewResponses])
+    def exports(self, request, pk=None):
+        """
+        Queue a background export of the form responses.
+        
+        Requests for a form whose schema and responses have not changed
+        share the same job. Poll GET /exports/{id}/ for the result.
+        
+        Pass "since" (a cursor, or "" for all responses) to queue a delta
+        export; the finished job has the cursor for the next one in
+        next_cursor.
+        """
+        form = self.get_object()
+        
+        if not form.allow_excel_download:
+            return Response(
+                {'error': 'Excel download is not enabled for this form'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        export_format = request.data.get('format', 'xlsx')
+        if export_format not in EXPORT_CONTENT_TYPES:
+            return Response(
+                {'error': f"Invalid export format '{export_format}'. Valid formats are: {', '.join(EXPORT_CONTENT_TYPES)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            job, created = enqueue_export_job(form, request.user, export_format, since=request.data.get('since'))
+        except ValueError:
+            return Response(
+                {'error': 'Invalid since cursor'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        serializer = ExportJobSerializer(job, context={'request': request})
+        
+        return Response(
+            serializer.data,
+            status=status.HTTP_202_ACCEPTED if job.status in ('pending', 'running') else status.HTTP_200_OK
+        )
+    
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated, CanViewResponses], url_path='export-bundle')
+    def export_bundle(self, request):
+        """
+        Export the responses of several forms as one streamed ZIP archive.
+        
+        Takes {"forms": [ids], "format": "xlsx" | "csv" | "ndjson"}. Every
+        form must exist and have allow_excel_download enabled. The archive
+        holds one file per form, generated from a single database query.
+        """
+        form_ids = request.data.get('forms')
+        if (
+            not isinstance(form_ids, list) or not form_ids
+            or not all(isinstance(form_id, int) and not isinstance(form_id, bool) for form_id in form_ids)
+        ):
+            return Response(
+                {'error': 'forms must be a non-empty list of form ids'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        form_ids = list(dict.fromkeys(form_ids))
+        if len(form_ids) > settings.EXPORT_BUNDLE_MAX_FORMS:
+            return Response(
+                {'error': f'At most {settings.EXPORT_BUNDLE_MAX_FORMS} forms can be exported at once'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        export_format = request.data.get('format', 'xlsx')
+        if export_format not in EXPORT_CONTENT_TYPES:
+            return Response(
+                {'error': f"Invalid export format '{export_format}'. Valid formats are: {', '.join(EXPORT_CONTENT_TYPES)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        forms = list(self.get_queryset().filter(id__in=form_ids))
+        missing = sorted(set(form_ids) - {form.id for form in forms})
+        if missing:
+            return Response(
+                {'error': 'Forms not found', 'forms': missing},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        for form in forms:
+            self.check_object_permissions(request, form)
+        
+        not_allowed = sorted(form.id for form in forms if not form.allow_excel_download)
+        if not_allowed:
+            return Response(
+                {'error': 'Excel download is not enabled for these forms', 'forms': not_allowed},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        response = StreamingHttpResponse(stream_export_bundle(forms, export_format), content_type='application/zip')
+        response['Content-Disposition'] = f'attachment; filename="forms_{export_format}_export.zip"'
+        return response
+
+
+class ExportJobViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    queryset = ExportJob.objects.select_related('form', 'requested_by')
+    serializer_class = ExportJobSerializer
+    permission_classes = [IsAuthenticated, CanViewResponses]
+    
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """
+        Download the file of a finished export job.
+        """
+        job = self.get_object()
+        
+        # Turning downloads off also applies to exports built before
+        if not job.form.allow_excel_download:
+            return Response(
+                {'error': 'Excel download is not enabled for this form'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        if job.status != 'done':
+            return Response(
+                {'error': f'Export is not ready (status: {job.status})'},
+                status=status.HTTP_409_CONFLICT
+            )
+        
+        try:
+            response = export_file_response(
+                job.file_path,
+                filename=f"{job.form.name.replace(' ', '_')}_responses.{job.format}",
+                content_type=EXPORT_CONTENT_TYPES[job.format]
+            )
+            if job.since is not None:
+                response['X-Next-Cursor'] = job.next_cursor
+            return response
+        except FileNotFoundError:
+            raise Http404('Export file is no longer available')
\ No newline at end of file